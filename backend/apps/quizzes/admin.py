@@ -2,7 +2,7 @@
 Admin configuration for Quiz app
 """
 from django.contrib import admin
-from .models import Chapter, Question, QuizSession, QuestionAttempt
+from .models import AnswerBatch, CalibrationCheckpoint, Chapter, Question, QuizSession, QuestionAttempt
 
 
 @admin.register(Chapter)
@@ -14,7 +14,7 @@ class ChapterAdmin(admin.ModelAdmin):
 
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
-    list_display = ['chapter', 'difficulty', 'text_preview', 'is_active', 'created_at']
+    list_display = ['chapter', 'difficulty', 'irt_difficulty', 'text_preview', 'is_active', 'created_at']
     list_filter = ['chapter', 'difficulty', 'is_active', 'created_at']
     search_fields = ['text', 'external_id']
     
@@ -36,5 +36,17 @@ class QuestionAttemptAdmin(admin.ModelAdmin):
     list_display = ['quiz_session', 'question_index', 'difficulty_at_attempt', 'is_correct', 'attention_ratio']
     list_filter = ['difficulty_at_attempt', 'is_correct', 'flagged_low_attention']
     search_fields = ['quiz_session__user__email']
-    readonly_fields = ['id']
+    readonly_fields = ['id', 'raw_attention_trace']
 
+
+@admin.register(AnswerBatch)
+class AnswerBatchAdmin(admin.ModelAdmin):
+    list_display = ['quiz_session', 'num_answers', 'idempotency_key', 'created_at']
+    search_fields = ['quiz_session__user__email']
+    readonly_fields = ['created_at']
+
+
+@admin.register(CalibrationCheckpoint)
+class CalibrationCheckpointAdmin(admin.ModelAdmin):
+    list_display = ['chapter', 'last_session_ended_at', 'sessions_processed', 'responses_processed', 'updated_at']
+    readonly_fields = ['updated_at']
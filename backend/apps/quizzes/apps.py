@@ -0,0 +1,13 @@
+"""
+App configuration for Quiz app
+"""
+from django.apps import AppConfig
+
+
+class QuizzesConfig(AppConfig):
+    name = 'apps.quizzes'
+    label = 'quizzes'
+
+    def ready(self):
+        # Register signal handlers
+        from . import signals  # noqa: F401
@@ -0,0 +1,221 @@
+"""
+Async views for Quiz app
+
+Native async versions of the start, answer, summary and session list
+endpoints, routed instead of those in views.py when QUIZ_ASYNC_VIEWS is on
+(serve the project with an ASGI server then). DRF only has sync views, so
+these are plain Django async views that reuse DRF's parsers,
+authentication and serializers and the helpers in views.py, and answer
+with the same JSON.
+"""
+import functools
+from asgiref.sync import sync_to_async
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed, MethodNotAllowed, NotAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404
+from django.views.decorators.csrf import csrf_exempt
+from .models import Chapter, QuizSession
+from .pagination import SessionKeysetPagination
+from .renderers import format_sse
+from .serializers import AnswerSubmissionSerializer, QuizSessionSerializer, StartSessionSerializer
+from .services.llm_client import astream_quiz_summary
+from .services.summary_builder import abuild_session_summary
+from .services.summary_jobs import aclaim_summary, arelease_summary_claim, arequest_summary
+from .views import (
+    _answer, _cache_started_session, _filtered_sessions, _first_question, _new_session,
+    _started_response, _summary_response_data
+)
+
+
+def async_api_view(http_method_names):
+    """
+    ``@api_view`` with ``IsAuthenticated`` for async views: the view gets
+    a DRF Request, and returned Responses and raised API exceptions are
+    rendered as JSON the way DRF renders them.
+    """
+    def decorator(view):
+        @csrf_exempt
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            request = Request(
+                request,
+                parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES],
+                authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+            )
+            try:
+                if request.method not in http_method_names:
+                    raise MethodNotAllowed(request.method)
+                # Token authentication only; LazyJWTAuthentication reads no rows
+                if not request.user.is_authenticated:
+                    raise NotAuthenticated()
+                response = await view(request, *args, **kwargs)
+            except (APIException, Http404) as exc:
+                response = _exception_response(request, exc)
+            
+            if isinstance(response, Response):
+                response.accepted_renderer = JSONRenderer()
+                response.accepted_media_type = JSONRenderer.media_type
+                response.renderer_context = {'request': request, 'response': response}
+                response.render()
+            return response
+        return wrapper
+    return decorator
+
+
+def _exception_response(request: Request, exc) -> Response:
+    if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+        # As APIView does: 401 with the challenge, so clients know to log in
+        exc.auth_header = request.authenticators[0].authenticate_header(request)
+    return exception_handler(exc, {'request': request})
+
+
+@async_api_view(['POST'])
+async def start_session_view(request):
+    """
+    POST /api/quizzes/sessions/start/
+    Start a new quiz session
+    """
+    serializer = StartSessionSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    
+    chapter = await aget_object_or_404(
+        Chapter, slug=serializer.validated_data['chapter_slug'], is_active=True
+    )
+    
+    # A planned session's plan may need the chapter's questions loaded
+    session = await sync_to_async(_new_session)(request, chapter, serializer.validated_data)
+    question = await sync_to_async(_first_question)(session)
+    
+    if not question:
+        return Response(
+            {'error': 'No questions available for this chapter'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    await session.asave()
+    await sync_to_async(_cache_started_session)(session, question)
+    
+    return _started_response(session, chapter, question)
+
+
+@async_api_view(['POST'])
+async def submit_answer_view(request, quiz_session_id):
+    """
+    POST /api/quizzes/sessions/{quiz_session_id}/answer/
+    Submit an answer and get the next question (see views.submit_answer_view)
+    
+    The answer is recorded in one transaction, which the async ORM can't
+    run, so it runs in the ORM's thread. There is nothing to read before it:
+    with cached state the answer reads no rows, and without it the session
+    row has to be read locked, inside the transaction.
+    """
+    serializer = AnswerSubmissionSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    
+    return await sync_to_async(_answer, thread_sensitive=True)(
+        request, quiz_session_id, serializer.validated_data
+    )
+
+
+@async_api_view(['GET'])
+async def get_summary_view(request, quiz_session_id):
+    """
+    GET /api/quizzes/sessions/{quiz_session_id}/summary/
+    Get quiz session summary with LLM feedback (summary_status: pending/ready)
+    """
+    session = await aget_object_or_404(
+        QuizSession.objects.select_related('chapter'), id=quiz_session_id
+    )
+    if session.user_id != request.user.pk:
+        return Response(
+            {'error': 'Permission denied'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    summary_data = await abuild_session_summary(session)
+    summary_status = await arequest_summary(session)
+    
+    return Response(_summary_response_data(session, summary_data, summary_status))
+
+
+@async_api_view(['GET'])
+async def stream_summary_view(request, quiz_session_id):
+    """
+    GET /api/quizzes/sessions/{quiz_session_id}/summary/stream/
+    Server-Sent Events variant of the summary endpoint (see
+    views.stream_summary_view). The feedback is streamed from the async LLM
+    client, so a slow LLM ties up no thread; errors are returned as JSON.
+    """
+    session = await aget_object_or_404(
+        QuizSession.objects.select_related('chapter'), id=quiz_session_id
+    )
+    if session.user_id != request.user.pk:
+        return Response(
+            {'error': 'Permission denied'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    summary_data = await abuild_session_summary(session)
+    
+    response = StreamingHttpResponse(
+        _summary_events(session, summary_data),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Don't let nginx buffer the stream
+    return response
+
+
+async def _summary_events(session: QuizSession, summary_data: dict):
+    """Yield the SSE events for stream_summary_view"""
+    yield format_sse('stats', {
+        'session': QuizSessionSerializer(session).data,
+        'per_question_stats': summary_data['per_question_stats'],
+        'difficulty_breakdown': summary_data['difficulty_breakdown'],
+    })
+    
+    # Already generated, or a background job owns it: nothing to stream
+    if session.summary_text or not await aclaim_summary(session.pk, status='running'):
+        yield format_sse('done', {
+            'llm_summary': session.summary_text,
+            'summary_status': 'ready' if session.summary_text else 'pending',
+        })
+        return
+    
+    completed = False
+    try:
+        async for text in astream_quiz_summary(session, summary_data):
+            yield format_sse('token', {'text': text})
+        completed = True
+    finally:
+        if not completed:
+            # Client went away mid-stream; let the next request retry
+            await arelease_summary_claim(session.pk)
+    
+    yield format_sse('done', {
+        'llm_summary': session.summary_text,
+        'summary_status': 'ready',
+    })
+
+
+@async_api_view(['GET'])
+async def list_sessions_view(request):
+    """
+    GET /api/quizzes/sessions/
+    List the current user's quiz sessions, newest first, one page at a time
+    (see views.list_sessions_view for the query params)
+    """
+    sessions, error = _filtered_sessions(request)
+    if error is not None:
+        return error
+    
+    paginator = SessionKeysetPagination()
+    page = await paginator.apaginate_queryset(sessions, request)
+    serializer = QuizSessionSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
@@ -0,0 +1,489 @@
+"""
+Quiz Lifecycle Benchmark
+Seeds a quiz bank, drives register -> login -> start -> answers -> summary
+for many simulated students at once and compares the results with a saved
+baseline. Used by the ``benchmark_quiz`` command.
+"""
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.utils import timezone
+
+from .models import Chapter, Question, QuizSession
+
+
+STEPS = ('register', 'login', 'start', 'answer', 'summary')
+QUANTILES = (0.5, 0.95, 0.99)
+
+SEED_PREFIX = 'bench'
+PASSWORD = 'Bench-pass-2024!'
+FAKE_SUMMARY = 'Solid work overall. Revisit the hard questions you missed and keep your focus steady.'
+
+
+class FakeLLMServer:
+    """
+    OpenAI-compatible ``/chat/completions`` endpoint on a local port that
+    answers every request with a canned summary after ``delay`` seconds,
+    streamed in a few chunks when the request asks for it.
+    """
+
+    def __init__(self, delay: float = 0.2, port: int = 0):
+        delay_seconds = delay
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                time.sleep(delay_seconds)
+                if body.get('stream'):
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/event-stream')
+                    self.end_headers()
+                    for word in FAKE_SUMMARY.split(' '):
+                        chunk = {
+                            'id': 'bench', 'object': 'chat.completion.chunk', 'created': 0, 'model': body['model'],
+                            'choices': [{'index': 0, 'delta': {'content': word + ' '}, 'finish_reason': None}],
+                        }
+                        self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode('utf-8'))
+                    self.wfile.write(b'data: [DONE]\n\n')
+                    return
+
+                payload = json.dumps({
+                    'id': 'bench', 'object': 'chat.completion', 'created': 0, 'model': body['model'],
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': FAKE_SUMMARY},
+                        'finish_reason': 'stop',
+                    }],
+                    'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+                }).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def __enter__(self) -> 'FakeLLMServer':
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def seed_question_bank(chapters: int, questions_per_difficulty: int, seed: int = 0) -> List[str]:
+    """Create (or reuse) the benchmark chapters and questions; returns the chapter slugs"""
+    rng = random.Random(seed)
+    slugs = []
+    for number in range(1, chapters + 1):
+        chapter, _ = Chapter.objects.update_or_create(
+            slug=f'{SEED_PREFIX}-chapter-{number}',
+            defaults={'name': f'Benchmark Chapter {number}', 'is_active': True},
+        )
+        slugs.append(chapter.slug)
+        questions = []
+        for difficulty in ('easy', 'medium', 'hard'):
+            for index in range(questions_per_difficulty):
+                questions.append(Question(
+                    chapter=chapter,
+                    external_id=f'{SEED_PREFIX}-{difficulty}-{index}',
+                    text=f'Benchmark {difficulty} question {index} of chapter {number}?',
+                    options=[f'Option {letter}' for letter in 'ABCD'],
+                    correct_option_index=rng.randrange(4),
+                    difficulty=difficulty,
+                ))
+        Question.objects.bulk_create(questions, ignore_conflicts=True)
+    return slugs
+
+
+def remove_seed_data() -> None:
+    """Delete the benchmark students, their sessions and the benchmark chapters"""
+    users = get_user_model().objects.filter(email__startswith=f'{SEED_PREFIX}-')
+    QuizSession.objects.filter(user__in=users).delete()
+    QuizSession.objects.filter(chapter__slug__startswith=f'{SEED_PREFIX}-chapter-').delete()
+    users.delete()
+    Chapter.objects.filter(slug__startswith=f'{SEED_PREFIX}-chapter-').delete()
+
+
+class TestClientTransport:
+    """
+    Calls the app in-process through Django's test client (WSGI), on the
+    caller's thread or, like a threaded WSGI server, on ``workers``
+    """
+
+    def __init__(self, workers: Optional[ThreadPoolExecutor] = None):
+        from django.test import Client
+        self.client = Client()
+        self.workers = workers
+
+    def request(self, method: str, path: str, body: Optional[dict] = None, token: Optional[str] = None):
+        if self.workers is not None:
+            return self.workers.submit(self._request, method, path, body, token).result()
+        return self._request(method, path, body, token)
+
+    def _request(self, method: str, path: str, body: Optional[dict], token: Optional[str]):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        if method == 'GET':
+            response = self.client.get(path, **headers)
+        else:
+            response = self.client.post(path, body or {}, content_type='application/json', **headers)
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, _parse(response.get('Content-Type'), content)
+
+    def get_text(self, path: str) -> Optional[str]:
+        response = self.client.get(path)
+        return response.content.decode('utf-8') if response.status_code == 200 else None
+
+    def close(self) -> None:
+        pass
+
+
+class EventLoopThread:
+    """An event loop on a daemon thread; every ASGITransport on it shares it like one ASGI worker"""
+
+    def __enter__(self) -> asyncio.AbstractEventLoop:
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        return self.loop
+
+    def __exit__(self, *exc_info):
+        # Cancel what is left, as asyncio.run() does, so it can clean up (the async LLM client closes then)
+        asyncio.run_coroutine_threadsafe(self._cancel_tasks(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    @staticmethod
+    async def _cancel_tasks() -> None:
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class ASGITransport:
+    """Calls the app in-process through Django's ASGI handler (the async test client) on ``loop``"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        from django.test import AsyncClient
+        self.client = AsyncClient()
+        self.loop = loop
+
+    def request(self, method: str, path: str, body: Optional[dict] = None, token: Optional[str] = None):
+        return asyncio.run_coroutine_threadsafe(self._request(method, path, body, token), self.loop).result()
+
+    async def _request(self, method: str, path: str, body: Optional[dict], token: Optional[str]):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        if method == 'GET':
+            response = await self.client.get(path, headers=headers)
+        else:
+            response = await self.client.post(path, body or {}, content_type='application/json', headers=headers)
+        if not response.streaming:
+            content = response.content
+        elif response.is_async:
+            content = b''.join([chunk async for chunk in response.streaming_content])
+        else:
+            content = await sync_to_async(b''.join)(response.streaming_content)
+        return response.status_code, _parse(response.get('Content-Type'), content)
+
+    def get_text(self, path: str) -> Optional[str]:
+        return TestClientTransport().get_text(path)
+
+    def close(self) -> None:
+        pass
+
+
+class HTTPTransport:
+    """Calls a running server over HTTP"""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method: str, path: str, body: Optional[dict] = None, token: Optional[str] = None):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                return response.status, _parse(response.headers.get('Content-Type'), response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, _parse(e.headers.get('Content-Type'), e.read())
+
+    def get_text(self, path: str) -> Optional[str]:
+        try:
+            with urllib.request.urlopen(self.base_url + path, timeout=60) as response:
+                return response.read().decode('utf-8')
+        except urllib.error.URLError:
+            return None
+
+    def close(self) -> None:
+        pass
+
+
+class Recorder:
+    """Thread-safe latency samples and error counts per lifecycle step"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {step: [] for step in STEPS}
+        self.errors: Dict[str, int] = {step: 0 for step in STEPS}
+        self.summary_ready: List[float] = []
+        self.completed = 0
+
+    def call(self, step: str, transport, method: str, path: str, body=None, token=None, expect=200):
+        started = time.perf_counter()
+        status_code, data = transport.request(method, path, body, token)
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.latencies[step].append(elapsed)
+            if status_code != expect:
+                self.errors[step] += 1
+        if status_code != expect:
+            raise LifecycleError(f'{step}: HTTP {status_code} {data}')
+        return data
+
+
+class LifecycleError(Exception):
+    """A step of a simulated student's lifecycle returned an unexpected status"""
+
+
+def run_student(
+    transport,
+    recorder: Recorder,
+    email: str,
+    chapter_slug: str,
+    answers: int,
+    rng: random.Random,
+    summary: str = 'poll',
+    summary_timeout: float = 30.0,
+) -> None:
+    """
+    One student: register, log in, answer up to ``answers`` questions, then
+    poll the summary endpoint until it is ready or, with ``summary='stream'``,
+    read the streamed summary (polling if a background job owns it)
+    """
+    recorder.call('register', transport, 'POST', '/api/auth/register/', {
+        'email': email, 'password': PASSWORD, 'password_confirm': PASSWORD,
+    }, expect=201)
+    token = recorder.call('login', transport, 'POST', '/api/auth/login/', {
+        'email': email, 'password': PASSWORD,
+    })['access']
+
+    data = recorder.call('start', transport, 'POST', '/api/quizzes/sessions/start/', {
+        'chapter_slug': chapter_slug, 'max_questions': answers, 'webgazer_enabled': True,
+    }, token=token, expect=201)
+    session_id = data['quiz_session_id']
+    question, index = data['question'], data['current_question_index']
+
+    while True:
+        now = timezone.now().isoformat()
+        data = recorder.call('answer', transport, 'POST', f'/api/quizzes/sessions/{session_id}/answer/', {
+            'question_id': question['id'],
+            'question_index': index,
+            'started_at': now,
+            'submitted_at': now,
+            'response_time_ms': rng.randint(3000, 90000),
+            'selected_option_index': rng.randrange(4),
+            'attention_metrics': _attention_metrics(rng),
+        }, token=token)
+        if not data['has_more']:
+            break
+        question, index = data['question'], data['next_question_index']
+
+    started = time.perf_counter()
+    if summary == 'stream':
+        events = recorder.call('summary', transport, 'GET', f'/api/quizzes/sessions/{session_id}/summary/stream/', token=token)
+        ready = events.get('done', {}).get('summary_status') == 'ready'
+    else:
+        ready = False
+    while not ready:
+        data = recorder.call('summary', transport, 'GET', f'/api/quizzes/sessions/{session_id}/summary/', token=token)
+        if data['summary_status'] == 'ready':
+            break
+        if time.perf_counter() - started > summary_timeout:
+            raise LifecycleError('summary: not ready in time')
+        time.sleep(0.05)
+    with recorder.lock:
+        recorder.summary_ready.append(time.perf_counter() - started)
+        recorder.completed += 1
+
+
+def run_benchmark(
+    transport_factory: Callable[[], object],
+    chapter_slugs: List[str],
+    users: int,
+    concurrency: int,
+    answers: int,
+    seed: int = 0,
+    summary: str = 'poll',
+) -> Tuple[Recorder, float, List[str]]:
+    """Run ``users`` student lifecycles on ``concurrency`` threads; returns (recorder, seconds, failures)"""
+    recorder = Recorder()
+    failures = []
+    run_id = f'{int(time.time())}{random.Random(seed).randrange(10 ** 6)}'
+
+    def student(number: int) -> None:
+        transport = transport_factory()
+        try:
+            run_student(
+                transport,
+                recorder,
+                email=f'{SEED_PREFIX}-{run_id}-{number}@example.com',
+                chapter_slug=chapter_slugs[number % len(chapter_slugs)],
+                answers=answers,
+                rng=random.Random(seed * 100003 + number),
+                summary=summary,
+            )
+        except LifecycleError as e:
+            failures.append(str(e))
+        finally:
+            transport.close()
+            connections.close_all()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(student, range(users)))
+    return recorder, time.perf_counter() - started, failures
+
+
+def queries_per_request(before: Optional[str], after: Optional[str]) -> Optional[Dict[str, float]]:
+    """Mean DB queries per request by view between two /metrics scrapes, or None without metrics"""
+    if after is None:
+        return None
+    start = _metric_totals(before or '', 'quiz_db_queries')
+    result = {}
+    for view, (total, count) in _metric_totals(after, 'quiz_db_queries').items():
+        previous_total, previous_count = start.get(view, (0.0, 0))
+        if count > previous_count:
+            result[view] = round((total - previous_total) / (count - previous_count), 2)
+    return result
+
+
+def build_report(recorder: Recorder, elapsed: float, queries: Optional[Dict[str, float]], config: dict) -> dict:
+    steps = {}
+    for step in STEPS:
+        samples = sorted(recorder.latencies[step])
+        steps[step] = {
+            'requests': len(samples),
+            'errors': recorder.errors[step],
+            **{f'p{int(q * 100)}_ms': _percentile(samples, q) for q in QUANTILES},
+        }
+    requests = sum(len(samples) for samples in recorder.latencies.values())
+    return {
+        'config': config,
+        'elapsed_seconds': round(elapsed, 3),
+        'completed_lifecycles': recorder.completed,
+        'lifecycles_per_second': round(recorder.completed / elapsed, 3) if elapsed else 0.0,
+        'requests_per_second': round(requests / elapsed, 2) if elapsed else 0.0,
+        'summary_ready_p95_ms': _percentile(sorted(recorder.summary_ready), 0.95),
+        'steps': steps,
+        'queries_per_request': queries,
+    }
+
+
+def compare_reports(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Regressions of ``report`` against ``baseline``: a step's p95 latency or
+    the overall throughput worse by more than ``tolerance`` (a fraction),
+    any view issuing more queries per request, or new errors.
+    """
+    regressions = []
+    if report['config'] != baseline.get('config'):
+        regressions.append('benchmark configuration differs from the baseline; results are not comparable')
+
+    for step, current in report['steps'].items():
+        previous = baseline.get('steps', {}).get(step)
+        if previous is None:
+            continue
+        if current['errors'] > previous['errors']:
+            regressions.append(f"{step}: {current['errors']} errors (baseline {previous['errors']})")
+        if previous['p95_ms'] and current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{step}: p95 {current['p95_ms']}ms (baseline {previous['p95_ms']}ms)")
+
+    if report['requests_per_second'] < baseline.get('requests_per_second', 0) * (1 - tolerance):
+        regressions.append(
+            f"throughput {report['requests_per_second']} req/s (baseline {baseline['requests_per_second']} req/s)"
+        )
+
+    for view, queries in (report.get('queries_per_request') or {}).items():
+        previous = (baseline.get('queries_per_request') or {}).get(view)
+        # Query counts vary slightly with randomness (cache misses, retries)
+        if previous is not None and queries > previous + 0.5:
+            regressions.append(f'{view}: {queries} queries per request (baseline {previous})')
+    return regressions
+
+
+def _attention_metrics(rng: random.Random) -> dict:
+    samples = 40
+    on_task = [rng.random() < 0.85 for _ in range(samples)]
+    return {
+        'attention_ratio': sum(on_task) / samples,
+        'off_screen_ratio': rng.random() * 0.2,
+        'off_screen_duration_ms': rng.randint(0, 2000),
+        'num_gaze_samples': samples,
+        'num_on_task_samples': sum(on_task),
+        'num_off_task_samples': samples - sum(on_task),
+        'raw_attention_trace': [{'t_ms': i * 100, 'on_task': flag} for i, flag in enumerate(on_task)],
+    }
+
+
+def _metric_totals(text: str, name: str) -> Dict[str, Tuple[float, int]]:
+    totals: Dict[str, List] = {}
+    pattern = re.compile(rf'^{name}_(sum|count){{view="([^"]*)"}} (\S+)$', re.M)
+    for kind, view, value in pattern.findall(text):
+        entry = totals.setdefault(view, [0.0, 0])
+        if kind == 'sum':
+            entry[0] = float(value)
+        else:
+            entry[1] = int(float(value))
+    return {view: (total, count) for view, (total, count) in totals.items()}
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    """Nearest-rank percentile of sorted samples, in milliseconds"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(q * len(samples) + 0.5)) - 1))
+    return round(samples[index] * 1000, 2)
+
+
+def _parse(content_type: Optional[str], content: bytes):
+    """JSON bodies as loaded; event streams as {event: data of its last occurrence}"""
+    if content_type and content_type.startswith('text/event-stream'):
+        events = {}
+        for block in content.decode('utf-8').split('\n\n'):
+            fields = dict(line.split(': ', 1) for line in block.splitlines() if ': ' in line)
+            if 'event' in fields:
+                events[fields['event']] = _parse('application/json', fields.get('data', '').encode('utf-8'))
+        return events
+    try:
+        return json.loads(content)
+    except ValueError:
+        return None
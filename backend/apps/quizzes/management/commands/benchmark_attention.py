@@ -0,0 +1,150 @@
+"""
+Management command to benchmark server-side attention metrics
+"""
+import base64
+import json
+import math
+import random
+import struct
+import time
+from django.core.management.base import BaseCommand, CommandError
+from apps.quizzes.services.attention import FORMAT_VERSION, attention_metrics_from_batch
+from apps.quizzes.services.attention_trace import encode_samples
+
+# Question box of the synthetic samples, in CSS pixels
+QUESTION_BOX = (200.0, 150.0, 1000.0, 650.0)
+
+
+class Command(BaseCommand):
+    help = (
+        'Time decoding packed gaze samples and computing their attention metrics against '
+        'parsing the same samples as JSON objects and computing them sample by sample'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--samples',
+            type=int,
+            nargs='+',
+            default=[500, 2000, 5000, 20000],
+            help='Gaze samples per question to time (default: 500 2000 5000 20000)',
+        )
+        parser.add_argument('--iterations', type=int, default=200, help='Runs per size (default: 200)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the samples')
+    
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        iterations = options['iterations']
+        
+        self.stdout.write(
+            f"{'samples':>8}{'packed KB':>11}{'JSON KB':>9}{'packed ms':>11}{'JSON ms':>9}{'speedup':>9}"
+        )
+        for count in options['samples']:
+            samples = _synthetic_samples(rng, count)
+            packed_body = json.dumps({'gaze_samples': _pack(samples, QUESTION_BOX)})
+            json_body = json.dumps({'samples': samples, 'question_box': QUESTION_BOX})
+            
+            packed_metrics = attention_metrics_from_batch(json.loads(packed_body)['gaze_samples'])
+            reference_metrics = _reference_metrics(**json.loads(json_body))
+            if packed_metrics != reference_metrics:
+                raise CommandError(f'Metrics differ for {count} samples: {packed_metrics} != {reference_metrics}')
+            
+            packed_seconds = _time(lambda: attention_metrics_from_batch(json.loads(packed_body)['gaze_samples']), iterations)
+            json_seconds = _time(lambda: _reference_metrics(**json.loads(json_body)), iterations)
+            self.stdout.write(
+                f'{count:>8}{len(packed_body) / 1024:>11.1f}{len(json_body) / 1024:>9.1f}'
+                f'{packed_seconds * 1000:>11.3f}{json_seconds * 1000:>9.3f}{json_seconds / packed_seconds:>8.1f}x'
+            )
+        
+        self.stdout.write(self.style.SUCCESS('Packed and per-sample metrics agree for every size'))
+
+
+def _synthetic_samples(rng, count):
+    """About 30 Hz of gaze wandering over the page, off screen now and then"""
+    samples = []
+    t_ms = 0
+    x, y = 600.0, 400.0
+    off_screen = 0
+    for _ in range(count):
+        t_ms += rng.randint(25, 45)
+        if off_screen:
+            off_screen -= 1
+            samples.append({'x': None, 'y': None, 'timestamp': t_ms})
+            continue
+        if rng.random() < 0.01:
+            off_screen = rng.randint(5, 40)
+        x = min(max(x + rng.gauss(0, 40), 0.0), 1280.0)
+        y = min(max(y + rng.gauss(0, 30), 0.0), 800.0)
+        samples.append({'x': round(x, 1), 'y': round(y, 1), 'timestamp': t_ms})
+    return samples
+
+
+def _pack(samples, question_box):
+    """The browser's packing of ``samples`` (see services.attention)"""
+    count = len(samples)
+    t0 = samples[0]['timestamp']
+    data = struct.pack(
+        f'<{count}I{count}f{count}f',
+        *(sample['timestamp'] - t0 for sample in samples),
+        *(math.nan if sample['x'] is None else sample['x'] for sample in samples),
+        *(math.nan if sample['y'] is None else sample['y'] for sample in samples),
+    )
+    return {
+        'format': FORMAT_VERSION,
+        'count': count,
+        'question_box': list(question_box),
+        'data': base64.b64encode(data).decode('ascii'),
+    }
+
+
+def _reference_metrics(samples, question_box):
+    """The same metrics computed one sample at a time, as the browser did"""
+    left, top, right, bottom = question_box
+    # Packed coordinates are float32
+    as_float32 = struct.Struct('<f')
+    
+    num_on_task = 0
+    num_off_screen = 0
+    off_screen_duration_ms = 0
+    flags = []
+    for index, sample in enumerate(samples):
+        if sample['x'] is None or sample['y'] is None:
+            num_off_screen += 1
+            if index:
+                off_screen_duration_ms += sample['timestamp'] - samples[index - 1]['timestamp']
+            flags.append(False)
+            continue
+        x = as_float32.unpack(as_float32.pack(sample['x']))[0]
+        y = as_float32.unpack(as_float32.pack(sample['y']))[0]
+        on_task = left <= x <= right and top <= y <= bottom
+        num_on_task += on_task
+        flags.append(on_task)
+    
+    total = len(samples)
+    num_off_task = total - num_on_task
+    attention_ratio = num_on_task / total
+    if num_off_task > num_on_task * 2:
+        attention_ratio *= 0.7
+    t0 = samples[0]['timestamp']
+    return {
+        'attention_ratio': attention_ratio,
+        'off_screen_ratio': num_off_screen / total,
+        'off_screen_duration_ms': off_screen_duration_ms,
+        'num_gaze_samples': total,
+        'num_on_task_samples': num_on_task,
+        'num_off_task_samples': num_off_task,
+        'attention_trace': encode_samples(
+            [sample['timestamp'] - t0 for sample in samples[::10]], flags[::10]
+        ),
+    }
+
+
+def _time(func, iterations):
+    """Best-of-three mean seconds per call"""
+    best = math.inf
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        best = min(best, (time.perf_counter() - started) / iterations)
+    return best
@@ -0,0 +1,228 @@
+"""
+Management command to benchmark the quiz lifecycle under concurrent load
+"""
+import importlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import clear_url_caches
+from apps.quizzes.benchmark import (
+    ASGITransport, EventLoopThread, FakeLLMServer, HTTPTransport, TestClientTransport, build_report,
+    compare_reports, queries_per_request, remove_seed_data, run_benchmark, seed_question_bank
+)
+from apps.quizzes.services.llm_client import reset_llm_client
+from apps.quizzes.services.summary_cache import reset_summary_cache
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive register -> login -> start -> answers -> summary for many students concurrently '
+        'and report throughput, latency percentiles and queries per request'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help='Simulated students (default: 20)')
+        parser.add_argument('--concurrency', type=int, default=4, help='Students running at once (default: 4)')
+        parser.add_argument('--answers', type=int, default=10, help='Questions per session (default: 10)')
+        parser.add_argument('--chapters', type=int, default=2, help='Benchmark chapters to seed (default: 2)')
+        parser.add_argument(
+            '--questions',
+            type=int,
+            default=30,
+            help='Questions per difficulty per chapter (default: 30)',
+        )
+        parser.add_argument(
+            '--llm-delay',
+            type=float,
+            default=0.2,
+            help='Seconds the fake LLM takes per summary (default: 0.2)',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the bank and the answers')
+        parser.add_argument(
+            '--summary',
+            choices=['poll', 'stream'],
+            default='poll',
+            help='Poll the summary endpoint until the background job is done, or read the '
+                 'streamed summary (default: poll)',
+        )
+        parser.add_argument(
+            '--interface',
+            choices=['wsgi', 'asgi'],
+            default='wsgi',
+            help="In-process only: call the sync views through Django's WSGI handler, or the async "
+                 "views (QUIZ_ASYNC_VIEWS) through its ASGI handler on one event loop (default: wsgi)",
+        )
+        parser.add_argument(
+            '--wsgi-threads',
+            type=int,
+            default=0,
+            help='In-process WSGI only: serve requests on this many threads, like a threaded WSGI '
+                 'server (default: 0, a thread per running student)',
+        )
+        parser.add_argument(
+            '--no-summary-cache',
+            action='store_true',
+            help='Turn off the LLM summary cache, so every summary waits for the fake LLM',
+        )
+        parser.add_argument(
+            '--server',
+            help='Benchmark a running server at this URL instead of the app in-process. It must share '
+                 'this database (benchmark data is seeded here and removed afterwards), use the fake '
+                 'LLM printed at startup, and have METRICS_ENABLED for query counts',
+        )
+        parser.add_argument('--llm-port', type=int, default=0, help='Port for the fake LLM (default: any free port)')
+        parser.add_argument('--save', help='Write the report to this JSON file (e.g. as a new baseline)')
+        parser.add_argument('--compare', help='Baseline JSON to compare against; exits with an error on regressions')
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.25,
+            help='Allowed slowdown of p95 latency and throughput before it counts as a regression (default: 0.25)',
+        )
+    
+    def handle(self, *args, **options):
+        config = {
+            key: options[key] for key in (
+                'users', 'concurrency', 'answers', 'chapters', 'questions', 'llm_delay', 'seed', 'summary',
+                'no_summary_cache',
+            )
+        }
+        config['mode'] = 'server' if options['server'] else 'in-process'
+        if not options['server']:
+            config['interface'] = options['interface']
+            if options['interface'] == 'wsgi':
+                config['wsgi_threads'] = options['wsgi_threads']
+        
+        with FakeLLMServer(options['llm_delay'], options['llm_port']) as llm:
+            self.stdout.write(f'Fake LLM listening at {llm.base_url}')
+            if options['server']:
+                report = self._run_against_server(options, config)
+            else:
+                report = self._run_in_process(options, config, llm)
+        
+        self._print_report(report)
+        
+        if options['save']:
+            with open(options['save'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Saved report to {options['save']}")
+        
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as f:
+                baseline = json.load(f)
+            regressions = compare_reports(report, baseline, options['tolerance'])
+            if regressions:
+                for regression in regressions:
+                    self.stdout.write(self.style.ERROR(f'  {regression}'))
+                raise CommandError(f'{len(regressions)} regression(s) against {options["compare"]}')
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['compare']}"))
+    
+    def _run_in_process(self, options, config, llm):
+        """Run against a throwaway test database with the fake LLM and metrics enabled"""
+        test_settings = dict(
+            OPENROUTER_BASE_URL=llm.base_url,
+            OPENROUTER_API_KEY='benchmark',
+            METRICS_ENABLED=True,
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            # Registration and login would otherwise be dominated by password hashing
+            PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+            # So the LLM cap doesn't hide the difference between the interfaces
+            LLM_MAX_CONCURRENCY=max(settings.LLM_MAX_CONCURRENCY, options['concurrency']),
+            QUIZ_ASYNC_VIEWS=options['interface'] == 'asgi',
+        )
+        if options['no_summary_cache']:
+            test_settings['LLM_SUMMARY_CACHE_BACKEND'] = 'none'
+        database = connection.settings_dict
+        if connection.vendor == 'sqlite' and not database['TEST'].get('NAME'):
+            # A file rather than the shared in-memory database, whose table
+            # locks fail concurrent writers instead of waiting for them
+            database['TEST']['NAME'] = f"{database['NAME']}.benchmark"
+        
+        with ExitStack() as stack:
+            # Registered first, so they run once the settings are restored
+            stack.callback(_reload_urlconfs)
+            stack.callback(reset_summary_cache)
+            stack.callback(reset_llm_client)
+            stack.enter_context(override_settings(**test_settings))
+            reset_llm_client()
+            reset_summary_cache()
+            _reload_urlconfs()
+            
+            if options['interface'] == 'asgi':
+                loop = stack.enter_context(EventLoopThread())
+                transport_factory = lambda: ASGITransport(loop)
+            elif options['wsgi_threads']:
+                workers = stack.enter_context(ThreadPoolExecutor(max_workers=options['wsgi_threads']))
+                transport_factory = lambda: TestClientTransport(workers)
+            else:
+                transport_factory = TestClientTransport
+            
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                chapter_slugs = seed_question_bank(options['chapters'], options['questions'], options['seed'])
+                transport = TestClientTransport()
+                before = transport.get_text('/metrics')
+                recorder, elapsed, failures = run_benchmark(
+                    transport_factory, chapter_slugs, options['users'], options['concurrency'],
+                    options['answers'], options['seed'], options['summary'],
+                )
+                queries = queries_per_request(before, transport.get_text('/metrics'))
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+        
+        self._print_failures(failures)
+        return build_report(recorder, elapsed, queries, config)
+    
+    def _run_against_server(self, options, config):
+        base_url = options['server']
+        chapter_slugs = seed_question_bank(options['chapters'], options['questions'], options['seed'])
+        try:
+            transport = HTTPTransport(base_url)
+            before = transport.get_text('/metrics')
+            recorder, elapsed, failures = run_benchmark(
+                lambda: HTTPTransport(base_url), chapter_slugs, options['users'], options['concurrency'],
+                options['answers'], options['seed'], options['summary'],
+            )
+            queries = queries_per_request(before, transport.get_text('/metrics'))
+            transport.close()
+        finally:
+            remove_seed_data()
+        
+        self._print_failures(failures)
+        return build_report(recorder, elapsed, queries, config)
+    
+    def _print_failures(self, failures):
+        for failure in failures[:10]:
+            self.stdout.write(self.style.WARNING(f'  {failure}'))
+        if len(failures) > 10:
+            self.stdout.write(self.style.WARNING(f'  ... and {len(failures) - 10} more'))
+    
+    def _print_report(self, report):
+        self.stdout.write(
+            f"{report['completed_lifecycles']}/{report['config']['users']} lifecycles in "
+            f"{report['elapsed_seconds']}s: {report['lifecycles_per_second']} lifecycles/s, "
+            f"{report['requests_per_second']} req/s, summary ready p95 {report['summary_ready_p95_ms']}ms"
+        )
+        self.stdout.write(f"{'step':<10}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for step, stats in report['steps'].items():
+            self.stdout.write(
+                f"{step:<10}{stats['requests']:>10}{stats['errors']:>8}"
+                f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}"
+            )
+        if report['queries_per_request'] is not None:
+            self.stdout.write('queries per request:')
+            for view, queries in sorted(report['queries_per_request'].items()):
+                self.stdout.write(f'  {view:<28}{queries:>6}')
+        else:
+            self.stdout.write('queries per request: unavailable (server has METRICS_ENABLED off)')
+
+
+def _reload_urlconfs():
+    """Re-import the URLconfs so a changed QUIZ_ASYNC_VIEWS picks the views"""
+    importlib.reload(importlib.import_module('apps.quizzes.urls'))
+    importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+    clear_url_caches()
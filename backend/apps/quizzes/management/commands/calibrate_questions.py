@@ -0,0 +1,75 @@
+"""
+Management command to calibrate question difficulty from recorded attempts
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from apps.quizzes.models import Chapter
+from apps.quizzes.services.calibration import calibrate_chapter
+
+
+class Command(BaseCommand):
+    help = 'Fit IRT difficulty/discrimination for each question from the attempts of finished sessions'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chapter',
+            dest='chapters',
+            action='append',
+            default=[],
+            help='Only calibrate this chapter slug (can be repeated)',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Refit from every finished session instead of those since the last checkpoint',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of processes calibrating chapters in parallel (default: 1)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Attempts fetched per database round trip (default: 5000)',
+        )
+    
+    def handle(self, *args, **options):
+        chapters = Chapter.objects.all()
+        if options['chapters']:
+            chapters = chapters.filter(slug__in=options['chapters'])
+            missing = set(options['chapters']) - set(chapters.values_list('slug', flat=True))
+            if missing:
+                raise CommandError(f'Unknown chapter(s): {", ".join(sorted(missing))}')
+        chapter_ids = list(chapters.values_list('id', flat=True))
+        
+        started = time.monotonic()
+        kwargs = {'full': options['full'], 'chunk_size': options['chunk_size']}
+        if options['workers'] > 1 and len(chapter_ids) > 1:
+            # Children must open their own connections rather than share ours
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as executor:
+                futures = [executor.submit(calibrate_chapter, chapter_id, **kwargs) for chapter_id in chapter_ids]
+                results = [future.result() for future in as_completed(futures)]
+        else:
+            results = [calibrate_chapter(chapter_id, **kwargs) for chapter_id in chapter_ids]
+        elapsed = time.monotonic() - started
+        
+        for result in sorted(results, key=lambda r: r['chapter']):
+            self.stdout.write(
+                f"{result['chapter']}: {result['responses']} responses from "
+                f"{result['sessions']} sessions, {result['questions']} questions updated"
+            )
+        
+        responses = sum(result['responses'] for result in results)
+        rate = responses / elapsed if elapsed > 0 else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Calibrated {len(results)} chapters: {responses} responses in {elapsed:.1f}s '
+            f'({rate:,.0f} responses/s)'
+        ))
@@ -1,113 +1,155 @@
 """
 Management command to load questions from JSON files
 """
-import json
 import os
-from django.core.management.base import BaseCommand
-from django.conf import settings
-from apps.quizzes.models import Chapter, Question
+import time
+from django.core.management.base import BaseCommand, CommandError
+from apps.quizzes.models import Chapter
+from apps.quizzes.services.question_import import (
+    iter_question_records, load_manifest, preview_new_chapter, upsert_questions
+)
 
 
 class Command(BaseCommand):
-    help = 'Load questions from JSON files in question_bank directory'
-
-    def handle(self, *args, **options):
-        # Ensure chapters exist
-        chapters_data = [
-            {'slug': 'p-block', 'name': 'P-Block', 'description': 'P-Block elements and their properties'},
-            {'slug': 'thermodynamics', 'name': 'Thermodynamics', 'description': 'Thermodynamic principles and laws'},
-            {'slug': 'gaseous-state', 'name': 'Gaseous State', 'description': 'Behavior and properties of gases'},
-            {'slug': 'mole-concept', 'name': 'Mole Concept', 'description': 'Mole concept and stoichiometry'},
-        ]
-        
-        for chapter_data in chapters_data:
-            chapter, created = Chapter.objects.get_or_create(
-                slug=chapter_data['slug'],
-                defaults={
-                    'name': chapter_data['name'],
-                    'description': chapter_data['description'],
-                }
-            )
-            if created:
-                self.stdout.write(self.style.SUCCESS(f'Created chapter: {chapter.name}'))
-            else:
-                self.stdout.write(f'Chapter already exists: {chapter.name}')
-        
-        # Map slugs to filenames
-        chapter_files = {
-            'p-block': 'p_block.json',
-            'thermodynamics': 'thermodynamics.json',
-            'gaseous-state': 'gaseous_state.json',
-            'mole-concept': 'mole_concept.json',
-        }
-        
-        # Load questions from each file
-        question_bank_dir = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
-            'question_bank'
+    help = 'Load questions from the JSON/JSONL files listed in the question bank manifest'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--manifest',
+            default=os.path.join(
+                os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+                'question_bank',
+                'manifest.json'
+            ),
+            help='Path to the manifest listing chapters and their question files',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per bulk upsert statement (default: 1000)',
         )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be created, updated and deactivated without writing',
+        )
+        parser.add_argument(
+            '--keep-missing',
+            action='store_true',
+            help='Do not deactivate questions that are no longer in the source files',
+        )
+    
+    def handle(self, *args, **options):
+        try:
+            chapters_data = load_manifest(options['manifest'])
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'Could not read manifest {options["manifest"]}: {e}')
         
         total_loaded = 0
+        total_rows = 0
+        started = time.perf_counter()
         
-        for slug, filename in chapter_files.items():
-            chapter = Chapter.objects.get(slug=slug)
-            filepath = os.path.join(question_bank_dir, filename)
-            
-            if not os.path.exists(filepath):
-                self.stdout.write(self.style.WARNING(f'File not found: {filepath}'))
-                continue
-            
-            with open(filepath, 'r', encoding='utf-8') as f:
-                questions_data = json.load(f)
-            
-            loaded_count = 0
-            updated_count = 0
-            
-            for q_data in questions_data:
-                # Validate data
-                if len(q_data.get('options', [])) != 4:
-                    self.stdout.write(self.style.WARNING(
-                        f'Skipping question {q_data.get("external_id")}: must have exactly 4 options'
-                    ))
-                    continue
-                
-                if q_data.get('correct_option_index') not in [0, 1, 2, 3]:
-                    self.stdout.write(self.style.WARNING(
-                        f'Skipping question {q_data.get("external_id")}: invalid correct_option_index'
-                    ))
-                    continue
-                
-                if q_data.get('difficulty') not in ['easy', 'medium', 'hard']:
-                    self.stdout.write(self.style.WARNING(
-                        f'Skipping question {q_data.get("external_id")}: invalid difficulty'
-                    ))
-                    continue
-                
-                # Create or update question
-                question, created = Question.objects.update_or_create(
-                    chapter=chapter,
-                    external_id=q_data.get('external_id'),
+        for chapter_data in chapters_data:
+            if options['dry_run']:
+                # Nothing is written, not even a missing chapter
+                chapter = Chapter.objects.filter(slug=chapter_data['slug']).first()
+                if chapter is None:
+                    self.stdout.write(self.style.SUCCESS(f'Would create chapter: {chapter_data["name"]}'))
+                else:
+                    self.stdout.write(f'Chapter already exists: {chapter.name}')
+            else:
+                # Ensure chapter exists
+                chapter, created = Chapter.objects.get_or_create(
+                    slug=chapter_data['slug'],
                     defaults={
-                        'text': q_data['text'],
-                        'options': q_data['options'],
-                        'correct_option_index': q_data['correct_option_index'],
-                        'explanation': q_data.get('explanation', ''),
-                        'difficulty': q_data['difficulty'],
-                        'is_active': True,
+                        'name': chapter_data['name'],
+                        'description': chapter_data['description'],
                     }
                 )
-                
                 if created:
-                    loaded_count += 1
+                    self.stdout.write(self.style.SUCCESS(f'Created chapter: {chapter.name}'))
+                else:
+                    self.stdout.write(f'Chapter already exists: {chapter.name}')
+            chapter_name = chapter.name if chapter is not None else chapter_data['name']
+            
+            filepaths = []
+            for filepath in chapter_data['files']:
+                if not os.path.exists(filepath):
+                    self.stdout.write(self.style.WARNING(f'File not found: {filepath}'))
+                    continue
+                filepaths.append(filepath)
+            
+            if not filepaths:
+                continue
+            
+            # Only deactivate missing questions when the chapter's full source was read
+            complete_source = len(filepaths) == len(chapter_data['files'])
+            
+            chapter_started = time.perf_counter()
+            records = (record for filepath in filepaths for record in iter_question_records(filepath))
+            try:
+                if chapter is None:
+                    changes = preview_new_chapter(records, on_skip=self._report_skip)
                 else:
-                    updated_count += 1
+                    changes = upsert_questions(
+                        chapter,
+                        records,
+                        batch_size=options['batch_size'],
+                        on_skip=self._report_skip,
+                        dry_run=options['dry_run'],
+                        deactivate_missing=complete_source and not options['keep_missing'],
+                    )
+            except ValueError as e:
+                raise CommandError(f'{chapter_name}: invalid question file: {e}')
+            elapsed = time.perf_counter() - chapter_started
             
-            total_loaded += loaded_count
+            rows = sum(len(changes[key]) for key in ('created', 'updated', 'unchanged'))
+            total_loaded += len(changes['created'])
+            total_rows += rows
             self.stdout.write(self.style.SUCCESS(
-                f'{chapter.name}: Loaded {loaded_count} new, updated {updated_count} existing questions'
+                f'{chapter_name}: {"Would load" if options["dry_run"] else "Loaded"} {len(changes["created"])} new, '
+                f'update {len(changes["updated"])} changed, deactivate {len(changes["deactivated"])} missing questions; '
+                f'{len(changes["unchanged"])} unchanged, {len(changes["skipped"])} skipped ({self._rate(rows, elapsed)})'
             ))
+            if changes['duplicates']:
+                self._report_duplicates(changes['duplicates'])
+            if options['dry_run']:
+                self._report_diff(changes)
         
+        elapsed = time.perf_counter() - started
         self.stdout.write(self.style.SUCCESS(
-            f'\nTotal questions loaded: {total_loaded}'
+            f'\nTotal questions loaded: {total_loaded} ({total_rows} rows in {elapsed:.2f}s, '
+            f'{self._rate(total_rows, elapsed)})'
         ))
-
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run: no changes were written'))
+    
+    def _report_diff(self, changes, limit=20):
+        for key, marker in (('created', '+'), ('updated', '~'), ('deactivated', '-')):
+            external_ids = changes[key]
+            for external_id in external_ids[:limit]:
+                self.stdout.write(f'  {marker} {external_id}')
+            if len(external_ids) > limit:
+                self.stdout.write(f'  {marker} ... and {len(external_ids) - limit} more')
+    
+    def _report_duplicates(self, external_ids, limit=20):
+        repeated = sorted(set(external_ids))
+        self.stdout.write(self.style.WARNING(
+            f'{len(repeated)} questions appear more than once in the source; '
+            f'kept the last occurrence of each:'
+        ))
+        for external_id in repeated[:limit]:
+            self.stdout.write(f'  = {external_id}')
+        if len(repeated) > limit:
+            self.stdout.write(f'  = ... and {len(repeated) - limit} more')
+    
+    def _report_skip(self, record, reason):
+        external_id = record.get('external_id') if isinstance(record, dict) else None
+        self.stdout.write(self.style.WARNING(
+            f'Skipping question {external_id}: {reason}'
+        ))
+    
+    @staticmethod
+    def _rate(rows, elapsed):
+        return f'{rows / elapsed:.0f} rows/s' if elapsed > 0 else 'n/a'
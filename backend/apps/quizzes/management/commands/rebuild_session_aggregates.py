@@ -0,0 +1,38 @@
+"""
+Management command to backfill/repair the running aggregates on quiz sessions
+"""
+from django.core.management.base import BaseCommand
+from apps.quizzes.models import QuizSession
+from apps.quizzes.services.summary_builder import recompute_session_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Recompute running aggregates and overall stats for quiz sessions from their attempts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--session',
+            dest='session_ids',
+            action='append',
+            default=[],
+            help='Only rebuild this session id (can be repeated)',
+        )
+        parser.add_argument(
+            '--missing-only',
+            action='store_true',
+            help='Only rebuild sessions that have no aggregates yet',
+        )
+
+    def handle(self, *args, **options):
+        sessions = QuizSession.objects.all()
+        if options['session_ids']:
+            sessions = sessions.filter(id__in=options['session_ids'])
+        if options['missing_only']:
+            sessions = sessions.filter(aggregates={})
+        
+        rebuilt = 0
+        for session in sessions.iterator(chunk_size=500):
+            recompute_session_aggregates(session)
+            rebuilt += 1
+        
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt aggregates for {rebuilt} sessions'))
@@ -0,0 +1,42 @@
+"""
+Management command to run pending LLM summary jobs
+"""
+import time
+from django.core.management.base import BaseCommand
+from apps.quizzes.services.summary_jobs import pending_summary_ids, run_summary_job
+
+
+class Command(BaseCommand):
+    help = 'Generate LLM summaries for sessions with a pending summary request'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the current backlog and exit instead of polling',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Seconds to sleep between polls when idle (default: 2)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Maximum number of sessions to fetch per poll (default: 100)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            session_ids = pending_summary_ids(limit=options['batch_size'])
+            
+            for session_id in session_ids:
+                if run_summary_job(session_id):
+                    self.stdout.write(f'Generated summary for session {session_id}')
+            
+            if options['once']:
+                break
+            if not session_ids:
+                time.sleep(options['interval'])
@@ -0,0 +1,119 @@
+"""
+Middleware for Quiz app
+"""
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from .services.metrics import RequestMetrics, current_metrics, get_metrics_registry, measuring
+
+
+_END = object()
+
+
+class RequestMetricsMiddleware:
+    """
+    Records wall time, database queries/time, LLM time and serializer time
+    for every request routed to a view, labelled with the view's name.
+    
+    Place it first in MIDDLEWARE so the timings cover the whole stack. With
+    ``METRICS_ENABLED`` off Django drops it at startup, so it costs nothing.
+    Streaming responses are measured until their last chunk is sent.
+    
+    Works under WSGI and ASGI; under ASGI it stays async, so async views
+    aren't pushed onto a thread.
+    """
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.registry = get_metrics_registry()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        
+        metrics = RequestMetrics('')
+        started = time.perf_counter()
+        with measuring(metrics):
+            response = self.get_response(request)
+        
+        if not metrics.view:
+            # No view was resolved (404s) or the view is exempt
+            return response
+        if response.streaming and not response.is_async:
+            response.streaming_content = self._measure_stream(
+                response.streaming_content, metrics, started, response.status_code
+            )
+        else:
+            self._record(metrics, started, response.status_code)
+        return response
+    
+    async def __acall__(self, request):
+        metrics = RequestMetrics('')
+        started = time.perf_counter()
+        with measuring(metrics):
+            response = await self.get_response(request)
+        
+        if not metrics.view:
+            return response
+        if response.streaming and response.is_async:
+            response.streaming_content = self._ameasure_stream(
+                response.streaming_content, metrics, started, response.status_code
+            )
+        elif response.streaming:
+            response.streaming_content = self._measure_stream(
+                response.streaming_content, metrics, started, response.status_code
+            )
+        else:
+            self._record(metrics, started, response.status_code)
+        return response
+    
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = current_metrics()
+        if metrics is not None and not getattr(view_func, 'metrics_exempt', False):
+            metrics.view = view_name(view_func, request.method)
+    
+    def _measure_stream(self, content, metrics, started, status_code):
+        try:
+            iterator = iter(content)
+            while True:
+                with measuring(metrics):
+                    chunk = next(iterator, _END)
+                if chunk is _END:
+                    break
+                yield chunk
+        finally:
+            self._record(metrics, started, status_code)
+    
+    async def _ameasure_stream(self, content, metrics, started, status_code):
+        try:
+            iterator = aiter(content)
+            while True:
+                with measuring(metrics):
+                    chunk = await anext(iterator, _END)
+                if chunk is _END:
+                    break
+                yield chunk
+        finally:
+            self._record(metrics, started, status_code)
+    
+    def _record(self, metrics, started, status_code):
+        metrics.duration = time.perf_counter() - started
+        self.registry.record(metrics, status_code)
+
+
+def view_name(view_func, method: str) -> str:
+    """``submit_answer_view`` for function views, ``ChapterViewSet.list`` for viewset actions"""
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return view_func.__name__
+    actions = getattr(view_func, 'actions', None)
+    if actions:
+        return f'{view_class.__name__}.{actions.get(method.lower(), method.lower())}'
+    return view_class.__name__
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizsession',
+            name='aggregates',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:54
+
+from django.db import migrations, models
+
+
+def mark_existing_summaries_ready(apps, schema_editor):
+    QuizSession = apps.get_model('quizzes', 'QuizSession')
+    QuizSession.objects.exclude(summary_text='').update(summary_status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0002_quizsession_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizsession',
+            name='summary_requested_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='quizsession',
+            name='summary_status',
+            field=models.CharField(blank=True, choices=[('', 'Not requested'), ('pending', 'Pending'), ('running', 'Running'), ('ready', 'Ready')], default='', max_length=10),
+        ),
+        migrations.RunPython(mark_existing_summaries_ready, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:01
+
+import hashlib
+import json
+
+from django.db import migrations, models
+
+
+def backfill_content_hash(apps, schema_editor):
+    # Mirrors Question.compute_content_hash (historical models have no methods)
+    Question = apps.get_model('quizzes', 'Question')
+    batch = []
+    for question in Question.objects.only(
+        'id', 'text', 'options', 'correct_option_index', 'explanation', 'difficulty'
+    ).iterator(chunk_size=1000):
+        content = json.dumps([
+            question.text,
+            question.options,
+            question.correct_option_index,
+            question.explanation,
+            question.difficulty,
+        ], ensure_ascii=False, separators=(',', ':'))
+        question.content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        batch.append(question)
+        if len(batch) >= 1000:
+            Question.objects.bulk_update(batch, ['content_hash'])
+            batch = []
+    if batch:
+        Question.objects.bulk_update(batch, ['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0004_question_unique_external_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.RunPython(backfill_content_hash, migrations.RunPython.noop),
+    ]
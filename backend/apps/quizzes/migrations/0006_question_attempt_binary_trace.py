@@ -0,0 +1,164 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:04
+
+import math
+
+from django.db import migrations, models
+
+
+# Frozen copy of version 1 of services.attention_trace, so later changes to
+# the codec don't change what this migration writes or reads back
+
+def encode_trace(trace):
+    if not trace:
+        return None
+    if not isinstance(trace, list):
+        raise ValueError('attention trace must be a list')
+
+    times = []
+    flags = []
+    for sample in trace:
+        if not isinstance(sample, dict) or 't_ms' not in sample:
+            raise ValueError('attention trace samples must be objects with t_ms and on_task')
+        try:
+            t_ms = float(sample['t_ms'])
+        except (TypeError, ValueError):
+            t_ms = math.nan
+        if not math.isfinite(t_ms):
+            raise ValueError(f'invalid t_ms in attention trace: {sample["t_ms"]!r}')
+        times.append(int(round(t_ms)))
+        flags.append(bool(sample.get('on_task')))
+
+    out = bytearray([1])
+    _write_varint(out, len(times))
+    previous = 0
+    for t_ms in times:
+        delta = t_ms - previous
+        _write_varint(out, delta * 2 if delta >= 0 else -delta * 2 - 1)
+        previous = t_ms
+
+    bitset = bytearray((len(flags) + 7) // 8)
+    for i, flag in enumerate(flags):
+        if flag:
+            bitset[i // 8] |= 1 << (i % 8)
+    runs = bytearray()
+    start = 0
+    for i in range(1, len(flags) + 1):
+        if i == len(flags) or flags[i] != flags[start]:
+            _write_varint(runs, i - start)
+            start = i
+    if len(runs) < len(bitset):
+        out.append(1 | (2 if flags[0] else 0))
+        out += runs
+    else:
+        out.append(0)
+        out += bitset
+
+    return bytes(out)
+
+
+def decode_trace(data):
+    if data is None:
+        return None
+    data = bytes(data)
+    if not data:
+        return []
+    if data[0] != 1:
+        raise ValueError(f'unsupported attention trace format: {data[0]}')
+
+    count, pos = _read_varint(data, 1)
+    times = []
+    t_ms = 0
+    for _ in range(count):
+        value, pos = _read_varint(data, pos)
+        t_ms += value >> 1 if not value & 1 else -(value >> 1) - 1
+        times.append(t_ms)
+
+    if not count:
+        return []
+
+    mode = data[pos]
+    pos += 1
+    if mode & 1:
+        flags = []
+        value = bool(mode & 2)
+        while len(flags) < count:
+            length, pos = _read_varint(data, pos)
+            flags.extend([value] * length)
+            value = not value
+    else:
+        flags = [bool(data[pos + i // 8] >> (i % 8) & 1) for i in range(count)]
+
+    return [{'t_ms': t, 'on_task': flag} for t, flag in zip(times, flags)]
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def pack_attention_traces(apps, schema_editor):
+    QuestionAttempt = apps.get_model('quizzes', 'QuestionAttempt')
+    batch = []
+    for attempt in QuestionAttempt.objects.filter(
+        raw_attention_trace__isnull=False
+    ).only('id', 'raw_attention_trace').iterator(chunk_size=1000):
+        try:
+            attempt.attention_trace = encode_trace(attempt.raw_attention_trace)
+        except ValueError:
+            # Malformed traces can't be packed; they carried no usable data
+            attempt.attention_trace = None
+        batch.append(attempt)
+        if len(batch) >= 1000:
+            QuestionAttempt.objects.bulk_update(batch, ['attention_trace'])
+            batch = []
+    if batch:
+        QuestionAttempt.objects.bulk_update(batch, ['attention_trace'])
+
+
+def unpack_attention_traces(apps, schema_editor):
+    QuestionAttempt = apps.get_model('quizzes', 'QuestionAttempt')
+    batch = []
+    for attempt in QuestionAttempt.objects.filter(
+        attention_trace__isnull=False
+    ).only('id', 'attention_trace').iterator(chunk_size=1000):
+        attempt.raw_attention_trace = decode_trace(attempt.attention_trace)
+        batch.append(attempt)
+        if len(batch) >= 1000:
+            QuestionAttempt.objects.bulk_update(batch, ['raw_attention_trace'])
+            batch = []
+    if batch:
+        QuestionAttempt.objects.bulk_update(batch, ['raw_attention_trace'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0005_question_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questionattempt',
+            name='attention_trace',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(pack_attention_traces, unpack_attention_traces),
+        migrations.RemoveField(
+            model_name='questionattempt',
+            name='raw_attention_trace',
+        ),
+    ]
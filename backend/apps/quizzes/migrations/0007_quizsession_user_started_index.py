@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0006_question_attempt_binary_trace'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quizsession',
+            index=models.Index(fields=['user', '-started_at', '-id'], name='quiz_session_user_started'),
+        ),
+    ]
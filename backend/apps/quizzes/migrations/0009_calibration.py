@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0008_irt_parameters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='irt_responses',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='CalibrationCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_session_ended_at', models.DateTimeField(blank=True, null=True)),
+                ('sessions_processed', models.IntegerField(default=0)),
+                ('responses_processed', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('chapter', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='calibration_checkpoint', to='quizzes.chapter')),
+            ],
+            options={
+                'db_table': 'calibration_checkpoints',
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0009_calibration'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.UUIDField()),
+                ('num_answers', models.IntegerField()),
+                ('response', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('quiz_session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_batches', to='quizzes.quizsession')),
+            ],
+            options={
+                'db_table': 'answer_batches',
+                'constraints': [models.UniqueConstraint(fields=('quiz_session', 'idempotency_key'), name='unique_session_idempotency_key')],
+            },
+        ),
+    ]
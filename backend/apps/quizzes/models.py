@@ -1,9 +1,12 @@
 """
 Models for Quiz app
 """
+import hashlib
+import json
 import uuid
 from django.db import models
 from django.conf import settings
+from .services.attention_trace import decode_trace, encode_trace
 
 
 class Chapter(models.Model):
@@ -15,11 +18,11 @@ class Chapter(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-
+    
     class Meta:
         db_table = 'chapters'
         ordering = ['name']
-
+    
     def __str__(self):
         return self.name
 
@@ -31,7 +34,7 @@ class Question(models.Model):
         ('medium', 'Medium'),
         ('hard', 'Hard'),
     ]
-
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     chapter = models.ForeignKey(Chapter, related_name='questions', on_delete=models.CASCADE)
     external_id = models.CharField(max_length=100, blank=True, null=True)
@@ -41,17 +44,47 @@ class Question(models.Model):
     explanation = models.TextField(blank=True)
     difficulty = models.CharField(max_length=10, choices=DIFFICULTY_CHOICES)
     is_active = models.BooleanField(default=True)
+    # SHA-256 of the question content, used to skip unchanged rows on re-import
+    content_hash = models.CharField(max_length=64, blank=True)
+    # Item response parameters (2PL) for the IRT estimator; null until
+    # calibrated, in which case they are derived from ``difficulty``
+    irt_difficulty = models.FloatField(null=True, blank=True)
+    irt_discrimination = models.FloatField(null=True, blank=True)
+    # Responses the parameters were fitted on (see calibrate_questions)
+    irt_responses = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-
+    
     class Meta:
         db_table = 'questions'
         indexes = [
             models.Index(fields=['chapter', 'difficulty', 'is_active']),
         ]
-
+        constraints = [
+            # Lets load_questions upsert with INSERT ... ON CONFLICT
+            models.UniqueConstraint(fields=['chapter', 'external_id'], name='unique_chapter_external_id'),
+        ]
+    
     def __str__(self):
         return f"{self.chapter.name} - {self.difficulty} - {self.text[:50]}"
+    
+    def compute_content_hash(self) -> str:
+        """Hash of the fields that make up the question's content"""
+        content = json.dumps([
+            self.text,
+            self.options,
+            self.correct_option_index,
+            self.explanation,
+            self.difficulty,
+        ], ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+    
+    def save(self, *args, **kwargs):
+        self.content_hash = self.compute_content_hash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content_hash' not in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['content_hash']
+        super().save(*args, **kwargs)
 
 
 class QuizSession(models.Model):
@@ -70,6 +103,9 @@ class QuizSession(models.Model):
     # ITS ability tracking
     current_ability = models.IntegerField(default=0)
     current_question_index = models.IntegerField(default=0)
+    # Continuous ability posterior (mean, variance), used by the IRT estimator
+    ability_estimate = models.FloatField(null=True, blank=True)
+    ability_variance = models.FloatField(null=True, blank=True)
     
     # Aggregate stats
     total_questions = models.IntegerField(default=0)
@@ -77,6 +113,8 @@ class QuizSession(models.Model):
     overall_accuracy = models.FloatField(null=True, blank=True)
     overall_attention_ratio = models.FloatField(null=True, blank=True)
     overall_avg_response_time_ms = models.IntegerField(null=True, blank=True)
+    # Running sums/counts (overall and per difficulty), updated per attempt
+    aggregates = models.JSONField(default=dict, blank=True)
     
     # WebGazer info
     webgazer_enabled = models.BooleanField(default=True)
@@ -84,20 +122,39 @@ class QuizSession(models.Model):
     device_info = models.TextField(blank=True)
     
     # LLM summary
+    SUMMARY_STATUS_CHOICES = [
+        ('', 'Not requested'),
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('ready', 'Ready'),
+    ]
     summary_text = models.TextField(blank=True)
     summary_generated_at = models.DateTimeField(null=True, blank=True)
+    summary_status = models.CharField(max_length=10, choices=SUMMARY_STATUS_CHOICES, blank=True, default='')
+    summary_requested_at = models.DateTimeField(null=True, blank=True)
     
     # Misc
     settings = models.JSONField(default=dict)
-
+    
     class Meta:
         db_table = 'quiz_sessions'
         ordering = ['-started_at']
-
+        indexes = [
+            # Backs the per-user session history, newest first (keyset pagination)
+            models.Index(fields=['user', '-started_at', '-id'], name='quiz_session_user_started'),
+        ]
+    
     def __str__(self):
         return f"{self.user.email} - {self.chapter.name} - {self.started_at}"
 
 
+class QuestionAttemptManager(models.Manager):
+    """Leaves the binary attention trace out of attempt queries; use defer(None) to load it"""
+    
+    def get_queryset(self):
+        return super().get_queryset().defer('attention_trace')
+
+
 class QuestionAttempt(models.Model):
     """Represents one attempt by the user at a specific question"""
     DIFFICULTY_CHOICES = [
@@ -105,7 +162,7 @@ class QuestionAttempt(models.Model):
         ('medium', 'Medium'),
         ('hard', 'Hard'),
     ]
-
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     quiz_session = models.ForeignKey(
         QuizSession,
@@ -140,14 +197,66 @@ class QuestionAttempt(models.Model):
     option_changes = models.IntegerField(default=0)
     flagged_low_attention = models.BooleanField(default=False)
     
-    # Optional trace
-    raw_attention_trace = models.JSONField(null=True, blank=True)
-
+    # Optional trace, packed by services.attention_trace (see raw_attention_trace)
+    attention_trace = models.BinaryField(null=True, blank=True)
+    
+    objects = QuestionAttemptManager()
+    
     class Meta:
         db_table = 'question_attempts'
         ordering = ['question_index']
         unique_together = [['quiz_session', 'question_index']]
-
+    
     def __str__(self):
         return f"Q{self.question_index} - {self.quiz_session} - {'Correct' if self.is_correct else 'Incorrect'}"
+    
+    @property
+    def raw_attention_trace(self):
+        """The gaze trace as a list of {t_ms, on_task} samples"""
+        return decode_trace(self.attention_trace)
+    
+    @raw_attention_trace.setter
+    def raw_attention_trace(self, trace):
+        self.attention_trace = encode_trace(trace)
 
+
+class AnswerBatch(models.Model):
+    """
+    Answers submitted together in one request, kept under the client's
+    idempotency key so that a retry gets the original response instead of
+    recording the answers twice
+    """
+    quiz_session = models.ForeignKey(
+        QuizSession,
+        related_name='answer_batches',
+        on_delete=models.CASCADE
+    )
+    idempotency_key = models.UUIDField()
+    num_answers = models.IntegerField()
+    response = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'answer_batches'
+        constraints = [
+            models.UniqueConstraint(fields=['quiz_session', 'idempotency_key'], name='unique_session_idempotency_key'),
+        ]
+    
+    def __str__(self):
+        return f"{self.quiz_session} - {self.num_answers} answers ({self.idempotency_key})"
+
+
+class CalibrationCheckpoint(models.Model):
+    """Progress of the offline IRT calibration for one chapter"""
+    chapter = models.OneToOneField(Chapter, related_name='calibration_checkpoint', on_delete=models.CASCADE)
+    # Sessions that ended up to this time have been folded into the parameters
+    last_session_ended_at = models.DateTimeField(null=True, blank=True)
+    sessions_processed = models.IntegerField(default=0)
+    responses_processed = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'calibration_checkpoints'
+    
+    def __str__(self):
+        return f"{self.chapter.name} - {self.last_session_ended_at}"
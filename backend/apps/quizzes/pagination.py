@@ -0,0 +1,97 @@
+"""
+Pagination for Quiz app
+"""
+import base64
+import uuid
+from collections import OrderedDict
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class SessionKeysetPagination(BasePagination):
+    """
+    Keyset pagination over sessions, newest first, on (started_at, id).
+    
+    The opaque ``cursor`` query parameter holds the position of the last
+    row of the previous page, so every page is one range scan on the
+    (user, -started_at, -id) index no matter how far back it is.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset, page_size = self.page_queryset(queryset, request)
+        return self.take_page(list(queryset), page_size)
+    
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views, read with the async ORM"""
+        queryset, page_size = self.page_queryset(queryset, request)
+        return self.take_page([row async for row in queryset], page_size)
+    
+    def page_queryset(self, queryset, request):
+        """The rows of the requested page plus one, and the page size"""
+        self.request = request
+        page_size = self.get_page_size(request)
+        
+        position = self.decode_cursor(request)
+        if position is not None:
+            started_at, session_id = position
+            queryset = queryset.filter(
+                Q(started_at__lt=started_at) | Q(started_at=started_at, id__lt=session_id)
+            )
+        
+        # One extra row tells us whether there is a next page
+        return queryset.order_by('-started_at', '-id')[:page_size + 1], page_size
+    
+    def take_page(self, rows, page_size):
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.last = rows[-1] if rows else None
+        return rows
+    
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+    
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return settings.REST_FRAMEWORK['PAGE_SIZE']
+        return min(max(page_size, 1), self.max_page_size)
+    
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.last),
+        )
+    
+    def encode_cursor(self, session):
+        position = f'{session.started_at.isoformat()}|{session.id}'
+        return base64.urlsafe_b64encode(position.encode('ascii')).decode('ascii')
+    
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            started_at, session_id = position.split('|')
+            started_at = parse_datetime(started_at)
+            session_id = uuid.UUID(session_id)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound('Invalid cursor')
+        if started_at is None:
+            raise NotFound('Invalid cursor')
+        return started_at, session_id
@@ -0,0 +1,26 @@
+"""
+Renderers for Quiz app
+"""
+import json
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def format_sse(event: str, data) -> str:
+    """Format one Server-Sent Event with a JSON payload"""
+    payload = json.dumps(data, cls=JSONEncoder, ensure_ascii=False)
+    return f'event: {event}\ndata: {payload}\n\n'
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets DRF negotiate ``Accept: text/event-stream``. Streaming views return
+    a StreamingHttpResponse directly; this only renders error responses,
+    as a single ``error`` event.
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return format_sse('error', data).encode(self.charset)
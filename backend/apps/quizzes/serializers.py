@@ -1,40 +1,58 @@
 """
 Serializers for Quiz app
 """
+import math
 from rest_framework import serializers
 from .models import Chapter, Question, QuizSession, QuestionAttempt
+from .services.attention import attention_metrics_from_batch
+from .services.attention_trace import encode_trace
+from .services.metrics import timed
 
 
-class ChapterSerializer(serializers.ModelSerializer):
+class TimedSerializerMixin:
+    """Counts the serializer's work towards the request's serializer time"""
+    
+    def to_representation(self, instance):
+        with timed('serializer'):
+            return super().to_representation(instance)
+    
+    def run_validation(self, data=serializers.empty):
+        with timed('serializer'):
+            return super().run_validation(data)
+
+
+class ChapterSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for Chapter"""
     class Meta:
         model = Chapter
         fields = ['id', 'slug', 'name', 'description', 'is_active']
 
 
-class QuizQuestionSerializer(serializers.ModelSerializer):
+class QuizQuestionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for Question when sending to frontend during quiz"""
     class Meta:
         model = Question
         fields = ['id', 'text', 'options', 'difficulty']
 
 
-class QuestionSerializer(serializers.ModelSerializer):
+class QuestionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Full serializer for Question (internal use)"""
     class Meta:
         model = Question
         fields = '__all__'
 
 
-class QuestionAttemptSerializer(serializers.ModelSerializer):
+class QuestionAttemptSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for QuestionAttempt"""
+    raw_attention_trace = serializers.ListField(read_only=True, allow_null=True)
+    
     class Meta:
         model = QuestionAttempt
-        fields = '__all__'
+        exclude = ['attention_trace']
         read_only_fields = ['id', 'quiz_session']
 
 
-class QuizSessionSerializer(serializers.ModelSerializer):
+class QuizSessionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for QuizSession metadata"""
     chapter = ChapterSerializer(read_only=True)
     
@@ -49,16 +67,27 @@ class QuizSessionSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'started_at', 'ended_at']
 
 
-class StartSessionSerializer(serializers.Serializer):
+class StartSessionSerializer(TimedSerializerMixin, serializers.Serializer):
     """Serializer for starting a quiz session"""
     chapter_slug = serializers.SlugField(required=True)
     max_questions = serializers.IntegerField(default=15, min_value=1, max_value=50)
     webgazer_enabled = serializers.BooleanField(default=True)
     calibration_quality = serializers.FloatField(required=False, allow_null=True, min_value=0.0, max_value=1.0)
     device_info = serializers.CharField(required=False, allow_blank=True)
+    # 'planned' fixes the question order up front (see services.question_plan);
+    # a seed makes it reproducible
+    mode = serializers.ChoiceField(choices=['adaptive', 'planned'], default='adaptive')
+    seed = serializers.IntegerField(required=False, min_value=0, max_value=2 ** 31 - 1)
+
+
+class GazeChunkSerializer(TimedSerializerMixin, serializers.Serializer):
+    """Serializer for one chunk of gaze samples uploaded while answering"""
+    question_index = serializers.IntegerField(required=True, min_value=1)
+    seq = serializers.IntegerField(required=True, min_value=0)
+    gaze_samples = serializers.DictField(required=True)
 
 
-class AnswerSubmissionSerializer(serializers.Serializer):
+class AnswerSubmissionSerializer(TimedSerializerMixin, serializers.Serializer):
     """Serializer for submitting an answer"""
     question_id = serializers.UUIDField(required=True)
     question_index = serializers.IntegerField(required=True, min_value=1)
@@ -69,22 +98,79 @@ class AnswerSubmissionSerializer(serializers.Serializer):
     was_skipped = serializers.BooleanField(default=False)
     
     attention_metrics = serializers.DictField(required=False, allow_null=True)
+    # Raw gaze samples, packed (see services.attention); when present the
+    # attention metrics are computed from them instead of taken from the client
+    gaze_samples = serializers.DictField(required=False, allow_null=True)
     
     def validate_attention_metrics(self, value):
         """Validate attention metrics structure"""
         if value is None:
             return {}
         
-        expected_fields = [
-            'attention_ratio', 'off_screen_ratio', 'off_screen_duration_ms',
-            'num_gaze_samples', 'num_on_task_samples', 'num_off_task_samples',
-            'option_changes', 'raw_attention_trace'
+        ratio_fields = ['attention_ratio', 'off_screen_ratio']
+        count_fields = [
+            'off_screen_duration_ms', 'num_gaze_samples', 'num_on_task_samples',
+            'num_off_task_samples', 'option_changes'
         ]
         
         # Ensure all fields are present with defaults
         metrics = {}
-        for field in expected_fields:
-            metrics[field] = value.get(field, 0 if 'num' in field or 'duration' in field or 'changes' in field else 0.0)
+        for field in ratio_fields:
+            metrics[field] = self._number(value, field, 0.0, 1.0)
+        for field in count_fields:
+            metrics[field] = int(round(self._number(value, field, 0, None)))
+        metrics['raw_attention_trace'] = value.get('raw_attention_trace')
+        
+        # The trace is stored packed; encode it here so bad traces are a 400
+        try:
+            metrics['attention_trace'] = encode_trace(metrics.pop('raw_attention_trace'))
+        except ValueError as e:
+            raise serializers.ValidationError({'raw_attention_trace': str(e)})
         
         return metrics
+    
+    def validate_gaze_samples(self, value):
+        """Compute the attention metrics from the packed samples"""
+        if value is None:
+            return None
+        try:
+            return attention_metrics_from_batch(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+    
+    def validate(self, attrs):
+        measured = attrs.pop('gaze_samples', None)
+        if measured:
+            # The client's metrics still supply option_changes
+            attrs['attention_metrics'] = {**(attrs.get('attention_metrics') or {}), **measured}
+        return attrs
+    
+    @staticmethod
+    def _number(metrics, field, minimum, maximum):
+        """A metric as a number in [minimum, maximum], minimum when missing"""
+        value = metrics.get(field)
+        if value is None:
+            return minimum
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise serializers.ValidationError({field: 'Must be a number.'})
+        if value < minimum or (maximum is not None and value > maximum):
+            bounds = f'between {minimum} and {maximum}' if maximum is not None else f'at least {minimum}'
+            raise serializers.ValidationError({field: f'Must be {bounds}.'})
+        return value
 
+
+class AnswerBatchSerializer(TimedSerializerMixin, serializers.Serializer):
+    """Serializer for submitting several answers of a session at once"""
+    idempotency_key = serializers.UUIDField(required=True)
+    # A session has at most 50 questions
+    answers = AnswerSubmissionSerializer(many=True, allow_empty=False, max_length=50)
+    
+    def validate_answers(self, answers):
+        """Answers must be in order, for consecutive question indexes and distinct questions"""
+        first_index = answers[0]['question_index']
+        for offset, answer in enumerate(answers):
+            if answer['question_index'] != first_index + offset:
+                raise serializers.ValidationError('Answers must be for consecutive question indexes, in order.')
+        if len({answer['question_id'] for answer in answers}) != len(answers):
+            raise serializers.ValidationError('Each question can only be answered once.')
+        return answers
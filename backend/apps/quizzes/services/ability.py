@@ -0,0 +1,350 @@
+"""
+Ability Estimators
+Pluggable models that update a student's ability after each answer and
+choose the questions to ask next
+"""
+import math
+import random
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from ..models import Question, QuizSession
+from .decision_trace import DecisionEvent, get_decision_tracer
+from .question_plan import next_planned_id, session_plan
+from .question_pool import DIFFICULTIES, question_parameters, question_pool
+from .question_selector import (
+    apply_its_rules, difficulty_for_ability, difficulty_order, fetch_pooled_question,
+    pick_first_question, pick_next_question, prefetch_next_questions
+)
+
+
+class AbilityEstimator:
+    """
+    Interface for ability models.
+
+    An estimator keeps its state on the QuizSession (``current_ability``
+    at minimum, listed in ``update_fields``) and never saves the session
+    itself; the caller writes ``update_fields`` with the rest of the answer.
+    """
+    name = ''
+    update_fields: List[str] = ['current_ability']
+
+    def start(self, session: QuizSession) -> None:
+        """Initialize the ability state of a new session"""
+        raise NotImplementedError
+
+    def first_question(self, session: QuizSession) -> Optional[Question]:
+        """Choose the first question of a new session"""
+        raise NotImplementedError
+
+    def apply_answer(
+        self,
+        session: QuizSession,
+        question: Question,
+        is_correct: bool,
+        attention_ratio: Optional[float],
+        response_time_ms: int,
+        off_screen_ratio: Optional[float],
+        question_index: Optional[int] = None
+    ) -> None:
+        """Update the session's ability state with one answer"""
+        raise NotImplementedError
+
+    def selection_key(self, session: QuizSession) -> str:
+        """
+        Identify what the next pick depends on, so a question pre-selected
+        for a hypothetical state can be matched to the real one
+        """
+        raise NotImplementedError
+
+    def pick_question(self, session: QuizSession, attempted_question_ids: Set[UUID]) -> Optional[Question]:
+        """Choose the next question for the session's current ability"""
+        raise NotImplementedError
+
+    def prefetch(
+        self,
+        session: QuizSession,
+        question: Question,
+        attempted_question_ids: Set[UUID]
+    ) -> Dict[str, Question]:
+        """
+        Choose the question to follow ``question`` for every state its
+        answer can lead to, keyed by ``selection_key``
+        """
+        raise NotImplementedError
+
+
+class RuleBasedEstimator(AbilityEstimator):
+    """
+    The original ITS rules: an integer ability stepped by correctness,
+    attention and response time, mapped to easy/medium/hard buckets.
+    See ``question_selector.apply_its_rules``.
+    """
+    name = 'rules'
+    update_fields = ['current_ability']
+
+    def start(self, session):
+        session.current_ability = 0
+
+    def first_question(self, session):
+        return pick_first_question(session)
+
+    def apply_answer(self, session, question, is_correct, attention_ratio, response_time_ms,
+                     off_screen_ratio, question_index=None):
+        ability_before = session.current_ability
+        rule, session.current_ability = apply_its_rules(
+            ability_before,
+            is_correct,
+            attention_ratio,
+            response_time_ms,
+            off_screen_ratio,
+        )
+
+        tracer = get_decision_tracer()
+        if tracer.traces(session.pk):
+            tracer.emit(DecisionEvent(
+                session.pk, question_index, self.name, rule, is_correct, attention_ratio, off_screen_ratio,
+                response_time_ms, ability_before, session.current_ability,
+                difficulty_for_ability(session.current_ability),
+            ))
+
+    def selection_key(self, session):
+        return difficulty_for_ability(session.current_ability)
+
+    def pick_question(self, session, attempted_question_ids):
+        return pick_next_question(session, self.selection_key(session), attempted_question_ids)
+
+    def prefetch(self, session, question, attempted_question_ids):
+        return prefetch_next_questions(session, session.current_ability, attempted_question_ids)
+
+
+class IRTEstimator(AbilityEstimator):
+    """
+    Two-parameter logistic (2PL) item response model.
+
+    Ability is a continuous value with a Gaussian posterior, kept as
+    ``ability_estimate`` and ``ability_variance``. Each answer updates it
+    with one Newton step on the log-posterior, P(correct) being
+    1 / (1 + exp(-a (theta - b))) for the question's discrimination ``a``
+    and difficulty ``b``. Uncalibrated questions get b from their label and
+    a = 1, which reduces the model to 1PL/Rasch.
+
+    The next question is the unattempted one with the most Fisher
+    information a^2 p (1 - p) at the current estimate, computed over the
+    chapter's parameter arrays with NumPy. The pick is random among the
+    ``TOP_K`` most informative so that sessions don't all see the same
+    sequence. With the webcam on, answers given with very low attention are
+    treated as unreliable and don't move the estimate, as in the rules.
+    """
+    name = 'irt'
+    update_fields = ['current_ability', 'ability_estimate', 'ability_variance']
+
+    PRIOR_MEAN = 0.0
+    PRIOR_VARIANCE = 1.0
+    TOP_K = 3
+
+    def start(self, session):
+        session.ability_estimate = self.PRIOR_MEAN
+        session.ability_variance = self.PRIOR_VARIANCE
+        session.current_ability = round(self.PRIOR_MEAN)
+
+    def first_question(self, session):
+        return self.pick_question(session, set())
+
+    def apply_answer(self, session, question, is_correct, attention_ratio, response_time_ms,
+                     off_screen_ratio, question_index=None):
+        theta_before, variance = self.posterior(session)
+        reliable = self.is_reliable(session, attention_ratio, off_screen_ratio)
+        if reliable:
+            a, b = question_parameters(question.difficulty, question.irt_difficulty, question.irt_discrimination)
+            theta, variance = self.posterior_after(theta_before, variance, a, b, is_correct)
+            session.ability_estimate = theta
+            session.ability_variance = variance
+            session.current_ability = round(theta)
+
+        tracer = get_decision_tracer()
+        if tracer.traces(session.pk):
+            tracer.emit(DecisionEvent(
+                session.pk, question_index, self.name, 'posterior_update' if reliable else 'unreliable_sample',
+                is_correct, attention_ratio, off_screen_ratio, response_time_ms, theta_before,
+                self.posterior(session)[0],
+            ))
+
+    def selection_key(self, session):
+        return self._key(self.posterior(session)[0])
+
+    def pick_question(self, session, attempted_question_ids):
+        theta = self.posterior(session)[0]
+        return fetch_pooled_question(
+            session, lambda: self.most_informative(session.chapter_id, theta, attempted_question_ids)
+        )
+
+    def prefetch(self, session, question, attempted_question_ids):
+        theta, variance = self.posterior(session)
+        a, b = question_parameters(question.difficulty, question.irt_difficulty, question.irt_discrimination)
+        outcomes = {self.posterior_after(theta, variance, a, b, is_correct)[0] for is_correct in (True, False)}
+        if session.webgazer_enabled:
+            outcomes.add(theta)  # an unreliable answer leaves it unchanged
+
+        chosen = {}
+        for outcome in outcomes:
+            question_id = self.most_informative(session.chapter_id, outcome, attempted_question_ids)
+            if question_id is not None:
+                chosen[self._key(outcome)] = question_id
+
+        if not chosen:
+            return {}
+        questions = Question.objects.filter(is_active=True).in_bulk(set(chosen.values()))
+        return {key: questions[question_id] for key, question_id in chosen.items() if question_id in questions}
+
+    def posterior(self, session: QuizSession) -> Tuple[float, float]:
+        """Current (mean, variance); sessions started under another estimator begin at their integer ability"""
+        if session.ability_estimate is None:
+            return float(session.current_ability), self.PRIOR_VARIANCE
+        return session.ability_estimate, session.ability_variance or self.PRIOR_VARIANCE
+
+    @staticmethod
+    def posterior_after(theta: float, variance: float, a: float, b: float, is_correct: bool) -> Tuple[float, float]:
+        """One Newton step of the 2PL log-posterior for a single response"""
+        p = 1.0 / (1.0 + math.exp(-a * (theta - b)))
+        precision = 1.0 / variance + a * a * p * (1.0 - p)
+        theta = theta + a * ((1.0 if is_correct else 0.0) - p) / precision
+        return theta, 1.0 / precision
+
+    def most_informative(self, chapter_id: int, theta: float, exclude: Iterable[UUID]) -> Optional[UUID]:
+        """ID of a maximally informative question at ``theta``, skipping ``exclude``"""
+        import numpy as np
+
+        parameters = question_pool.parameters(chapter_id)
+        if not parameters.ids:
+            return None
+
+        p = 1.0 / (1.0 + np.exp(-parameters.a * (theta - parameters.b)))
+        information = parameters.a * parameters.a * p * (1.0 - p)
+        excluded = [parameters.index[i] for i in exclude if i in parameters.index]
+        information[excluded] = -1.0
+
+        available = len(parameters.ids) - len(excluded)
+        if available <= 0:
+            return None
+        k = min(self.TOP_K, available)
+        top = np.argpartition(information, -k)[-k:]
+        return parameters.ids[int(random.choice(top))]
+
+    @staticmethod
+    def _key(theta: float) -> str:
+        return repr(theta)
+
+    @staticmethod
+    def is_reliable(session: QuizSession, attention_ratio: Optional[float], off_screen_ratio: Optional[float]) -> bool:
+        if not session.webgazer_enabled:
+            return True
+        return (attention_ratio or 0.0) >= 0.3 and (off_screen_ratio or 0.0) <= 0.5
+
+
+class PlannedSelection(AbilityEstimator):
+    """
+    Serves a planned session's questions in plan order (see
+    services.question_plan) while the session's own estimator keeps
+    updating its ability.
+
+    The target difficulty follows the ability as with the rules, falling
+    back to the other difficulties when its list runs out. The first
+    question is the first planned easy one. Each pick takes the first
+    unattempted question of the target's list, so it needs no sampling
+    and nothing is stored per answer. The same seed and answers always
+    give the same sequence.
+    """
+
+    def __init__(self, estimator: AbilityEstimator):
+        self.estimator = estimator
+        self.name = estimator.name
+        self.update_fields = estimator.update_fields
+
+    def start(self, session):
+        self.estimator.start(session)
+
+    def first_question(self, session):
+        return self._fetch(session, DIFFICULTIES, set())
+
+    def apply_answer(self, session, question, is_correct, attention_ratio, response_time_ms,
+                     off_screen_ratio, question_index=None):
+        self.estimator.apply_answer(
+            session, question, is_correct, attention_ratio, response_time_ms, off_screen_ratio,
+            question_index=question_index,
+        )
+
+    def selection_key(self, session):
+        return difficulty_for_ability(session.current_ability)
+
+    def pick_question(self, session, attempted_question_ids):
+        return self._fetch(session, difficulty_order(self.selection_key(session)), attempted_question_ids)
+
+    def prefetch(self, session, question, attempted_question_ids):
+        # The next question for every target difficulty, whatever the answer
+        plan = session_plan(session)
+        chosen = {}
+        for target in DIFFICULTIES:
+            question_id = next_planned_id(plan, difficulty_order(target), attempted_question_ids)
+            if question_id is not None:
+                chosen[target] = question_id
+
+        if not chosen:
+            return {}
+        questions = Question.objects.filter(is_active=True).in_bulk(set(chosen.values()))
+        return {target: questions[question_id] for target, question_id in chosen.items() if question_id in questions}
+
+    def _fetch(self, session: QuizSession, difficulties: Iterable[str], exclude: Set[UUID]) -> Optional[Question]:
+        """The next planned question, skipping any deactivated since the plan was drawn"""
+        plan = session_plan(session)
+        exclude = set(exclude)
+        while True:
+            question_id = next_planned_id(plan, difficulties, exclude)
+            if question_id is None:
+                return None
+            question = Question.objects.filter(pk=question_id, is_active=True).first()
+            if question is not None:
+                return question
+            exclude.add(question_id)
+
+
+ESTIMATORS = {
+    'rules': RuleBasedEstimator,
+    'irt': IRTEstimator,
+}
+
+_estimators: Dict[str, AbilityEstimator] = {}
+_estimators_lock = threading.Lock()
+
+
+def get_ability_estimator(session: Optional[QuizSession] = None) -> AbilityEstimator:
+    """
+    Return the estimator a session was started with (recorded in
+    ``session.settings``), or the configured ``ABILITY_ESTIMATOR`` for new
+    sessions. Names are keys of ``ESTIMATORS`` or dotted paths to an
+    ``AbilityEstimator`` subclass. Sessions from before estimators were
+    pluggable use the rules. Planned sessions get it wrapped in
+    ``PlannedSelection``.
+    """
+    if session is None:
+        name = settings.ABILITY_ESTIMATOR
+    else:
+        name = (session.settings or {}).get('ability_estimator', 'rules')
+    planned = session is not None and session_plan(session) is not None
+    key = f'planned:{name}' if planned else name
+
+    estimator = _estimators.get(key)
+    if estimator is None:
+        with _estimators_lock:
+            estimator = _estimators.get(key)
+            if estimator is None:
+                estimator_class = ESTIMATORS.get(name) or import_string(name)
+                estimator = estimator_class()
+                if planned:
+                    estimator = PlannedSelection(estimator)
+                _estimators[key] = estimator
+    return estimator
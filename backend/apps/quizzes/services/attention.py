@@ -0,0 +1,205 @@
+"""
+Attention Metrics
+Attention ratio, off-screen ratio/duration and on/off-task counts computed
+from the raw gaze samples of one question, sent as packed arrays
+"""
+import base64
+import binascii
+import math
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+from django.conf import settings
+
+from .attention_trace import encode_samples
+
+
+# Gaze batch (format 1), sent as
+#   {"format": 1, "count": n, "question_box": [left, top, right, bottom] | null,
+#    "data": base64 of three little-endian columns}
+# with the columns
+#   uint32 t_ms[n]   ms since the first sample (for chunks, since the
+#                    question was shown), non-decreasing
+#   float32 x[n]     NaN while the gaze is off screen
+#   float32 y[n]
+FORMAT_VERSION = 1
+SAMPLE_BYTES = 12
+
+# Off-task samples outnumbering on-task ones this many times over...
+CONFUSION_RATIO = 2
+# ...cut the attention ratio by this factor
+CONFUSION_PENALTY = 0.7
+
+# A batch's share of the stored trace: packed uint32 times, one byte per flag
+TraceSlice = Tuple[bytes, bytes]
+
+
+def decode_gaze_batch(batch) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Optional[Tuple[float, ...]]]:
+    """
+    Unpack a gaze batch into ``(t_ms, x, y, question_box)`` arrays.
+
+    Raises ValueError for a malformed batch, more than
+    ``ATTENTION_MAX_GAZE_SAMPLES`` samples or decreasing times.
+    """
+    if not isinstance(batch, dict):
+        raise ValueError('gaze samples must be an object')
+    if batch.get('format') != FORMAT_VERSION:
+        raise ValueError(f'unsupported gaze sample format: {batch.get("format")!r}')
+
+    count = batch.get('count')
+    if not isinstance(count, int) or isinstance(count, bool) or count < 0:
+        raise ValueError('count must be a non-negative integer')
+    if count > settings.ATTENTION_MAX_GAZE_SAMPLES:
+        raise ValueError(f'at most {settings.ATTENTION_MAX_GAZE_SAMPLES} gaze samples are accepted')
+
+    try:
+        raw = base64.b64decode(batch.get('data') or '', validate=True)
+    except (binascii.Error, TypeError, ValueError):
+        raise ValueError('data must be base64')
+    if len(raw) != count * SAMPLE_BYTES:
+        raise ValueError(f'data holds {len(raw)} bytes, expected {count * SAMPLE_BYTES} for {count} samples')
+
+    t_ms = np.frombuffer(raw, dtype='<u4', count=count).astype(np.int64)
+    x = np.frombuffer(raw, dtype='<f4', count=count, offset=4 * count)
+    y = np.frombuffer(raw, dtype='<f4', count=count, offset=8 * count)
+    if count > 1 and np.any(t_ms[1:] < t_ms[:-1]):
+        raise ValueError('gaze sample times must not decrease')
+
+    return t_ms, x, y, _question_box(batch.get('question_box'))
+
+
+class AttentionCounters:
+    """
+    Running attention counters for one question, fed one batch of samples
+    at a time in time order. Each ``add`` costs O(batch size) and returns
+    the batch's slice of the trace, packed as ``(uint32 times, one byte per
+    flag)``; the caller keeps the slices and passes them all to ``metrics``,
+    which joins and encodes them once. The counters themselves stay a few
+    integers, however many samples came in.
+
+    A sample is on task when it falls inside the question box (edges
+    included); with no box nothing is. Off-screen time is the time from a
+    sample to the next one that is off screen.
+    """
+    __slots__ = ('chunks', 'count', 'on_task', 'off_screen', 'off_screen_ms', 'first_t', 'last_t')
+
+    def __init__(self):
+        self.chunks = 0
+        self.count = 0
+        self.on_task = 0
+        self.off_screen = 0
+        self.off_screen_ms = 0
+        self.first_t = 0
+        self.last_t = 0
+
+    def add(
+        self,
+        t_ms: np.ndarray,
+        x: np.ndarray,
+        y: np.ndarray,
+        question_box: Optional[Tuple[float, ...]],
+    ) -> TraceSlice:
+        """
+        Fold in a batch from ``decode_gaze_batch`` and return its trace
+        slice; raises ValueError if it goes back in time
+        """
+        self.chunks += 1
+        total = len(t_ms)
+        if not total:
+            return b'', b''
+        if self.count and t_ms[0] < self.last_t:
+            raise ValueError('gaze sample times must not decrease')
+
+        off_screen = np.isnan(x) | np.isnan(y)
+        if question_box is None:
+            on_task = np.zeros(total, dtype=bool)
+        else:
+            # float64 edges, so the float32 coordinates are compared exactly
+            left, top, right, bottom = np.asarray(question_box, dtype=np.float64)
+            # NaN compares false, so off-screen samples are never on task
+            on_task = (x >= left) & (x <= right) & (y >= top) & (y <= bottom)
+
+        if not self.count:
+            self.first_t = int(t_ms[0])
+        gaps = np.diff(t_ms, prepend=self.last_t if self.count else t_ms[0])
+        self.off_screen_ms += int(gaps[off_screen].sum())
+
+        # Every ATTENTION_TRACE_STRIDE-th sample of the question, counted across batches
+        stride = settings.ATTENTION_TRACE_STRIDE
+        first = -self.count % stride
+        trace_slice = (
+            (t_ms[first::stride] - self.first_t).astype('<u4').tobytes(),
+            on_task[first::stride].tobytes(),
+        )
+
+        self.count += total
+        self.on_task += int(np.count_nonzero(on_task))
+        self.off_screen += int(np.count_nonzero(off_screen))
+        self.last_t = int(t_ms[-1])
+        return trace_slice
+
+    def metrics(self, trace: Optional[Iterable[TraceSlice]]) -> Optional[dict]:
+        """
+        Attention metrics in the shape ``AnswerSubmissionSerializer`` stores
+        (the trace already packed as ``attention_trace``, from the slices
+        ``add`` returned, in order; None leaves it out), or None when there
+        are no samples.
+        """
+        if not self.count:
+            return None
+
+        num_off_task = self.count - self.on_task
+        attention_ratio = self.on_task / self.count
+        if num_off_task > self.on_task * CONFUSION_RATIO:
+            attention_ratio *= CONFUSION_PENALTY
+
+        attention_trace = None
+        if trace is not None:
+            trace = list(trace)
+            attention_trace = encode_samples(
+                np.frombuffer(b''.join(times for times, _ in trace), dtype='<u4').tolist(),
+                np.frombuffer(b''.join(flags for _, flags in trace), dtype=bool).tolist(),
+            )
+
+        return {
+            'attention_ratio': attention_ratio,
+            'off_screen_ratio': self.off_screen / self.count,
+            'off_screen_duration_ms': self.off_screen_ms,
+            'num_gaze_samples': self.count,
+            'num_on_task_samples': self.on_task,
+            'num_off_task_samples': num_off_task,
+            'attention_trace': attention_trace,
+        }
+
+
+def compute_attention_metrics(
+    t_ms: np.ndarray,
+    x: np.ndarray,
+    y: np.ndarray,
+    question_box: Optional[Tuple[float, ...]],
+) -> Optional[dict]:
+    """Attention metrics of one complete batch (see ``AttentionCounters``)"""
+    counters = AttentionCounters()
+    trace_slice = counters.add(t_ms, x, y, question_box)
+    return counters.metrics([trace_slice])
+
+
+def attention_metrics_from_batch(batch) -> Optional[dict]:
+    """``decode_gaze_batch`` then ``compute_attention_metrics``"""
+    return compute_attention_metrics(*decode_gaze_batch(batch))
+
+
+def _question_box(value) -> Optional[Tuple[float, ...]]:
+    if value is None:
+        return None
+    if not isinstance(value, (list, tuple)) or len(value) != 4:
+        raise ValueError('question_box must be [left, top, right, bottom]')
+    try:
+        box = tuple(float(edge) for edge in value)
+    except (TypeError, ValueError):
+        raise ValueError('question_box must be [left, top, right, bottom]')
+    left, top, right, bottom = box
+    if not all(map(math.isfinite, box)) or left > right or top > bottom:
+        raise ValueError('question_box must be [left, top, right, bottom]')
+    return box
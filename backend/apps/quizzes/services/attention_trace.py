@@ -0,0 +1,153 @@
+"""
+Attention Trace Codec
+Compact binary encoding of the downsampled gaze trace stored on each attempt
+"""
+import math
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# Layout (version 1):
+#   version byte
+#   varint sample count
+#   zigzag varint first t_ms, then zigzag varint deltas between samples
+#   flags mode byte, then either a packed bitset of on_task flags
+#   (FLAGS_BITSET) or alternating run lengths starting with the on_task
+#   value in bit 1 of the mode byte (FLAGS_RUNS), whichever is smaller
+FORMAT_VERSION = 1
+FLAGS_BITSET = 0
+FLAGS_RUNS = 1
+
+
+def encode_trace(trace) -> Optional[bytes]:
+    """
+    Encode a ``[{t_ms, on_task}, ...]`` trace as bytes.
+
+    Empty or missing traces are stored as None. Raises ValueError for
+    anything that isn't a list of samples.
+    """
+    if not trace:
+        return None
+    if not isinstance(trace, list):
+        raise ValueError('attention trace must be a list')
+
+    times = []
+    flags = []
+    for sample in trace:
+        if not isinstance(sample, dict) or 't_ms' not in sample:
+            raise ValueError('attention trace samples must be objects with t_ms and on_task')
+        try:
+            t_ms = float(sample['t_ms'])
+        except (TypeError, ValueError):
+            t_ms = math.nan
+        if not math.isfinite(t_ms):
+            raise ValueError(f'invalid t_ms in attention trace: {sample["t_ms"]!r}')
+        times.append(int(round(t_ms)))
+        flags.append(bool(sample.get('on_task')))
+
+    return encode_samples(times, flags)
+
+
+def encode_samples(times: List[int], flags: List[bool]) -> Optional[bytes]:
+    """Encode parallel lists of sample times (ms) and on_task flags"""
+    if not times:
+        return None
+
+    out = bytearray([FORMAT_VERSION])
+    _write_varint(out, len(times))
+
+    previous = 0
+    for t_ms in times:
+        _write_varint(out, _zigzag(t_ms - previous))
+        previous = t_ms
+
+    bitset = _pack_bits(flags)
+    runs = bytearray()
+    for _, length in _runs(flags):
+        _write_varint(runs, length)
+    if len(runs) < len(bitset):
+        out.append(FLAGS_RUNS | (2 if flags[0] else 0))
+        out += runs
+    else:
+        out.append(FLAGS_BITSET)
+        out += bitset
+
+    return bytes(out)
+
+
+def decode_trace(data) -> Optional[List[Dict]]:
+    """Rebuild the ``[{t_ms, on_task}, ...]`` list from ``encode_trace`` output"""
+    if data is None:
+        return None
+    data = bytes(data)
+    if not data:
+        return []
+    if data[0] != FORMAT_VERSION:
+        raise ValueError(f'unsupported attention trace format: {data[0]}')
+
+    count, pos = _read_varint(data, 1)
+    times = []
+    t_ms = 0
+    for _ in range(count):
+        delta, pos = _read_varint(data, pos)
+        t_ms += _unzigzag(delta)
+        times.append(t_ms)
+
+    if not count:
+        return []
+
+    mode = data[pos]
+    pos += 1
+    if mode & 1 == FLAGS_RUNS:
+        flags = []
+        value = bool(mode & 2)
+        while len(flags) < count:
+            length, pos = _read_varint(data, pos)
+            flags.extend([value] * length)
+            value = not value
+    else:
+        flags = [bool(data[pos + i // 8] >> (i % 8) & 1) for i in range(count)]
+
+    return [{'t_ms': t, 'on_task': flag} for t, flag in zip(times, flags)]
+
+
+def _runs(flags: List[bool]) -> Iterator[Tuple[bool, int]]:
+    start = 0
+    for i in range(1, len(flags) + 1):
+        if i == len(flags) or flags[i] != flags[start]:
+            yield flags[start], i - start
+            start = i
+
+
+def _pack_bits(flags: List[bool]) -> bytearray:
+    packed = bytearray((len(flags) + 7) // 8)
+    for i, flag in enumerate(flags):
+        if flag:
+            packed[i // 8] |= 1 << (i % 8)
+    return packed
+
+
+def _zigzag(value: int) -> int:
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -(value >> 1) - 1
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
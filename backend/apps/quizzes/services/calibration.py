@@ -0,0 +1,226 @@
+"""
+Question Calibration
+Offline fit of 2PL item parameters (difficulty and discrimination) from
+the attempts of finished quiz sessions
+"""
+import math
+from datetime import timedelta
+from typing import Dict
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import CalibrationCheckpoint, Chapter, Question, QuestionAttempt
+from .question_pool import DEFAULT_IRT_DIFFICULTY, DEFAULT_IRT_DISCRIMINATION
+
+
+# Sessions that ended less than this long ago are left for the next run, so
+# an answer committed just after the run started can't fall behind the
+# checkpoint
+SETTLE_SECONDS = 60
+
+# Marginal maximum likelihood by EM (Bock-Aitkin): abilities are
+# integrated over a fixed grid under a N(0, 1) prior, which also fixes the
+# scale of the item parameters
+ITERATIONS = 30
+ABILITY_GRID_POINTS = 41
+PARAMETER_BOUND = 4.0
+MIN_DISCRIMINATION = 0.2
+MAX_DISCRIMINATION = 4.0
+MAX_LOG_DISCRIMINATION_STEP = 0.5
+# Responses per block in the E-step, bounding memory to about
+# RESPONSE_BLOCK * ABILITY_GRID_POINTS floats
+RESPONSE_BLOCK = 200000
+
+# Prior precision of an uncalibrated question's parameters around its label
+# default, and the precision each response already fitted adds on
+# incremental runs (roughly the Fisher information of one response)
+BASE_PRIOR_PRECISION = 1.0
+PRECISION_PER_RESPONSE = 0.2
+
+
+def calibrate_chapter(chapter_id: int, full: bool = False, chunk_size: int = 5000) -> Dict:
+    """
+    Fit the parameters of one chapter's questions and write them back.
+
+    Incremental runs only read sessions that ended since the chapter's
+    checkpoint; each question's current parameters act as the prior,
+    weighted by the responses they were fitted on. ``full`` starts over from
+    the easy/medium/hard defaults and every finished session.
+
+    Runs in its own process when called from ``calibrate_questions``, so it
+    takes and returns plain values.
+    """
+    import numpy as np
+
+    chapter = Chapter.objects.get(pk=chapter_id)
+    checkpoint, _ = CalibrationCheckpoint.objects.get_or_create(chapter=chapter)
+    since = None if full else checkpoint.last_session_ended_at
+    until = timezone.now() - timedelta(seconds=SETTLE_SECONDS)
+
+    questions = list(Question.objects.filter(chapter_id=chapter_id).values_list(
+        'id', 'difficulty', 'irt_difficulty', 'irt_discrimination', 'irt_responses'
+    ))
+    item_index = {row[0]: i for i, row in enumerate(questions)}
+
+    attempts = QuestionAttempt.objects.filter(
+        quiz_session__chapter_id=chapter_id,
+        quiz_session__ended_at__lte=until,
+        was_skipped=False,
+    )
+    if since is not None:
+        attempts = attempts.filter(quiz_session__ended_at__gt=since)
+
+    session_index: Dict = {}
+    sessions = []
+    items = []
+    outcomes = []
+    for session_id, question_id, is_correct in attempts.values_list(
+        'quiz_session_id', 'question_id', 'is_correct'
+    ).iterator(chunk_size=chunk_size):
+        sessions.append(session_index.setdefault(session_id, len(session_index)))
+        items.append(item_index[question_id])
+        outcomes.append(is_correct)
+
+    result = {
+        'chapter': chapter.slug,
+        'sessions': len(session_index),
+        'responses': len(outcomes),
+        'questions': 0,
+    }
+
+    prior_b = np.empty(len(questions))
+    prior_log_a = np.empty(len(questions))
+    prior_precision = np.empty(len(questions))
+    seen = np.empty(len(questions), dtype=np.int64)
+    for i, (_, difficulty, irt_difficulty, irt_discrimination, irt_responses) in enumerate(questions):
+        default_b = DEFAULT_IRT_DIFFICULTY.get(difficulty, 0.0)
+        if full or irt_difficulty is None:
+            prior_b[i] = default_b
+            prior_log_a[i] = math.log(DEFAULT_IRT_DISCRIMINATION)
+            seen[i] = 0
+        else:
+            prior_b[i] = irt_difficulty
+            prior_log_a[i] = math.log(irt_discrimination or DEFAULT_IRT_DISCRIMINATION)
+            seen[i] = irt_responses
+        prior_precision[i] = BASE_PRIOR_PRECISION + PRECISION_PER_RESPONSE * seen[i]
+
+    counts = np.bincount(np.array(items, dtype=np.int64), minlength=len(questions))
+    b, log_a = fit_parameters(
+        np.array(sessions, dtype=np.int64),
+        np.array(items, dtype=np.int64),
+        np.array(outcomes, dtype=np.float64),
+        prior_b,
+        prior_log_a,
+        prior_precision,
+    )
+
+    updated = []
+    for i in np.flatnonzero(counts):
+        updated.append(Question(
+            id=questions[i][0],
+            irt_difficulty=round(float(b[i]), 4),
+            irt_discrimination=round(float(np.exp(log_a[i])), 4),
+            irt_responses=int(seen[i] + counts[i]),
+        ))
+    result['questions'] = len(updated)
+
+    with transaction.atomic():
+        if full:
+            # Questions nobody answered in the full history go back to their label
+            Question.objects.filter(chapter_id=chapter_id).update(
+                irt_difficulty=None, irt_discrimination=None, irt_responses=0
+            )
+        Question.objects.bulk_update(
+            updated, ['irt_difficulty', 'irt_discrimination', 'irt_responses'], batch_size=500
+        )
+        checkpoint.last_session_ended_at = until
+        if full:
+            checkpoint.sessions_processed = 0
+            checkpoint.responses_processed = 0
+        checkpoint.sessions_processed += result['sessions']
+        checkpoint.responses_processed += result['responses']
+        checkpoint.save()
+
+    return result
+
+
+def fit_parameters(sessions, items, outcomes, prior_b, prior_log_a, prior_precision, iterations: int = ITERATIONS):
+    """
+    MAP item parameters under the 2PL model, abilities marginalized.
+
+    ``sessions``, ``items`` and ``outcomes`` are parallel arrays with one
+    entry per response (session index, item index, 1.0 if correct). Item
+    parameters have independent Gaussian priors on ``b`` and ``log a`` with
+    the given precision. Returns ``(b, log_a)`` arrays; items without
+    responses keep their prior.
+    """
+    import numpy as np
+
+    b = prior_b.astype(np.float64).copy()
+    log_a = prior_log_a.astype(np.float64).copy()
+    if not len(outcomes):
+        return b, log_a
+
+    n_sessions = int(sessions.max()) + 1
+    n_items = len(b)
+    grid = np.linspace(-PARAMETER_BOUND, PARAMETER_BOUND, ABILITY_GRID_POINTS)
+    log_prior = -0.5 * grid * grid
+    # A response's likelihood only depends on its item and outcome, so it is
+    # looked up by code = 2 * item + correct in a per-iteration table
+    codes = items * 2 + (outcomes > 0.5)
+
+    for _ in range(iterations):
+        a = np.exp(log_a)
+        z = a[:, None] * (grid[None, :] - b[:, None])
+        table = np.empty((ABILITY_GRID_POINTS, 2 * n_items))
+        table[:, 0::2] = -np.logaddexp(0.0, z).T
+        table[:, 1::2] = -np.logaddexp(0.0, -z).T
+
+        # E-step: posterior weight of each grid point for each session.
+        # Arrays are (grid point, response) so each row is one bincount.
+        log_posterior = np.tile(log_prior[:, None], (1, n_sessions))
+        for block in _blocks(len(codes)):
+            for point, row in enumerate(table[:, codes[block]]):
+                log_posterior[point] += np.bincount(sessions[block], row, n_sessions)
+        log_posterior -= log_posterior.max(axis=0)
+        weights = np.exp(log_posterior)
+        weights /= weights.sum(axis=0)
+
+        # Expected number of wrong and correct responses per item and grid point
+        counts = np.zeros((ABILITY_GRID_POINTS, 2 * n_items))
+        for block in _blocks(len(codes)):
+            for point, row in enumerate(weights[:, sessions[block]]):
+                counts[point] += np.bincount(codes[block], row, 2 * n_items)
+        expected_correct = counts[:, 1::2].T
+        expected = counts[:, 0::2].T + expected_correct
+
+        # M-step: one Newton step on each item's difficulty, then discrimination
+        p = _probability(a[:, None], grid[None, :], b[:, None])
+        residual = expected_correct - expected * p
+        information = expected * p * (1.0 - p)
+        gradient = -a * residual.sum(axis=1) - prior_precision * (b - prior_b)
+        curvature = a * a * information.sum(axis=1) + prior_precision
+        b = np.clip(b + gradient / curvature, -PARAMETER_BOUND, PARAMETER_BOUND)
+
+        distance = grid[None, :] - b[:, None]
+        p = _probability(a[:, None], grid[None, :], b[:, None])
+        residual = expected_correct - expected * p
+        information = expected * p * (1.0 - p)
+        gradient = a * (distance * residual).sum(axis=1) - prior_precision * (log_a - prior_log_a)
+        curvature = a * a * (distance * distance * information).sum(axis=1) + prior_precision
+        step = np.clip(gradient / curvature, -MAX_LOG_DISCRIMINATION_STEP, MAX_LOG_DISCRIMINATION_STEP)
+        log_a = np.clip(log_a + step, math.log(MIN_DISCRIMINATION), math.log(MAX_DISCRIMINATION))
+
+    return b, log_a
+
+
+def _blocks(length: int):
+    for start in range(0, length, RESPONSE_BLOCK):
+        yield slice(start, min(start + RESPONSE_BLOCK, length))
+
+
+def _probability(a, theta, b):
+    import numpy as np
+
+    return 1.0 / (1.0 + np.exp(-a * (theta - b)))
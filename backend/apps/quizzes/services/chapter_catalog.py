@@ -0,0 +1,79 @@
+"""
+Chapter Catalog
+Cached list of active chapters with per-difficulty question counts,
+served by the chapters endpoint with a strong ETag
+"""
+import hashlib
+import json
+import uuid
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count
+
+from ..models import Chapter, Question
+from ..serializers import ChapterSerializer
+
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+VERSION_KEY = 'chapter-catalog:version'
+
+
+def get_chapter_catalog() -> Tuple[str, List[Dict]]:
+    """
+    Return ``(etag, chapters)`` for the active chapter list.
+    
+    Entries are stored in the ``CHAPTER_CATALOG_CACHE_ALIAS`` cache under
+    the current catalog version. ``invalidate_chapter_catalog`` moves to a
+    new version, so a catalog built from data read before an edit is never
+    served after it.
+    """
+    cache = caches[settings.CHAPTER_CATALOG_CACHE_ALIAS]
+    entry_key = f'chapter-catalog:{catalog_version()}'
+    entry = cache.get(entry_key)
+    if entry is None:
+        entry = build_chapter_catalog()
+        cache.set(entry_key, entry, timeout=settings.CHAPTER_CATALOG_TTL_SECONDS)
+    return entry
+
+
+def catalog_version() -> str:
+    """
+    The current catalog version. It lives in the cache, so every worker
+    sharing that cache sees the same one, and it changes whenever a
+    chapter or question is saved or deleted.
+    """
+    cache = caches[settings.CHAPTER_CATALOG_CACHE_ALIAS]
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate_chapter_catalog() -> None:
+    """Switch to a new catalog version; the next request rebuilds it"""
+    caches[settings.CHAPTER_CATALOG_CACHE_ALIAS].set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def build_chapter_catalog() -> Tuple[str, List[Dict]]:
+    """Query the active chapters and their question counts (two queries)"""
+    counts: Dict[int, Dict[str, int]] = {}
+    for row in Question.objects.filter(
+        is_active=True, chapter__is_active=True
+    ).values('chapter_id', 'difficulty').annotate(count=Count('id')):
+        counts.setdefault(row['chapter_id'], {})[row['difficulty']] = row['count']
+    
+    chapters = ChapterSerializer(Chapter.objects.filter(is_active=True), many=True).data
+    catalog = []
+    for chapter in chapters:
+        by_difficulty = counts.get(chapter['id'], {})
+        question_counts = {diff: by_difficulty.get(diff, 0) for diff in DIFFICULTIES}
+        question_counts['total'] = sum(by_difficulty.values())
+        catalog.append(dict(chapter, question_counts=question_counts))
+    
+    payload = json.dumps(catalog, sort_keys=True, separators=(',', ':'))
+    etag = '"%s"' % hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+    return etag, catalog
@@ -0,0 +1,183 @@
+"""
+ITS Decision Tracing
+Structured events for each ability update (which rule fired, ability
+before/after, target difficulty), sent to pluggable sinks
+"""
+import json
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone as dt_timezone
+from typing import Iterable, List, Optional
+from uuid import UUID
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+class DecisionEvent:
+    """
+    One ability update. Built only for traced sessions and formatted only
+    by the sinks that need text (``to_dict`` / ``__str__``).
+    """
+    __slots__ = (
+        'session_id', 'question_index', 'estimator', 'rule', 'is_correct', 'attention_ratio',
+        'off_screen_ratio', 'response_time_ms', 'ability_before', 'ability_after',
+        'target_difficulty', 'timestamp',
+    )
+
+    def __init__(
+        self,
+        session_id: UUID,
+        question_index: Optional[int],
+        estimator: str,
+        rule: str,
+        is_correct: bool,
+        attention_ratio: Optional[float],
+        off_screen_ratio: Optional[float],
+        response_time_ms: int,
+        ability_before: float,
+        ability_after: float,
+        target_difficulty: Optional[str] = None,
+    ):
+        self.session_id = session_id
+        self.question_index = question_index
+        self.estimator = estimator
+        self.rule = rule
+        self.is_correct = is_correct
+        self.attention_ratio = attention_ratio
+        self.off_screen_ratio = off_screen_ratio
+        self.response_time_ms = response_time_ms
+        self.ability_before = ability_before
+        self.ability_after = ability_after
+        self.target_difficulty = target_difficulty
+        self.timestamp = time.time()
+
+    def to_dict(self) -> dict:
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data['session_id'] = str(self.session_id)
+        data['timestamp'] = datetime.fromtimestamp(self.timestamp, dt_timezone.utc).isoformat()
+        return data
+
+    def __str__(self):
+        return (
+            f'session={self.session_id} Q{self.question_index} {self.estimator}:{self.rule} '
+            f'correct={self.is_correct} attention={_format_ratio(self.attention_ratio)} '
+            f'time={self.response_time_ms}ms ability {self.ability_before}->{self.ability_after} '
+            f'target={self.target_difficulty}'
+        )
+
+
+class MemorySink:
+    """Ring buffer of the most recent events; serves the decisions debug endpoint"""
+
+    def __init__(self, max_events: int):
+        self.events = deque(maxlen=max_events)
+
+    def emit(self, event: DecisionEvent) -> None:
+        self.events.append(event)  # deque.append is atomic
+
+    def recent(self, session_id: UUID, limit: int) -> List[DecisionEvent]:
+        """The session's last ``limit`` events, oldest first"""
+        found = []
+        for event in reversed(list(self.events)):
+            if event.session_id == session_id:
+                found.append(event)
+                if len(found) >= limit:
+                    break
+        found.reverse()
+        return found
+
+
+class JSONLSink:
+    """Appends one JSON object per event to a file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def emit(self, event: DecisionEvent) -> None:
+        line = json.dumps(event.to_dict(), separators=(',', ':')) + '\n'
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8', buffering=1)
+            self._file.write(line)
+
+
+class LoggerSink:
+    """Logs events at INFO; the message is only formatted if a handler takes it"""
+
+    def __init__(self, name: str = 'apps.quizzes.decisions'):
+        self.logger = logging.getLogger(name)
+
+    def emit(self, event: DecisionEvent) -> None:
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info('ITS decision %s', event)
+
+
+class DecisionTracer:
+    """
+    Sends the decisions of sampled sessions to every sink.
+
+    Sampling is per session (by its UUID), so a traced session has all of
+    its decisions. Callers check ``traces(session_id)`` before building an
+    event, so with no sinks configured tracing costs one attribute test.
+    Events are sent once the surrounding transaction commits, so an answer
+    that is rolled back and retried is traced once.
+    """
+
+    def __init__(self, sinks: Iterable = (), sample_rate: float = 1.0):
+        self.sinks = list(sinks)
+        self.enabled = bool(self.sinks) and sample_rate > 0
+        self.threshold = int(min(sample_rate, 1.0) * 10000)
+
+    def traces(self, session_id: UUID) -> bool:
+        return self.enabled and session_id.int % 10000 < self.threshold
+
+    def emit(self, event: DecisionEvent) -> None:
+        transaction.on_commit(lambda: self._send(event))
+
+    def _send(self, event: DecisionEvent) -> None:
+        for sink in self.sinks:
+            sink.emit(event)
+
+    def memory_sink(self) -> Optional[MemorySink]:
+        for sink in self.sinks:
+            if isinstance(sink, MemorySink):
+                return sink
+        return None
+
+
+_decision_tracer: Optional[DecisionTracer] = None
+_decision_tracer_lock = threading.Lock()
+
+
+def get_decision_tracer() -> DecisionTracer:
+    """Return the process-wide tracer, built from settings on first use"""
+    global _decision_tracer
+    if _decision_tracer is None:
+        with _decision_tracer_lock:
+            if _decision_tracer is None:
+                _decision_tracer = _build_decision_tracer()
+    return _decision_tracer
+
+
+def _build_decision_tracer() -> DecisionTracer:
+    sinks = []
+    for name in settings.ITS_TRACE_SINKS:
+        if name == 'memory':
+            sinks.append(MemorySink(settings.ITS_TRACE_BUFFER_SIZE))
+        elif name == 'jsonl':
+            sinks.append(JSONLSink(settings.ITS_TRACE_FILE))
+        elif name == 'logger':
+            sinks.append(LoggerSink())
+        else:
+            sinks.append(import_string(name)())
+    return DecisionTracer(sinks, settings.ITS_TRACE_SAMPLE_RATE)
+
+
+def _format_ratio(value: Optional[float]) -> str:
+    return 'n/a' if value is None else f'{value:.2f}'
@@ -0,0 +1,175 @@
+"""
+Gaze Aggregate Store
+Running attention counters per (session, question index), folded from the
+gaze chunks a student uploads while answering and read with the answer
+"""
+import pickle
+import threading
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+
+from .attention import AttentionCounters, TraceSlice, decode_gaze_batch
+from .session_state import DjangoStateBackend, LocalStateBackend
+
+
+class GazeChunkOutOfOrder(Exception):
+    """Raised for a chunk past the next one expected"""
+
+    def __init__(self, expected_seq: int):
+        super().__init__(f'expected gaze chunk {expected_seq}')
+        self.expected_seq = expected_seq
+
+
+class GazeStore:
+    """
+    Bounded store of attention counters keyed by session and question index.
+
+    Each chunk gets its own entry holding the chunk's trace slice together
+    with the question's AttentionCounters after it. Chunk entries are
+    written with an atomic add, which is what claims the chunk's ``seq``:
+    of two uploads of the same chunk only one lands, and only it moves the
+    counters on. A small head entry per question points at the latest
+    counters so a chunk is normally folded with one read and two writes,
+    but it is only a hint: if it lags behind (evicted, or its worker died
+    between the two writes) the chunk entries after it are followed. Folding
+    a chunk reads and writes O(chunk size); the slices are joined once, when
+    the answer asks for the metrics.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def add_chunk(self, session_id, question_index: int, seq: int, batch) -> AttentionCounters:
+        """
+        Fold chunk ``seq`` (numbered from 0) into the question's counters.
+
+        A chunk that was already folded in (a retried upload) is ignored; one
+        past the next expected raises GazeChunkOutOfOrder. Raises ValueError
+        for a malformed batch or more than ``ATTENTION_MAX_GAZE_SAMPLES``
+        samples for the question.
+        """
+        key = self._key(session_id, question_index)
+        counters = self._load(key) or AttentionCounters()
+        decoded = None
+        while True:
+            if seq < counters.chunks:
+                return counters
+            if seq > counters.chunks:
+                stored = self._load_chunk(key, counters.chunks)
+                if stored is None:
+                    raise GazeChunkOutOfOrder(counters.chunks)
+                # The head lags behind the chunks
+                counters = stored[0]
+                continue
+
+            if decoded is None:
+                decoded = decode_gaze_batch(batch)
+            t_ms, x, y, question_box = decoded
+            if counters.count + len(t_ms) > settings.ATTENTION_MAX_GAZE_SAMPLES:
+                raise ValueError(f'at most {settings.ATTENTION_MAX_GAZE_SAMPLES} gaze samples are accepted per question')
+            trace_slice = counters.add(t_ms, x, y, question_box)
+            if self.backend.add(self._chunk_key(key, seq), pickle.dumps((counters, trace_slice), pickle.HIGHEST_PROTOCOL)):
+                self.backend.set(key, pickle.dumps(counters, pickle.HIGHEST_PROTOCOL))
+                return counters
+
+            # A concurrent upload of this chunk got there first
+            stored = self._load_chunk(key, seq)
+            if stored is not None:
+                return self._follow(key, stored[0])
+            # ... and was evicted since, so claim it again
+            counters = self._load(key) or AttentionCounters()
+
+    def metrics(self, session_id, question_index: int) -> Optional[dict]:
+        """
+        The question's attention metrics (see ``AttentionCounters.metrics``),
+        or None if no samples were uploaded. The trace is left out if any
+        of its chunks has been evicted.
+        """
+        key = self._key(session_id, question_index)
+        counters, trace = self._latest(key)
+        if counters is None:
+            return None
+        return counters.metrics(trace)
+
+    def discard(self, session_id, question_index: int) -> None:
+        key = self._key(session_id, question_index)
+        counters, _ = self._latest(key)
+        chunks = counters.chunks if counters is not None else 0
+        self.backend.delete_many([key, *(self._chunk_key(key, seq) for seq in range(chunks))])
+
+    def _latest(self, key: str) -> Tuple[Optional[AttentionCounters], Optional[List[TraceSlice]]]:
+        """
+        The question's latest counters and its trace slices (None if any is
+        missing). The chunk after the head's last is read along with the
+        others, so a head that lags behind costs no extra round trip.
+        """
+        counters = self._load(key)
+        chunks = counters.chunks if counters is not None else 0
+        chunk_keys = [self._chunk_key(key, seq) for seq in range(chunks + 1)]
+        stored = {
+            chunk_key: pickle.loads(value)
+            for chunk_key, value in self.backend.get_many(chunk_keys).items()
+        }
+        while chunk_keys[-1] in stored:
+            counters = stored[chunk_keys[-1]][0]
+            chunk_keys.append(self._chunk_key(key, counters.chunks))
+            entry = self._load_chunk(key, counters.chunks)
+            if entry is not None:
+                stored[chunk_keys[-1]] = entry
+        chunk_keys.pop()
+
+        trace = None
+        if all(chunk_key in stored for chunk_key in chunk_keys):
+            trace = [stored[chunk_key][1] for chunk_key in chunk_keys]
+        return counters, trace
+
+    def _follow(self, key: str, counters: AttentionCounters) -> AttentionCounters:
+        """The counters after the last chunk stored from ``counters`` on"""
+        while True:
+            stored = self._load_chunk(key, counters.chunks)
+            if stored is None:
+                return counters
+            counters = stored[0]
+
+    def _load(self, key: str) -> Optional[AttentionCounters]:
+        value = self.backend.get(key)
+        return pickle.loads(value) if value is not None else None
+
+    def _load_chunk(self, key: str, seq: int) -> Optional[Tuple[AttentionCounters, TraceSlice]]:
+        """The counters after chunk ``seq`` and its trace slice"""
+        value = self.backend.get(self._chunk_key(key, seq))
+        return pickle.loads(value) if value is not None else None
+
+    @staticmethod
+    def _key(session_id, question_index: int) -> str:
+        return f'quiz-gaze:{session_id}:{question_index}'
+
+    @staticmethod
+    def _chunk_key(key: str, seq: int) -> str:
+        return f'{key}:{seq}'
+
+
+_gaze_store: Optional[GazeStore] = None
+_gaze_store_lock = threading.Lock()
+
+
+def get_gaze_store() -> GazeStore:
+    """Return the process-wide gaze store, built from settings on first use"""
+    global _gaze_store
+    if _gaze_store is None:
+        with _gaze_store_lock:
+            if _gaze_store is None:
+                _gaze_store = _build_gaze_store()
+    return _gaze_store
+
+
+def _build_gaze_store() -> GazeStore:
+    backend_name = settings.GAZE_STORE_BACKEND
+    ttl = settings.GAZE_STORE_TTL_SECONDS
+    if backend_name == 'memory':
+        return GazeStore(LocalStateBackend(settings.GAZE_STORE_MAX_ENTRIES, ttl))
+    if backend_name == 'django':
+        return GazeStore(DjangoStateBackend(settings.GAZE_STORE_CACHE_ALIAS, ttl))
+
+    raise ValueError(f'Unknown GAZE_STORE_BACKEND: {backend_name}')
@@ -1,40 +1,394 @@
 """
 LLM Client for generating quiz summaries using OpenRouter
 """
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Iterator, Optional, Tuple
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from openai import OpenAI
+from django.utils import timezone
+from openai import (
+    AsyncOpenAI, OpenAI, Timeout, APIConnectionError, APIStatusError, APITimeoutError,
+    InternalServerError, RateLimitError
+)
 from ..models import QuizSession
+from .metrics import timed
+from .summary_cache import get_summary_cache, summary_cache_key
 
+logger = logging.getLogger(__name__)
 
-def generate_quiz_summary(session: QuizSession, summary_data: dict) -> str:
+# Errors worth retrying; anything else (auth, bad request, ...) fails immediately.
+# Only these count toward opening the circuit: a misconfigured key or one
+# oversized prompt must not lock every user out of the LLM.
+RETRYABLE_ERRORS = (APIConnectionError, APITimeoutError, InternalServerError, RateLimitError)
+
+
+class LLMUnavailableError(Exception):
+    """Raised when a call is refused locally (circuit open or too many in flight)"""
+
+
+class CircuitBreaker:
     """
-    Generate a personalized feedback summary using LLM via OpenRouter.
+    Consecutive-failure circuit breaker.
     
-    Args:
-        session: The QuizSession instance
-        summary_data: Dictionary containing aggregated stats
+    After ``failure_threshold`` failed calls the circuit opens and calls are
+    refused for ``reset_seconds``. The next call after that is let through as
+    a probe: success closes the circuit, failure opens it again.
+    """
     
-    Returns:
-        Generated summary text
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+    
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                # Half-open: let this call probe, refuse the rest until it reports
+                self._opened_at = time.monotonic()
+                return True
+            return False
+    
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+    
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class AsyncSlots:
+    """
+    Cap on async calls in flight shared by every event loop.
+    
+    A call that finds no free slot parks on a future in its own loop; a
+    release hands the slot straight to the oldest waiter and wakes it with
+    ``call_soon_threadsafe``, so waiting costs nothing until then.
+    Whether a waiter got the slot is decided under the lock, by whether the
+    release took it off the queue before it gave up.
+    """
+    
+    def __init__(self, limit: int):
+        self._lock = threading.Lock()
+        self._free = limit
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+    
+    async def acquire(self, timeout: float) -> bool:
+        """Take a slot within ``timeout`` seconds; returns whether one was taken"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._free:
+                self._free -= 1
+                return True
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter[1]), timeout)
+        except asyncio.TimeoutError:
+            return self._handed_over(waiter)
+        except asyncio.CancelledError:
+            if self._handed_over(waiter):
+                self.release()
+            raise
+        return True
+    
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                loop, future = self._waiters.popleft()
+                try:
+                    loop.call_soon_threadsafe(_wake, future)
+                    return
+                except RuntimeError:
+                    # Its loop has closed; nobody is left there to take the slot
+                    continue
+            self._free += 1
+    
+    def _handed_over(self, waiter) -> bool:
+        """Stop waiting; returns True if a release got to the waiter first"""
+        with self._lock:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                return True
+            return False
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+_client: Optional[OpenAI] = None
+_client_lock = threading.Lock()
+_concurrency: Optional[threading.BoundedSemaphore] = None
+_circuit: Optional[CircuitBreaker] = None
+# Async clients can't move between event loops, so each loop gets its own,
+# with the task that closes it when the loop shuts down
+_async_clients: Dict[asyncio.AbstractEventLoop, Tuple[AsyncOpenAI, asyncio.Task]] = {}
+# Shared by all loops, so the cap holds however many are running
+_async_concurrency: Optional[AsyncSlots] = None
+
+
+def get_llm_client() -> OpenAI:
+    """
+    Return the process-wide OpenRouter client, created on first use.
+    
+    The client is thread-safe and keeps its HTTP connection pool alive
+    between calls. Retries are handled by ``create_chat_completion`` so the
+    SDK's own retry loop is disabled.
+    """
+    global _client, _concurrency
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _concurrency = threading.BoundedSemaphore(settings.LLM_MAX_CONCURRENCY)
+                _ensure_circuit()
+                _client = OpenAI(**_client_options())
+    return _client
+
+
+def get_async_llm_client() -> AsyncOpenAI:
+    """
+    Return the OpenRouter client for async views in the running event loop,
+    created on first use there (async clients can't move between loops).
+    
+    The client is closed when its loop shuts down: asyncio.run(), which
+    ASGI servers and async_to_sync use, cancels the task that closes it.
+    All loops share one cap of ``LLM_MAX_CONCURRENCY`` async calls in
+    flight, separate from the sync client's, and the circuit breaker.
+    """
+    global _async_concurrency
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(loop)
+    if entry is None:
+        with _client_lock:
+            entry = _async_clients.get(loop)
+            if entry is None:
+                _ensure_circuit()
+                # Loops closed without cancelling their tasks never ran the close
+                for closed in [other for other in _async_clients if other.is_closed()]:
+                    del _async_clients[closed]
+                if _async_concurrency is None:
+                    _async_concurrency = AsyncSlots(settings.LLM_MAX_CONCURRENCY)
+                client = AsyncOpenAI(**_client_options())
+                entry = _async_clients[loop] = (client, loop.create_task(_close_at_shutdown(loop, client)))
+    return entry[0]
+
+
+async def _close_at_shutdown(loop: asyncio.AbstractEventLoop, client: AsyncOpenAI) -> None:
+    """
+    Wait until cancelled (by the loop shutting down or a reset), then close
+    ``client``. A loop closed without cancelling its tasks never gets here;
+    its entry is pruned when the next client is created.
     """
     try:
-        # Initialize OpenRouter client
-        client = OpenAI(
-            base_url=settings.OPENROUTER_BASE_URL,
-            api_key=settings.OPENROUTER_API_KEY,
+        await asyncio.Event().wait()
+    except asyncio.CancelledError:
+        await client.close()
+        raise
+    finally:
+        # No lock: if its loop was abandoned this runs from the garbage collector
+        if _async_clients.get(loop, (None,))[0] is client:
+            _async_clients.pop(loop, None)
+
+
+def reset_llm_client() -> None:
+    """Close the shared clients so the next call rebuilds them from settings"""
+    global _client, _concurrency, _circuit, _async_concurrency
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+        _concurrency = None
+        _circuit = None
+        # Async clients close on their own loops
+        for loop, (_, closer) in list(_async_clients.items()):
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(closer.cancel)
+        _async_clients.clear()
+        _async_concurrency = None
+
+
+def _ensure_circuit() -> None:
+    """Create the shared circuit breaker; call with _client_lock held"""
+    global _circuit
+    if _circuit is None:
+        _circuit = CircuitBreaker(
+            settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+            settings.LLM_CIRCUIT_RESET_SECONDS,
         )
-        
-        # Build prompt
-        chapter_name = session.chapter.name
-        total_questions = summary_data.get('total_questions', 0)
-        num_correct = summary_data.get('num_correct', 0)
-        overall_accuracy = summary_data.get('overall_accuracy', 0.0)
-        overall_attention = summary_data.get('overall_attention_ratio', 0.0)
-        avg_response_time = summary_data.get('overall_avg_response_time_ms', 0)
-        
-        difficulty_breakdown = summary_data.get('difficulty_breakdown', {})
-        
-        prompt = f"""You are an intelligent tutoring system analyzing a student's performance on a JEE Chemistry quiz.
+
+
+def _client_options() -> dict:
+    return {
+        'base_url': settings.OPENROUTER_BASE_URL,
+        'api_key': settings.OPENROUTER_API_KEY,
+        'timeout': Timeout(
+            settings.LLM_READ_TIMEOUT_SECONDS,
+            connect=settings.LLM_CONNECT_TIMEOUT_SECONDS,
+        ),
+        'max_retries': 0,
+    }
+
+
+def create_chat_completion(**kwargs):
+    """
+    Call ``chat.completions.create`` on the shared client with bounded,
+    jittered retries, a process-wide cap on concurrent calls and a circuit
+    breaker. Raises ``LLMUnavailableError`` when the call is refused locally.
+    """
+    client, concurrency, circuit = _acquire_llm()
+    try:
+        with timed('llm'):
+            completion = _create_with_retries(client, circuit, kwargs)
+    finally:
+        concurrency.release()
+    
+    circuit.record_success()
+    return completion
+
+
+def stream_chat_completion(**kwargs) -> Iterator[str]:
+    """
+    Streaming counterpart of ``create_chat_completion``: yields content
+    deltas as they arrive. Only opening the stream is retried; the
+    concurrency slot is held until the stream is exhausted or closed, and
+    the request's LLM time runs until then too.
+    """
+    client, concurrency, circuit = _acquire_llm()
+    stream = None
+    try:
+        with timed('llm'):
+            stream = _create_with_retries(client, circuit, dict(kwargs, stream=True))
+            try:
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            except GeneratorExit:
+                raise
+            except Exception as e:
+                # Past the status line the SDK raises transport errors raw
+                if not _is_request_error(e):
+                    circuit.record_failure()
+                raise
+            circuit.record_success()
+    finally:
+        if stream is not None:
+            stream.close()
+        concurrency.release()
+
+
+async def astream_chat_completion(**kwargs) -> AsyncIterator[str]:
+    """
+    ``stream_chat_completion`` on the async client: waiting for the LLM
+    leaves the event loop free for other requests.
+    """
+    client = get_async_llm_client()
+    concurrency, circuit = _async_concurrency, _circuit
+    
+    if not circuit.allow():
+        raise LLMUnavailableError('LLM circuit is open')
+    
+    if not await concurrency.acquire(settings.LLM_CONCURRENCY_WAIT_SECONDS):
+        raise LLMUnavailableError('Too many concurrent LLM calls')
+    
+    stream = None
+    try:
+        with timed('llm'):
+            stream = await _acreate_with_retries(client, circuit, dict(kwargs, stream=True))
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            except GeneratorExit:
+                raise
+            except Exception as e:
+                # Past the status line the SDK raises transport errors raw
+                if not _is_request_error(e):
+                    circuit.record_failure()
+                raise
+            circuit.record_success()
+    finally:
+        if stream is not None:
+            await stream.close()
+        concurrency.release()
+
+
+def _acquire_llm():
+    """Check the circuit and take a concurrency slot; the caller must release it"""
+    client = get_llm_client()
+    concurrency, circuit = _concurrency, _circuit
+    
+    if not circuit.allow():
+        raise LLMUnavailableError('LLM circuit is open')
+    
+    if not concurrency.acquire(timeout=settings.LLM_CONCURRENCY_WAIT_SECONDS):
+        raise LLMUnavailableError('Too many concurrent LLM calls')
+    
+    return client, concurrency, circuit
+
+
+def _is_request_error(exc: Exception) -> bool:
+    """Whether ``exc`` is a 4xx about this request rather than upstream trouble"""
+    return isinstance(exc, APIStatusError) and not isinstance(exc, RETRYABLE_ERRORS)
+
+
+def _create_with_retries(client: OpenAI, circuit: CircuitBreaker, kwargs: dict):
+    for attempt in range(settings.LLM_MAX_RETRIES + 1):
+        try:
+            return client.chat.completions.create(**kwargs)
+        except RETRYABLE_ERRORS as e:
+            if attempt == settings.LLM_MAX_RETRIES:
+                circuit.record_failure()
+                raise
+            delay = random.uniform(0, settings.LLM_RETRY_BACKOFF_SECONDS * 2 ** attempt)
+            logger.warning('LLM call failed (%s), retrying in %.2fs', e.__class__.__name__, delay)
+            time.sleep(delay)
+
+
+async def _acreate_with_retries(client: AsyncOpenAI, circuit: CircuitBreaker, kwargs: dict):
+    for attempt in range(settings.LLM_MAX_RETRIES + 1):
+        try:
+            return await client.chat.completions.create(**kwargs)
+        except RETRYABLE_ERRORS as e:
+            if attempt == settings.LLM_MAX_RETRIES:
+                circuit.record_failure()
+                raise
+            delay = random.uniform(0, settings.LLM_RETRY_BACKOFF_SECONDS * 2 ** attempt)
+            logger.warning('LLM call failed (%s), retrying in %.2fs', e.__class__.__name__, delay)
+            await asyncio.sleep(delay)
+
+
+def build_summary_prompt(chapter_name: str, summary_data: dict) -> str:
+    """Build the feedback prompt for a session's aggregated stats"""
+    total_questions = summary_data.get('total_questions', 0)
+    num_correct = summary_data.get('num_correct', 0)
+    overall_accuracy = summary_data.get('overall_accuracy') or 0.0
+    overall_attention = summary_data.get('overall_attention_ratio') or 0.0
+    avg_response_time = summary_data.get('overall_avg_response_time_ms') or 0
+    
+    difficulty_breakdown = summary_data.get('difficulty_breakdown', {})
+    
+    prompt = f"""You are an intelligent tutoring system analyzing a student's performance on a JEE Chemistry quiz.
 
 Chapter: {chapter_name}
 Total Questions: {total_questions}
@@ -45,25 +399,25 @@ Average Response Time: {avg_response_time / 1000:.1f} seconds
 
 Performance by Difficulty:
 """
-        
-        for diff in ['easy', 'medium', 'hard']:
-            if diff in difficulty_breakdown:
-                stats = difficulty_breakdown[diff]
-                prompt += f"- {diff.capitalize()}: {stats['correct']}/{stats['questions']} correct ({stats['accuracy']:.1%}), "
-                prompt += f"avg attention: {stats['avg_attention_ratio']:.1%}, "
-                prompt += f"avg time: {stats['avg_response_time_ms'] / 1000:.1f}s\n"
-        
-        prompt += f"""
+    
+    for diff in ['easy', 'medium', 'hard']:
+        if diff in difficulty_breakdown:
+            stats = difficulty_breakdown[diff]
+            prompt += f"- {diff.capitalize()}: {stats['correct']}/{stats['questions']} correct ({stats['accuracy']:.1%}), "
+            prompt += f"avg attention: {stats['avg_attention_ratio']:.1%}, "
+            prompt += f"avg time: {stats['avg_response_time_ms'] / 1000:.1f}s\n"
+    
+    prompt += f"""
 Per-Question Performance:
 """
-        
-        per_question = summary_data.get('per_question_stats', [])
-        for pq in per_question[:10]:  # Limit to first 10 for prompt size
-            prompt += f"Q{pq['question_index']} ({pq['difficulty']}): {'✓' if pq['is_correct'] else '✗'}, "
-            prompt += f"attention: {pq.get('attention_ratio', 0):.1%}, "
-            prompt += f"time: {pq.get('response_time_ms', 0) / 1000:.1f}s\n"
-        
-        prompt += """
+    
+    per_question = summary_data.get('per_question_stats', [])
+    for pq in per_question[:10]:  # Limit to first 10 for prompt size
+        prompt += f"Q{pq['question_index']} ({pq['difficulty']}): {'✓' if pq['is_correct'] else '✗'}, "
+        prompt += f"attention: {pq.get('attention_ratio') or 0:.1%}, "
+        prompt += f"time: {(pq.get('response_time_ms') or 0) / 1000:.1f}s\n"
+    
+    prompt += """
 Please provide a concise, personalized feedback (2-3 paragraphs) that:
 1. Highlights the student's strengths
 2. Identifies areas of difficulty
@@ -73,46 +427,209 @@ Please provide a concise, personalized feedback (2-3 paragraphs) that:
 
 Write in a friendly, supportive tone suitable for a JEE Chemistry student.
 """
+    return prompt
+
+
+def generate_quiz_summary(session: QuizSession, summary_data: dict) -> str:
+    """
+    Generate a personalized feedback summary using LLM via OpenRouter.
+    
+    Summaries are looked up in the summary cache first, keyed by a
+    fingerprint of the prompt inputs, so sessions with equivalent stats
+    reuse an earlier completion.
+    
+    Args:
+        session: The QuizSession instance
+        summary_data: Dictionary containing aggregated stats
+    
+    Returns:
+        Generated summary text
+    """
+    chapter_name = session.chapter.name
+    
+    try:
+        # Build prompt
+        prompt = build_summary_prompt(chapter_name, summary_data)
         
-        # Call OpenRouter API
-        completion = client.chat.completions.create(
-            extra_headers={
-                "HTTP-Referer": settings.OPENROUTER_SITE_URL,
-                "X-Title": settings.OPENROUTER_SITE_NAME,
-            },
-            model=settings.OPENROUTER_MODEL,
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.7,
-            max_tokens=500,
+        cache = get_summary_cache()
+        cache_key = summary_cache_key(
+            settings.OPENROUTER_MODEL, chapter_name, summary_data, prompt, summary_template_fingerprint()
         )
+        summary_text = cache.get(cache_key)
+        if summary_text is not None:
+            _save_summary(session, summary_text)
+            return summary_text
+        
+        # Call OpenRouter API through the shared, rate-limited client
+        completion = create_chat_completion(**_completion_kwargs(prompt))
         
         summary_text = completion.choices[0].message.content
+        cache.set(cache_key, summary_text)
         
         # Save to session
-        session.summary_text = summary_text
-        from django.utils import timezone
-        session.summary_generated_at = timezone.now()
-        session.save()
+        _save_summary(session, summary_text)
         
         return summary_text
-        
+    
     except Exception as e:
-        # Fallback summary if LLM fails
-        fallback = f"""You completed {summary_data.get('total_questions', 0)} questions in {chapter_name} with an accuracy of {summary_data.get('overall_accuracy', 0):.1%}. 
+        # Fallback summary if LLM fails or is unavailable
+        logger.warning('Using fallback summary for session %s: %s', session.pk, e)
+        fallback = _fallback_summary(chapter_name, summary_data)
         
-Your average attention was {summary_data.get('overall_attention_ratio', 0):.1%}. 
-        
-Keep practicing to improve your performance!"""
-        
-        session.summary_text = fallback
-        from django.utils import timezone
-        session.summary_generated_at = timezone.now()
-        session.save()
+        _save_summary(session, fallback)
         
         return fallback
 
+
+def _save_summary(session: QuizSession, summary_text: str) -> None:
+    """Persist the summary and mark it ready, touching only the summary columns"""
+    session.summary_text = summary_text
+    session.summary_generated_at = timezone.now()
+    session.summary_status = 'ready'
+    session.save(update_fields=['summary_text', 'summary_generated_at', 'summary_status'])
+
+
+def stream_quiz_summary(session: QuizSession, summary_data: dict) -> Iterator[str]:
+    """
+    Stream the feedback summary as text chunks while it is generated.
+    
+    The full text is saved to the session (and the summary cache) once the
+    completion finishes. A cached summary is yielded as a single chunk; if
+    the LLM fails before producing any text the fallback is yielded instead.
+    """
+    chapter_name = session.chapter.name
+    prompt = build_summary_prompt(chapter_name, summary_data)
+    
+    cache = get_summary_cache()
+    cache_key = summary_cache_key(
+        settings.OPENROUTER_MODEL, chapter_name, summary_data, prompt, summary_template_fingerprint()
+    )
+    summary_text = cache.get(cache_key)
+    if summary_text is not None:
+        _save_summary(session, summary_text)
+        yield summary_text
+        return
+    
+    parts = []
+    try:
+        for text in stream_chat_completion(**_completion_kwargs(prompt)):
+            parts.append(text)
+            yield text
+    except Exception as e:
+        logger.warning('Summary stream failed for session %s: %s', session.pk, e)
+        if not parts:
+            fallback = _fallback_summary(chapter_name, summary_data)
+            _save_summary(session, fallback)
+            yield fallback
+            return
+        # Keep what the student already saw, but don't cache a partial summary
+        _save_summary(session, ''.join(parts))
+        return
+    
+    summary_text = ''.join(parts)
+    cache.set(cache_key, summary_text)
+    _save_summary(session, summary_text)
+
+
+async def astream_quiz_summary(session: QuizSession, summary_data: dict) -> AsyncIterator[str]:
+    """
+    ``stream_quiz_summary`` for async views, on the async client. The
+    session must have its chapter loaded (select_related).
+    """
+    chapter_name = session.chapter.name
+    prompt = build_summary_prompt(chapter_name, summary_data)
+    
+    cache = get_summary_cache()
+    cache_key = summary_cache_key(
+        settings.OPENROUTER_MODEL, chapter_name, summary_data, prompt, summary_template_fingerprint()
+    )
+    summary_text = await sync_to_async(cache.get)(cache_key)
+    if summary_text is not None:
+        await _asave_summary(session, summary_text)
+        yield summary_text
+        return
+    
+    parts = []
+    try:
+        async for text in astream_chat_completion(**_completion_kwargs(prompt)):
+            parts.append(text)
+            yield text
+    except Exception as e:
+        logger.warning('Summary stream failed for session %s: %s', session.pk, e)
+        if not parts:
+            fallback = _fallback_summary(chapter_name, summary_data)
+            await _asave_summary(session, fallback)
+            yield fallback
+            return
+        # Keep what the student already saw, but don't cache a partial summary
+        await _asave_summary(session, ''.join(parts))
+        return
+    
+    summary_text = ''.join(parts)
+    await sync_to_async(cache.set)(cache_key, summary_text)
+    await _asave_summary(session, summary_text)
+
+
+async def _asave_summary(session: QuizSession, summary_text: str) -> None:
+    """``_save_summary`` with the async ORM"""
+    session.summary_text = summary_text
+    session.summary_generated_at = timezone.now()
+    session.summary_status = 'ready'
+    await QuizSession.objects.filter(pk=session.pk).aupdate(
+        summary_text=summary_text,
+        summary_generated_at=session.summary_generated_at,
+        summary_status='ready',
+    )
+
+
+# Stats that touch every line of the prompt template, for its fingerprint
+_TEMPLATE_SAMPLE = {
+    'total_questions': 1,
+    'num_correct': 1,
+    'overall_accuracy': 1.0,
+    'overall_attention_ratio': 1.0,
+    'overall_avg_response_time_ms': 1000,
+    'difficulty_breakdown': {
+        diff: {'questions': 1, 'correct': 1, 'accuracy': 1.0, 'avg_attention_ratio': 1.0, 'avg_response_time_ms': 1000}
+        for diff in ['easy', 'medium', 'hard']
+    },
+    'per_question_stats': [
+        {'question_index': 1, 'difficulty': 'easy', 'is_correct': True, 'attention_ratio': 1.0, 'response_time_ms': 1000},
+    ],
+}
+
+
+def summary_template_fingerprint() -> str:
+    """
+    Hash of the summary prompt template and generation parameters, so a
+    change to either stops matching summaries cached before it
+    """
+    kwargs = _completion_kwargs(build_summary_prompt('', _TEMPLATE_SAMPLE))
+    template = [kwargs['messages'], kwargs['temperature'], kwargs['max_tokens']]
+    return hashlib.sha256(json.dumps(template, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def _completion_kwargs(prompt: str) -> dict:
+    return {
+        'extra_headers': {
+            "HTTP-Referer": settings.OPENROUTER_SITE_URL,
+            "X-Title": settings.OPENROUTER_SITE_NAME,
+        },
+        'model': settings.OPENROUTER_MODEL,
+        'messages': [
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        'temperature': 0.7,
+        'max_tokens': 500,
+    }
+
+
+def _fallback_summary(chapter_name: str, summary_data: dict) -> str:
+    return f"""You completed {summary_data.get('total_questions', 0)} questions in {chapter_name} with an accuracy of {summary_data.get('overall_accuracy') or 0:.1%}. 
+        
+Your average attention was {summary_data.get('overall_attention_ratio') or 0:.1%}. 
+        
+Keep practicing to improve your performance!"""
@@ -0,0 +1,278 @@
+"""
+Request Metrics
+Per-view wall time, database, LLM and serializer timings, exported in the
+Prometheus text format with rolling percentiles
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .summary_cache import get_summary_cache
+
+
+DURATION_BUCKETS = (0.0, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 30, 50, 100)
+QUANTILES = (0.5, 0.95, 0.99)
+
+# name -> (help text, buckets, RequestMetrics attribute)
+METRICS = {
+    'quiz_request_duration_seconds': ('Wall time of the request', DURATION_BUCKETS, 'duration'),
+    'quiz_db_queries': ('Database queries per request', COUNT_BUCKETS, 'db_queries'),
+    'quiz_db_duration_seconds': ('Time spent in database queries per request', DURATION_BUCKETS, 'db_seconds'),
+    'quiz_llm_duration_seconds': ('Time spent in LLM calls per request', DURATION_BUCKETS, 'llm_seconds'),
+    'quiz_serializer_duration_seconds': ('Time spent in serializers per request', DURATION_BUCKETS, 'serializer_seconds'),
+}
+
+_NULL_TIMER = nullcontext()
+
+_current: ContextVar[Optional['RequestMetrics']] = ContextVar('quiz_request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Timings accumulated while handling one request (or background job)"""
+    __slots__ = ('view', 'duration', 'db_queries', 'db_seconds', 'llm_seconds', 'serializer_seconds', 'active')
+
+    def __init__(self, view: str):
+        self.view = view
+        self.duration = 0.0
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.llm_seconds = 0.0
+        self.serializer_seconds = 0.0
+        # Kinds being timed right now, so nested timers aren't counted twice
+        self.active = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        """Database execute wrapper"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_seconds += time.perf_counter() - started
+
+
+class _Timer:
+    __slots__ = ('metrics', 'kind', 'started')
+
+    def __init__(self, metrics: RequestMetrics, kind: str):
+        self.metrics = metrics
+        self.kind = kind
+
+    def __enter__(self):
+        self.metrics.active.add(self.kind)
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        attribute = f'{self.kind}_seconds'
+        setattr(self.metrics, attribute, getattr(self.metrics, attribute) + time.perf_counter() - self.started)
+        self.metrics.active.discard(self.kind)
+
+
+def current_metrics() -> Optional[RequestMetrics]:
+    return _current.get()
+
+
+def timed(kind: str):
+    """
+    Context manager adding the time spent in its block to the current
+    request's ``llm`` or ``serializer`` time. Outside a measured request
+    (metrics disabled, management commands) it is a shared no-op.
+    """
+    metrics = _current.get()
+    if metrics is None or kind in metrics.active:
+        return _NULL_TIMER
+    return _Timer(metrics, kind)
+
+
+@contextmanager
+def measuring(metrics: RequestMetrics):
+    """
+    Make ``metrics`` current, so database queries are counted into it. The
+    context is inherited by ``sync_to_async`` threads, so queries an async
+    view runs on the ORM's thread count too.
+    """
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+def _count_query(execute, sql, params, many, context):
+    """Execute wrapper on every connection while metrics are enabled"""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def _install_query_counter(connection, **kwargs) -> None:
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+@contextmanager
+def collect(view: str):
+    """
+    Measure the block as one observation of ``view``. A no-op when
+    ``METRICS_ENABLED`` is off.
+    """
+    registry = get_metrics_registry()
+    if registry is None:
+        yield None
+        return
+
+    metrics = RequestMetrics(view)
+    started = time.perf_counter()
+    try:
+        with measuring(metrics):
+            yield metrics
+    finally:
+        metrics.duration = time.perf_counter() - started
+        registry.record(metrics)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram with cumulative totals (exported as a Prometheus
+    histogram) plus per-slot counts over the last ``window_seconds``, from
+    which the rolling percentiles are interpolated.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...], window_seconds: float, slots: int):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.slot_seconds = window_seconds / slots
+        self.slots = slots
+        # [(slot number, counts)], oldest first
+        self.window: List[Tuple[int, List[int]]] = []
+
+    def observe(self, value: float, now: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        self.counts[index] += 1
+        self.total += value
+
+        slot = int(now // self.slot_seconds)
+        if not self.window or self.window[-1][0] != slot:
+            self.window.append((slot, [0] * len(self.counts)))
+            self._expire(slot)
+        self.window[-1][1][index] += 1
+
+    def quantile(self, q: float, now: float) -> Optional[float]:
+        """Approximate q-quantile of the recent observations, or None if there are none"""
+        self._expire(int(now // self.slot_seconds))
+        recent = [sum(counts) for counts in zip(*(slot_counts for _, slot_counts in self.window))]
+        observed = sum(recent)
+        if not observed:
+            return None
+
+        rank = q * observed
+        seen = 0
+        for index, count in enumerate(recent):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                if index == len(self.buckets):
+                    return lower  # overflow bucket has no upper bound
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def _expire(self, slot: int) -> None:
+        while self.window and self.window[0][0] <= slot - self.slots:
+            self.window.pop(0)
+
+
+class MetricsRegistry:
+    """Process-wide histograms per (metric, view) and request counts"""
+
+    def __init__(self, window_seconds: float, slots: int = 12):
+        self.window_seconds = window_seconds
+        self.slots = slots
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._requests: Dict[Tuple[str, str], int] = {}
+
+    def record(self, metrics: RequestMetrics, status_code: Optional[int] = None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for name, (_, buckets, attribute) in METRICS.items():
+                histogram = self._histograms.get((name, metrics.view))
+                if histogram is None:
+                    histogram = Histogram(buckets, self.window_seconds, self.slots)
+                    self._histograms[(name, metrics.view)] = histogram
+                histogram.observe(getattr(metrics, attribute), now)
+            if status_code is not None:
+                key = (metrics.view, f'{status_code // 100}xx')
+                self._requests[key] = self._requests.get(key, 0) + 1
+
+    def render(self) -> str:
+        """Prometheus text exposition of everything recorded by this process"""
+        now = time.monotonic()
+        lines = [
+            '# HELP quiz_requests_total Requests handled, by view and status class',
+            '# TYPE quiz_requests_total counter',
+        ]
+        with self._lock:
+            for (view, status_class), count in sorted(self._requests.items()):
+                lines.append(f'quiz_requests_total{{view="{view}",status="{status_class}"}} {count}')
+
+            for name, (help_text, _, _) in METRICS.items():
+                histograms = sorted(
+                    (view, histogram) for (metric, view), histogram in self._histograms.items() if metric == name
+                )
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for view, histogram in histograms:
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_sum{{view="{view}"}} {histogram.total:.6f}')
+                    lines.append(f'{name}_count{{view="{view}"}} {cumulative}')
+
+                lines.append(f'# HELP {name}_recent {help_text}, percentiles over the last {self.window_seconds:g}s')
+                lines.append(f'# TYPE {name}_recent gauge')
+                for view, histogram in histograms:
+                    for q in QUANTILES:
+                        value = histogram.quantile(q, now)
+                        if value is not None:
+                            lines.append(f'{name}_recent{{view="{view}",quantile="{q}"}} {value:.6f}')
+
+        cache_stats = get_summary_cache().stats()
+        for outcome, help_text in (
+            ('hits', 'LLM summary lookups served from the summary cache'),
+            ('misses', 'LLM summary lookups not in the summary cache'),
+        ):
+            lines.append(f'# HELP quiz_summary_cache_{outcome}_total {help_text}')
+            lines.append(f'# TYPE quiz_summary_cache_{outcome}_total counter')
+            lines.append(f'quiz_summary_cache_{outcome}_total {cache_stats[outcome]}')
+        return '\n'.join(lines) + '\n'
+
+
+_registry: Optional[MetricsRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics_registry() -> Optional[MetricsRegistry]:
+    """Return the process-wide registry, or None when ``METRICS_ENABLED`` is off"""
+    global _registry
+    if not settings.METRICS_ENABLED:
+        return None
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                # Connections opened from now on, and this thread's open one
+                connection_created.connect(_install_query_counter)
+                for connection in connections.all(initialized_only=True):
+                    _install_query_counter(connection)
+                _registry = MetricsRegistry(settings.METRICS_WINDOW_SECONDS)
+    return _registry
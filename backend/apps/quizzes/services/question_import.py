@@ -0,0 +1,293 @@
+"""
+Question Import Service
+Streams question records from JSON/JSONL files and bulk-upserts them per chapter
+"""
+import json
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from django.db import transaction
+from django.utils import timezone
+from ..models import Chapter, Question
+from .chapter_catalog import invalidate_chapter_catalog
+from .question_pool import question_pool
+
+
+VALID_DIFFICULTIES = ['easy', 'medium', 'hard']
+
+# Columns rewritten when a question with the same (chapter, external_id) exists
+UPSERT_FIELDS = [
+    'text', 'options', 'correct_option_index', 'explanation', 'difficulty',
+    'is_active', 'content_hash', 'updated_at'
+]
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def load_manifest(manifest_path) -> List[Dict]:
+    """
+    Read the question bank manifest and return its chapter entries, with
+    each file resolved relative to the manifest's directory.
+    """
+    manifest_path = Path(manifest_path)
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    
+    chapters = []
+    for entry in manifest.get('chapters', []):
+        chapters.append({
+            'slug': entry['slug'],
+            'name': entry.get('name', entry['slug']),
+            'description': entry.get('description', ''),
+            'files': [manifest_path.parent / filename for filename in entry.get('files', [])],
+        })
+    return chapters
+
+
+def iter_question_records(path) -> Iterator[Dict]:
+    """
+    Yield question records one at a time without loading the whole file.
+    ``.jsonl``/``.ndjson`` files hold one object per line; anything else is
+    read as a top-level JSON array of objects.
+    """
+    path = Path(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.suffix in ('.jsonl', '.ndjson'):
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f'{path.name}:{line_number}: {e}') from e
+        else:
+            yield from _iter_json_array(f)
+
+
+def validate_question(record: Dict) -> Optional[str]:
+    """Return why a record can't be imported, or None if it is valid"""
+    if not isinstance(record, dict):
+        return 'not a JSON object'
+    if not record.get('external_id'):
+        return 'missing external_id'
+    if not record.get('text'):
+        return 'missing text'
+    if len(record.get('options') or []) != 4:
+        return 'must have exactly 4 options'
+    if record.get('correct_option_index') not in [0, 1, 2, 3]:
+        return 'invalid correct_option_index'
+    if record.get('difficulty') not in VALID_DIFFICULTIES:
+        return 'invalid difficulty'
+    return None
+
+
+def question_from_record(chapter: Chapter, record: Dict) -> Question:
+    question = Question(
+        chapter=chapter,
+        external_id=str(record['external_id']),
+        text=record['text'],
+        options=record['options'],
+        correct_option_index=record['correct_option_index'],
+        explanation=record.get('explanation', ''),
+        difficulty=record['difficulty'],
+        is_active=True,
+    )
+    question.content_hash = question.compute_content_hash()
+    return question
+
+
+def upsert_questions(
+    chapter: Chapter,
+    records,
+    batch_size: int = 1000,
+    on_skip=None,
+    dry_run: bool = False,
+    deactivate_missing: bool = True
+) -> Dict[str, List[str]]:
+    """
+    Validate and upsert records for one chapter in a single transaction,
+    writing ``batch_size`` rows per INSERT ... ON CONFLICT statement.
+    
+    Rows whose content hash matches the stored one (and are still active)
+    are not written at all. Active questions missing from ``records`` are
+    deactivated with one UPDATE unless ``deactivate_missing`` is False.
+    With ``dry_run`` nothing is written and only the diff is computed.
+    
+    An external_id repeated in ``records`` is imported once, from its last
+    occurrence (one statement can't upsert the same row twice).
+    
+    ``on_skip(record, reason)`` is called for each invalid record.
+    Returns the external ids that were created, updated, unchanged,
+    deactivated and skipped, and those repeated in ``records`` (once per
+    extra occurrence).
+    """
+    changes = {
+        'created': [], 'updated': [], 'unchanged': [], 'deactivated': [], 'skipped': [],
+        'duplicates': []
+    }
+    
+    with transaction.atomic():
+        # external_id -> (content_hash, is_active), one query for the whole chapter
+        existing = {
+            external_id: (content_hash, is_active)
+            for external_id, content_hash, is_active in Question.objects.filter(
+                chapter=chapter
+            ).values_list('external_id', 'content_hash', 'is_active')
+        }
+        seen = set()
+        # external_id -> content_hash of the valid rows read so far
+        imported = {}
+        
+        # Keyed by external_id, so a repeat replaces the pending row
+        batch = {}
+        for record in records:
+            reason = validate_question(record)
+            if reason:
+                changes['skipped'].append(record.get('external_id') if isinstance(record, dict) else None)
+                if isinstance(record, dict) and record.get('external_id'):
+                    # Keep the stored version of a question whose new version is broken
+                    seen.add(str(record['external_id']))
+                if on_skip:
+                    on_skip(record, reason)
+                continue
+            
+            question = question_from_record(chapter, record)
+            external_id = question.external_id
+            seen.add(external_id)
+            if external_id in imported:
+                # Repeated in the source: the last occurrence wins
+                changes['duplicates'].append(external_id)
+                if imported[external_id] == question.content_hash:
+                    continue
+                if existing.get(external_id) == (imported[external_id], True):
+                    # The earlier occurrence matched the stored row
+                    changes['unchanged'].remove(external_id)
+                    changes['updated'].append(external_id)
+                imported[external_id] = question.content_hash
+            else:
+                imported[external_id] = question.content_hash
+                stored = existing.get(external_id)
+                if stored is None:
+                    changes['created'].append(external_id)
+                elif stored == (question.content_hash, True):
+                    changes['unchanged'].append(external_id)
+                    continue
+                else:
+                    changes['updated'].append(external_id)
+            
+            if dry_run:
+                continue
+            batch[external_id] = question
+            if len(batch) >= batch_size:
+                _bulk_upsert(list(batch.values()), batch_size)
+                batch = {}
+        
+        if batch:
+            _bulk_upsert(list(batch.values()), batch_size)
+        
+        if deactivate_missing:
+            changes['deactivated'] = [
+                external_id for external_id, (_, is_active) in existing.items()
+                if is_active and external_id is not None and external_id not in seen
+            ]
+            if changes['deactivated'] and not dry_run:
+                Question.objects.filter(
+                    chapter=chapter,
+                    external_id__in=changes['deactivated']
+                ).update(is_active=False, updated_at=timezone.now())
+        
+        if not dry_run:
+            # bulk_create/update() don't send post_save, so refresh the cached views here
+            transaction.on_commit(lambda: question_pool.invalidate(chapter.id))
+            transaction.on_commit(invalidate_chapter_catalog)
+    
+    return changes
+
+
+def preview_new_chapter(records, on_skip=None) -> Dict[str, List[str]]:
+    """
+    The changes ``upsert_questions`` would report for a chapter that doesn't
+    exist yet: every valid record is created. Reads no rows, so a dry run
+    needn't create the chapter first.
+    """
+    changes = {
+        'created': [], 'updated': [], 'unchanged': [], 'deactivated': [], 'skipped': [],
+        'duplicates': []
+    }
+    created = set()
+    for record in records:
+        reason = validate_question(record)
+        if reason:
+            changes['skipped'].append(record.get('external_id') if isinstance(record, dict) else None)
+            if on_skip:
+                on_skip(record, reason)
+            continue
+        
+        external_id = str(record['external_id'])
+        if external_id in created:
+            changes['duplicates'].append(external_id)
+        else:
+            created.add(external_id)
+            changes['created'].append(external_id)
+    return changes
+
+
+def _bulk_upsert(questions: List[Question], batch_size: int) -> None:
+    Question.objects.bulk_create(
+        questions,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['chapter', 'external_id'],
+        update_fields=UPSERT_FIELDS,
+    )
+
+
+def _iter_json_array(f) -> Iterator:
+    """Incrementally decode the elements of a top-level JSON array"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+    started = False
+    
+    while True:
+        # Skip whitespace and separators, reading more input as needed
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buffer) or eof:
+                break
+            chunk = f.read(READ_CHUNK_SIZE)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+        
+        if pos >= len(buffer):
+            if started:
+                raise ValueError('unterminated JSON array')
+            return
+        
+        if not started:
+            if buffer[pos] != '[':
+                raise ValueError('expected a JSON array of questions')
+            started = True
+            pos += 1
+            continue
+        
+        if buffer[pos] == ']':
+            return
+        
+        try:
+            element, end = decoder.raw_decode(buffer, pos)
+        except ValueError:
+            if eof:
+                raise
+            # Element spans the chunk boundary; read more and retry
+            chunk = f.read(READ_CHUNK_SIZE)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        
+        yield element
+        pos = end
@@ -0,0 +1,68 @@
+"""
+Question Plans
+The question sequence of a planned session, drawn up front with a seeded
+RNG and kept in ``QuizSession.settings['plan']``
+"""
+import base64
+import random
+from typing import Iterable, List, Optional, Set
+from uuid import UUID
+
+from ..models import QuizSession
+from .question_pool import DIFFICULTIES, question_pool
+
+
+def build_plan(chapter_id: int, max_questions: int, seed: Optional[int] = None) -> dict:
+    """
+    Draw the plan of a session: for each difficulty, up to ``max_questions``
+    of the chapter's active questions in an order shuffled by an RNG
+    seeded with ``seed`` (a random one when None). The IDs come from the
+    question pool, so this takes one query at most, and the same seed on
+    the same bank always gives the same plan.
+
+    Stored as ``{"seed": n, "easy": ..., "medium": ..., "hard": ...}``, each
+    list packed as base64 of the 16-byte UUIDs (about 1 KB per 50).
+    """
+    if seed is None:
+        seed = random.randrange(2 ** 31)
+    rng = random.Random(seed)
+
+    plan = {'seed': seed}
+    for difficulty in DIFFICULTIES:
+        # Sorted first, so the order doesn't depend on how the pool was loaded
+        ids = sorted(question_pool.ids_for(chapter_id, difficulty))
+        rng.shuffle(ids)
+        plan[difficulty] = _pack(ids[:max_questions])
+    return plan
+
+
+def session_plan(session: QuizSession) -> Optional[dict]:
+    """The session's plan, or None for adaptive sessions"""
+    return (session.settings or {}).get('plan')
+
+
+def planned_ids(plan: dict, difficulty: str) -> List[UUID]:
+    """The planned question IDs of one difficulty, in order"""
+    return _unpack(plan.get(difficulty, ''))
+
+
+def next_planned_id(plan: dict, difficulties: Iterable[str], exclude: Set[UUID]) -> Optional[UUID]:
+    """
+    The first planned question not in ``exclude``, trying each difficulty in
+    order. With ``exclude`` the attempted questions this is the pointer
+    into each list, so answers don't need to store one.
+    """
+    for difficulty in difficulties:
+        for question_id in planned_ids(plan, difficulty):
+            if question_id not in exclude:
+                return question_id
+    return None
+
+
+def _pack(ids: List[UUID]) -> str:
+    return base64.b64encode(b''.join(question_id.bytes for question_id in ids)).decode('ascii')
+
+
+def _unpack(packed: str) -> List[UUID]:
+    raw = base64.b64decode(packed)
+    return [UUID(bytes=raw[offset:offset + 16]) for offset in range(0, len(raw), 16)]
@@ -0,0 +1,170 @@
+"""
+Question Pool Index
+Per-process index of active question IDs keyed by (chapter, difficulty),
+used by the ITS selector to sample questions without ORDER BY RANDOM()
+"""
+import random
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from django.conf import settings
+
+from ..models import Question
+
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+# Number of random probes before falling back to a linear scan of the pool.
+# With fewer attempted questions than pool entries this keeps sampling O(1)
+# in expectation; the scan only runs once a bucket is nearly exhausted.
+MAX_PROBES = 8
+
+# 2PL parameters assumed for questions that haven't been calibrated yet
+DEFAULT_IRT_DIFFICULTY = {'easy': -1.0, 'medium': 0.0, 'hard': 1.0}
+DEFAULT_IRT_DISCRIMINATION = 1.0
+
+
+def question_parameters(
+    difficulty: str,
+    irt_difficulty: Optional[float],
+    irt_discrimination: Optional[float],
+) -> Tuple[float, float]:
+    """Return ``(discrimination, difficulty)`` for a question, using defaults if uncalibrated"""
+    if irt_difficulty is None:
+        irt_difficulty = DEFAULT_IRT_DIFFICULTY.get(difficulty, 0.0)
+    return irt_discrimination or DEFAULT_IRT_DISCRIMINATION, irt_difficulty
+
+
+class ChapterParameters:
+    """
+    Item parameters of a chapter's active questions as NumPy arrays, for
+    vectorized selection. ``ids[i]`` has discrimination ``a[i]`` and
+    difficulty ``b[i]``; ``index`` maps an ID back to its position.
+    """
+
+    def __init__(self, rows: List[Tuple[UUID, str, Optional[float], Optional[float]]]):
+        import numpy as np
+
+        self.ids = tuple(row[0] for row in rows)
+        self.index = {question_id: i for i, question_id in enumerate(self.ids)}
+        params = [question_parameters(*row[1:]) for row in rows]
+        self.a = np.array([a for a, _ in params], dtype=np.float64)
+        self.b = np.array([b for _, b in params], dtype=np.float64)
+
+
+class QuestionPool:
+    """
+    Lazily built index of active question IDs per chapter.
+
+    Each chapter is loaded with a single ``values_list`` query the first time
+    it is sampled and kept as one tuple of IDs per difficulty, plus the item
+    parameters for the IRT estimator (see ``parameters``). Entries are
+    dropped when the ``Question`` signals bump the version counter, or when
+    they are older than ``QUESTION_POOL_TTL_SECONDS`` so other worker
+    processes converge after an edit.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+        # chapter_id -> (version, loaded_at, {difficulty: (ids...)}, rows)
+        self._chapters: Dict[int, Tuple[int, float, Dict[str, Tuple[UUID, ...]], list]] = {}
+        # chapter_id -> (loaded_at of the rows it was built from, parameters)
+        self._parameters: Dict[int, Tuple[float, ChapterParameters]] = {}
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def invalidate(self, chapter_id: Optional[int] = None) -> None:
+        """Drop one chapter (or every chapter) and bump the version counter"""
+        with self._lock:
+            self._version += 1
+            if chapter_id is None:
+                self._chapters.clear()
+                self._parameters.clear()
+            else:
+                self._chapters.pop(chapter_id, None)
+                self._parameters.pop(chapter_id, None)
+
+    def ids_for(self, chapter_id: int, difficulty: str) -> Tuple[UUID, ...]:
+        """Return the active question IDs for a chapter and difficulty"""
+        return self._get_entry(chapter_id)[2].get(difficulty, ())
+
+    def parameters(self, chapter_id: int) -> ChapterParameters:
+        """Return the chapter's item parameter arrays, built once per load"""
+        _, loaded_at, _, rows = self._get_entry(chapter_id)
+        cached = self._parameters.get(chapter_id)
+        if cached is not None and cached[0] == loaded_at:
+            return cached[1]
+
+        parameters = ChapterParameters(rows)
+        with self._lock:
+            if self._chapters.get(chapter_id, (None, None))[1] == loaded_at:
+                self._parameters[chapter_id] = (loaded_at, parameters)
+        return parameters
+
+    def sample(
+        self,
+        chapter_id: int,
+        difficulty: str,
+        exclude: Set[UUID],
+    ) -> Optional[UUID]:
+        """
+        Pick a question ID uniformly at random from the bucket, skipping IDs
+        in ``exclude``. Returns None when every question has been attempted.
+        """
+        ids = self.ids_for(chapter_id, difficulty)
+        size = len(ids)
+        if not size:
+            return None
+
+        if len(exclude) < size:
+            for _ in range(MAX_PROBES):
+                candidate = ids[random.randrange(size)]
+                if candidate not in exclude:
+                    return candidate
+
+        remaining = [question_id for question_id in ids if question_id not in exclude]
+        return random.choice(remaining) if remaining else None
+
+    def sample_first(
+        self,
+        chapter_id: int,
+        difficulties: Iterable[str],
+        exclude: Set[UUID],
+    ) -> Optional[UUID]:
+        """Sample from each difficulty in order until one yields a question"""
+        for difficulty in difficulties:
+            question_id = self.sample(chapter_id, difficulty, exclude)
+            if question_id is not None:
+                return question_id
+        return None
+
+    def _get_entry(self, chapter_id: int) -> Tuple[int, float, Dict[str, Tuple[UUID, ...]], list]:
+        ttl = settings.QUESTION_POOL_TTL_SECONDS
+        entry = self._chapters.get(chapter_id)
+        if entry is not None and time.monotonic() - entry[1] < ttl:
+            return entry
+
+        version = self._version
+        loaded: Dict[str, list] = {difficulty: [] for difficulty in DIFFICULTIES}
+        rows = list(Question.objects.filter(
+            chapter_id=chapter_id,
+            is_active=True
+        ).values_list('id', 'difficulty', 'irt_difficulty', 'irt_discrimination'))
+        for question_id, difficulty, _, _ in rows:
+            loaded.setdefault(difficulty, []).append(question_id)
+        frozen = {difficulty: tuple(ids) for difficulty, ids in loaded.items()}
+        entry = (version, time.monotonic(), frozen, rows)
+
+        with self._lock:
+            # Only publish if nothing was invalidated while we were loading
+            if version == self._version:
+                self._chapters[chapter_id] = entry
+        return entry
+
+
+question_pool = QuestionPool()
@@ -2,55 +2,36 @@
 ITS Logic - Question Selection Service
 Implements adaptive difficulty selection based on attention and correctness
 """
-from typing import Optional
-from django.db.models import Q
-from ..models import QuizSession, Question, QuestionAttempt
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+from ..models import QuizSession, Question
+from .question_pool import question_pool
 
-
-def get_first_question_for_session(session: QuizSession) -> Optional[Question]:
-    """
-    Get the first question for a new quiz session.
-    Always starts with an easy question.
-    """
-    # Reset ability to 0 for new session
-    session.current_ability = 0
-    session.save()
-    
-    # Get a random easy question from the chapter that hasn't been attempted
-    attempted_question_ids = set(
-        session.attempts.values_list('question_id', flat=True)
-    )
-    
-    question = Question.objects.filter(
-        chapter=session.chapter,
-        difficulty='easy',
-        is_active=True
-    ).exclude(id__in=attempted_question_ids).order_by('?').first()
-    
-    # If no easy questions available, try medium, then hard
-    if not question:
-        question = Question.objects.filter(
-            chapter=session.chapter,
-            difficulty='medium',
-            is_active=True
-        ).exclude(id__in=attempted_question_ids).order_by('?').first()
-    
-    if not question:
-        question = Question.objects.filter(
-            chapter=session.chapter,
-            difficulty='hard',
-            is_active=True
-        ).exclude(id__in=attempted_question_ids).order_by('?').first()
-    
-    return question
+# Names of the ITS ability rules, as reported in decision traces
+RULE_CORRECT_FOCUSED = 'correct_focused_fast'
+RULE_CORRECT_UNFOCUSED = 'correct_unfocused_or_slow'
+RULE_INCORRECT_FOCUSED = 'incorrect_focused'
+RULE_UNRELIABLE = 'unreliable_sample'
+RULE_INCORRECT_MODERATE = 'incorrect_moderate_attention'
 
 
-def select_next_question(
+def pick_first_question(
     session: QuizSession,
-    last_attempt: QuestionAttempt
+    attempted_question_ids: Iterable[UUID] = ()
 ) -> Optional[Question]:
+    """Pick an easy question; if no easy questions are available, try medium, then hard"""
+    return _pick_question(session, ['easy', 'medium', 'hard'], set(attempted_question_ids))
+
+
+def apply_its_rules(
+    ability_before: int,
+    is_correct: bool,
+    attention_ratio: Optional[float],
+    response_time_ms: int,
+    off_screen_ratio: Optional[float]
+) -> Tuple[str, int]:
     """
-    Select the next question based on ITS logic after evaluating the last attempt.
+    Apply the ITS ability adjustment rules to a single attempt.
     
     Ability adjustment rules:
     - Correct + High attention (>=0.6) + Fast response (<45s) → ability +1
@@ -58,90 +39,137 @@ def select_next_question(
     - Incorrect + High attention (>=0.6) → ability -1
     - Incorrect + Very low attention (<0.3) → ability unchanged (unreliable)
     
-    Difficulty mapping:
-    - ability <= -1 → easy
-    - ability == 0 → medium
-    - ability >= 1 → hard
+    Returns:
+        ``(rule, ability_after)``, the rule being one of the RULE_* names
     """
-    ability_before = session.current_ability
-    ability_after = ability_before
-    
-    attention_ratio = last_attempt.attention_ratio or 0.0
-    response_time_ms = last_attempt.response_time_ms
-    is_correct = last_attempt.is_correct
-    
-    # Log the decision factors for debugging
-    import logging
-    logger = logging.getLogger(__name__)
-    logger.info(f"ITS Decision - Q{last_attempt.question_index}: correct={is_correct}, "
-                f"attention={attention_ratio:.2f}, time={response_time_ms}ms, "
-                f"ability_before={ability_before}")
+    attention_ratio = attention_ratio or 0.0
     
     # ITS Rule: Adjust ability based on performance and attention
     if is_correct:
         if attention_ratio >= 0.6 and response_time_ms < 45000:  # Fast and focused
-            ability_after = ability_before + 1
-            logger.info(f"Increase difficulty: correct + high attention + fast")
-        else:
-            # Correct but low attention or slow → might be guess, keep ability same
-            ability_after = ability_before
-            logger.info(f"Maintain difficulty: correct but low attention or slow")
-    else:
-        if attention_ratio >= 0.6:
-            # Incorrect but focused → genuine mistake, reduce difficulty
-            ability_after = ability_before - 1
-            logger.info(f"Decrease difficulty: incorrect but focused")
-        elif attention_ratio < 0.3 or (last_attempt.off_screen_ratio or 0) > 0.5:
-            # Very low attention or mostly off-screen → unreliable sample, don't change
-            ability_after = ability_before
-            logger.info(f"Maintain difficulty: unreliable sample (low attention)")
-        else:
-            # Moderate attention but wrong → slight reduction
-            ability_after = max(ability_before - 1, -2)
-            logger.info(f"Decrease difficulty: incorrect with moderate attention")
-    
-    # Map ability to difficulty
-    if ability_after <= -1:
-        target_difficulty = 'easy'
-    elif ability_after == 0:
-        target_difficulty = 'medium'
-    else:  # ability_after >= 1
-        target_difficulty = 'hard'
-    
-    # Update session ability
-    session.current_ability = ability_after
-    session.save()
-    
-    # Store ability transition in attempt
-    last_attempt.ability_after = ability_after
-    last_attempt.save()
-    
-    # Get attempted question IDs
-    attempted_question_ids = set(
-        session.attempts.values_list('question_id', flat=True)
+            return RULE_CORRECT_FOCUSED, ability_before + 1
+        # Correct but low attention or slow → might be guess, keep ability same
+        return RULE_CORRECT_UNFOCUSED, ability_before
+    
+    if attention_ratio >= 0.6:
+        # Incorrect but focused → genuine mistake, reduce difficulty
+        return RULE_INCORRECT_FOCUSED, ability_before - 1
+    if attention_ratio < 0.3 or (off_screen_ratio or 0) > 0.5:
+        # Very low attention or mostly off-screen → unreliable sample, don't change
+        return RULE_UNRELIABLE, ability_before
+    # Moderate attention but wrong → slight reduction
+    return RULE_INCORRECT_MODERATE, max(ability_before - 1, -2)
+
+
+def difficulty_for_ability(ability: int) -> str:
+    """
+    Map ability to difficulty:
+    - ability <= -1 → easy
+    - ability == 0 → medium
+    - ability >= 1 → hard
+    """
+    if ability <= -1:
+        return 'easy'
+    elif ability == 0:
+        return 'medium'
+    else:  # ability >= 1
+        return 'hard'
+
+
+def pick_next_question(
+    session: QuizSession,
+    target_difficulty: str,
+    attempted_question_ids: Iterable[UUID]
+) -> Optional[Question]:
+    """
+    Pick an unattempted question of the target difficulty, falling back to
+    the other difficulties when the target bucket is exhausted.
+    """
+    return _pick_question(
+        session, difficulty_order(target_difficulty), set(attempted_question_ids)
     )
+
+
+def prefetch_next_questions(
+    session: QuizSession,
+    ability: int,
+    attempted_question_ids: Iterable[UUID]
+) -> Dict[str, Question]:
+    """
+    Choose, ahead of time, the question to serve after the next answer.
     
-    # Try to get a question of target difficulty
-    question = Question.objects.filter(
-        chapter=session.chapter,
-        difficulty=target_difficulty,
-        is_active=True
-    ).exclude(id__in=attempted_question_ids).order_by('?').first()
+    From ``ability`` the ITS rule can only move one step: a correct answer
+    keeps it or raises it, an incorrect one keeps it or lowers it. One
+    question is picked for each difficulty those outcomes map to, and all
+    of them are loaded in a single query.
     
-    # Fallback: if no questions in target difficulty, try others
-    if not question:
-        fallback_order = ['medium', 'easy', 'hard']
-        if target_difficulty in fallback_order:
-            fallback_order.remove(target_difficulty)
+    Returns:
+        Dictionary of target difficulty to question; targets whose pick was
+        stale (deactivated since the pool was loaded) are left out
+    """
+    attempted_question_ids = set(attempted_question_ids)
+    targets = {difficulty_for_ability(a) for a in (ability - 1, ability, ability + 1)}
+    
+    chosen = {}
+    for target in targets:
+        question_id = question_pool.sample_first(
+            session.chapter_id, difficulty_order(target), attempted_question_ids
+        )
+        if question_id is not None:
+            chosen[target] = question_id
+    
+    if not chosen:
+        return {}
+    questions = Question.objects.filter(is_active=True).in_bulk(set(chosen.values()))
+    return {
+        target: questions[question_id]
+        for target, question_id in chosen.items()
+        if question_id in questions
+    }
+
+
+def difficulty_order(target_difficulty: str) -> List[str]:
+    """The target difficulty first, then the fallbacks (medium, easy, hard)"""
+    fallback_order = ['medium', 'easy', 'hard']
+    if target_difficulty in fallback_order:
+        fallback_order.remove(target_difficulty)
+    return [target_difficulty] + fallback_order
+
+
+def _pick_question(
+    session: QuizSession,
+    difficulties: List[str],
+    attempted_question_ids: Set[UUID]
+) -> Optional[Question]:
+    """
+    Sample an unattempted question from the in-memory pool, trying each
+    difficulty in order, and fetch only the chosen row by primary key.
+    """
+    return fetch_pooled_question(
+        session,
+        lambda: question_pool.sample_first(session.chapter_id, difficulties, attempted_question_ids)
+    )
+
+
+def fetch_pooled_question(
+    session: QuizSession,
+    choose: Callable[[], Optional[UUID]]
+) -> Optional[Question]:
+    """
+    Fetch the question chosen from the pool by ``choose()``. If the pool
+    was stale and the question is gone or inactive, reload the chapter's
+    pool and choose again, once.
+    """
+    for _ in range(2):
+        question_id = choose()
+        if question_id is None:
+            return None
+        
+        question = Question.objects.filter(pk=question_id, is_active=True).first()
+        if question is not None:
+            return question
         
-        for diff in fallback_order:
-            question = Question.objects.filter(
-                chapter=session.chapter,
-                difficulty=diff,
-                is_active=True
-            ).exclude(id__in=attempted_question_ids).order_by('?').first()
-            if question:
-                break
+        # Pool was stale (question deleted or deactivated elsewhere); reload once
+        question_pool.invalidate(session.chapter_id)
     
-    return question
-
+    return None
@@ -0,0 +1,192 @@
+"""
+Session State Cache
+Hot state of in-progress quiz sessions, kept between answer submissions
+"""
+import pickle
+import threading
+from typing import Dict, Iterable, Optional, Set
+from uuid import UUID
+
+from django.conf import settings
+from django.core.cache import caches
+
+from ..models import Question, QuizSession
+from .summary_cache import LRUCache
+
+
+class StaleSessionState(Exception):
+    """Raised when the database has moved past the cached state of a session"""
+
+
+class SessionState:
+    """
+    In-progress session: the QuizSession row (ability, question index,
+    counts and running aggregates) plus the IDs of attempted questions.
+    
+    It also remembers the question currently shown to the student and the
+    questions pre-selected for each difficulty the next answer can lead
+    to, so an answer can be graded and followed up without queries.
+    
+    ``total_questions`` doubles as the state's version. Writes go through a
+    conditional UPDATE on it (see ``save_session_state``), so a worker whose
+    cached state is behind the database finds out instead of overwriting it.
+    """
+    current_question: Optional[Question] = None
+    # Estimator selection key -> pre-selected question, valid for one catalog
+    # version: that one is shared by all workers, unlike the question pool's
+    candidates: Dict[str, Question] = {}
+    candidates_version: Optional[str] = None
+    
+    def __init__(self, session: QuizSession, attempted_ids: Iterable[UUID] = ()):
+        self.session = session
+        self.attempted_ids: Set[UUID] = set(attempted_ids)
+    
+    def set_candidates(self, candidates: Dict[str, Question], version: str) -> None:
+        self.candidates = candidates
+        self.candidates_version = version
+    
+    def take_candidate(self, selection_key: str, version: str) -> Optional[Question]:
+        """
+        Return the pre-selected question for a selection key, or None if there
+        is none or a question changed (in any worker) since it was chosen.
+        Clears all candidates either way: they were computed for this answer only.
+        """
+        candidates, self.candidates = self.candidates, {}
+        if self.candidates_version != version:
+            return None
+        question = candidates.get(selection_key)
+        if question is None or question.id in self.attempted_ids:
+            return None
+        return question
+    
+    @classmethod
+    def load(cls, session: QuizSession) -> 'SessionState':
+        """Build the state for a session row read from the database"""
+        return cls(session, session.attempts.values_list('question_id', flat=True))
+
+
+def save_session_state(state: SessionState, previous_total: int, update_fields: Iterable[str]) -> None:
+    """
+    Write the changed session columns, provided the row is still at
+    ``previous_total`` answered questions and hasn't ended.
+    
+    Raises StaleSessionState if another worker got there first; the caller's
+    transaction should then be rolled back and retried from the database.
+    """
+    session = state.session
+    updated = QuizSession.objects.filter(
+        pk=session.pk,
+        total_questions=previous_total,
+        ended_at__isnull=True,
+    ).update(**{field: getattr(session, field) for field in update_fields})
+    if not updated:
+        raise StaleSessionState(f'Session {session.pk} changed since it was cached')
+
+
+class LocalStateBackend:
+    """Per-process LRU; entries are pickled so callers never share instances"""
+    
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.lru = LRUCache(max_entries, ttl_seconds)
+    
+    def get(self, key: str) -> Optional[bytes]:
+        return self.lru.get(key)
+    
+    def set(self, key: str, value: bytes) -> None:
+        self.lru.set(key, value)
+    
+    def add(self, key: str, value: bytes) -> bool:
+        return self.lru.add(key, value)
+    
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        values = ((key, self.lru.get(key)) for key in keys)
+        return {key: value for key, value in values if value is not None}
+    
+    def delete(self, key: str) -> None:
+        self.lru.delete(key)
+    
+    def delete_many(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self.lru.delete(key)
+
+
+class DjangoStateBackend:
+    """Shared tier backed by a Django cache alias"""
+    
+    def __init__(self, alias: str, ttl_seconds: float):
+        self.cache = caches[alias]
+        self.ttl_seconds = ttl_seconds
+    
+    def get(self, key: str) -> Optional[bytes]:
+        return self.cache.get(key)
+    
+    def set(self, key: str, value: bytes) -> None:
+        self.cache.set(key, value, timeout=self.ttl_seconds)
+    
+    def add(self, key: str, value: bytes) -> bool:
+        return self.cache.add(key, value, timeout=self.ttl_seconds)
+    
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        return self.cache.get_many(list(keys))
+    
+    def delete(self, key: str) -> None:
+        self.cache.delete(key)
+    
+    def delete_many(self, keys: Iterable[str]) -> None:
+        self.cache.delete_many(list(keys))
+
+
+class SessionStateCache:
+    """Bounded cache of SessionState keyed by session id"""
+    
+    def __init__(self, backend=None):
+        self.backend = backend
+    
+    def get(self, session_id) -> Optional[SessionState]:
+        if self.backend is None:
+            return None
+        value = self.backend.get(self._key(session_id))
+        return pickle.loads(value) if value is not None else None
+    
+    def put(self, state: SessionState) -> None:
+        if self.backend is None:
+            return
+        if state.session.ended_at:
+            self.evict(state.session.pk)
+            return
+        self.backend.set(self._key(state.session.pk), pickle.dumps(state, pickle.HIGHEST_PROTOCOL))
+    
+    def evict(self, session_id) -> None:
+        if self.backend is not None:
+            self.backend.delete(self._key(session_id))
+    
+    @staticmethod
+    def _key(session_id) -> str:
+        return f'quiz-session-state:{session_id}'
+
+
+_session_state_cache: Optional[SessionStateCache] = None
+_session_state_cache_lock = threading.Lock()
+
+
+def get_session_state_cache() -> SessionStateCache:
+    """Return the process-wide session state cache, built from settings on first use"""
+    global _session_state_cache
+    if _session_state_cache is None:
+        with _session_state_cache_lock:
+            if _session_state_cache is None:
+                _session_state_cache = _build_session_state_cache()
+    return _session_state_cache
+
+
+def _build_session_state_cache() -> SessionStateCache:
+    backend_name = settings.SESSION_STATE_CACHE_BACKEND
+    ttl = settings.SESSION_STATE_CACHE_TTL_SECONDS
+    if backend_name == 'none':
+        return SessionStateCache()
+    if backend_name == 'memory':
+        return SessionStateCache(LocalStateBackend(settings.SESSION_STATE_CACHE_MAX_ENTRIES, ttl))
+    if backend_name == 'django':
+        return SessionStateCache(DjangoStateBackend(settings.SESSION_STATE_CACHE_ALIAS, ttl))
+    
+    raise ValueError(f'Unknown SESSION_STATE_CACHE_BACKEND: {backend_name}')
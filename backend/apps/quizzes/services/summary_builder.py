@@ -2,93 +2,204 @@
 Summary Builder Service
 Computes aggregated statistics for a quiz session
 """
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional
+from asgiref.sync import sync_to_async
 from django.utils import timezone
-from ..models import QuizSession, QuestionAttempt
+from ..models import QuizSession
+from .session_state import get_session_state_cache
+
+
+DIFFICULTIES = ['easy', 'medium', 'hard']
+
+
+def empty_aggregates() -> Dict:
+    """Running aggregates for a session with no attempts yet"""
+    return {
+        'attention_sum': 0.0,
+        'attention_count': 0,
+        'response_time_sum': 0,
+        'response_time_count': 0,
+        'by_difficulty': {diff: _empty_difficulty_stats() for diff in DIFFICULTIES},
+    }
+
+
+def add_attempt_to_aggregates(
+    aggregates: Dict,
+    difficulty: str,
+    is_correct: bool,
+    attention_ratio: Optional[float],
+    response_time_ms: Optional[int]
+) -> Dict:
+    """
+    Fold one attempt into the running aggregates in place.
+    
+    Attention is averaged over attempts that reported it and response time
+    over attempts with a non-zero time, matching the summary averages.
+    """
+    diff_stats = aggregates['by_difficulty'].setdefault(difficulty, _empty_difficulty_stats())
+    diff_stats['questions'] += 1
+    if is_correct:
+        diff_stats['correct'] += 1
+    
+    if attention_ratio is not None:
+        for stats in (aggregates, diff_stats):
+            stats['attention_sum'] += attention_ratio
+            stats['attention_count'] += 1
+    
+    if response_time_ms:
+        for stats in (aggregates, diff_stats):
+            stats['response_time_sum'] += response_time_ms
+            stats['response_time_count'] += 1
+    
+    return aggregates
+
+
+def apply_aggregates_to_session(session: QuizSession, total_questions: int, num_correct: int) -> None:
+    """Set the denormalized overall_* columns from the running aggregates"""
+    aggregates = session.aggregates
+    session.overall_accuracy = num_correct / total_questions if total_questions > 0 else 0.0
+    session.overall_attention_ratio = _average(
+        aggregates['attention_sum'], aggregates['attention_count']
+    )
+    session.overall_avg_response_time_ms = int(_average(
+        aggregates['response_time_sum'], aggregates['response_time_count']
+    ))
+
+
+def recompute_session_aggregates(session: QuizSession, attempts: Optional[Iterable] = None) -> None:
+    """
+    Rebuild the running aggregates and overall stats of a session from its
+    attempts and save them. Used to backfill sessions recorded before the
+    aggregates existed.
+    """
+    if attempts is None:
+        attempts = session.attempts.values(
+            'difficulty_at_attempt', 'is_correct', 'attention_ratio', 'response_time_ms'
+        )
+    
+    aggregates = empty_aggregates()
+    total_questions = 0
+    num_correct = 0
+    for attempt in attempts:
+        add_attempt_to_aggregates(
+            aggregates,
+            attempt['difficulty_at_attempt'],
+            attempt['is_correct'],
+            attempt['attention_ratio'],
+            attempt['response_time_ms'],
+        )
+        total_questions += 1
+        if attempt['is_correct']:
+            num_correct += 1
+    
+    session.aggregates = aggregates
+    session.total_questions = total_questions
+    session.num_correct = num_correct
+    apply_aggregates_to_session(session, total_questions, num_correct)
+    session.save(update_fields=[
+        'aggregates', 'total_questions', 'num_correct', 'overall_accuracy',
+        'overall_attention_ratio', 'overall_avg_response_time_ms'
+    ])
 
 
 def build_session_summary(session: QuizSession) -> Dict:
     """
     Build comprehensive summary statistics for a quiz session.
     
+    Overall and per-difficulty stats are read from the running aggregates
+    kept on the session; only the per-question rows are fetched.
+    
     Returns:
         Dictionary with aggregated stats, per-question data, and difficulty breakdown
     """
-    attempts = session.attempts.all().order_by('question_index')
+    attempts = list(_summary_attempts(session))
+    
+    # Sessions recorded before aggregates were tracked are repaired on first read
+    if not session.aggregates and attempts:
+        recompute_session_aggregates(session, attempts)
     
+    if not session.ended_at:
+        session.ended_at = timezone.now()
+        session.save(update_fields=['ended_at'])
+        get_session_state_cache().evict(session.pk)
+    
+    return _summary(session, attempts)
+
+
+async def abuild_session_summary(session: QuizSession) -> Dict:
+    """``build_session_summary`` for async views, read with the async ORM"""
+    attempts = [attempt async for attempt in _summary_attempts(session)]
+    
+    if not session.aggregates and attempts:
+        await sync_to_async(recompute_session_aggregates)(session, attempts)
+    
+    if not session.ended_at:
+        session.ended_at = timezone.now()
+        await session.asave(update_fields=['ended_at'])
+        await sync_to_async(get_session_state_cache().evict)(session.pk)
+    
+    return _summary(session, attempts)
+
+
+def _summary_attempts(session: QuizSession):
+    return session.attempts.order_by('question_index').values(
+        'question_index', 'question_id', 'difficulty_at_attempt', 'is_correct',
+        'response_time_ms', 'attention_ratio', 'off_screen_ratio'
+    )
+
+
+def _summary(session: QuizSession, attempts: List[Dict]) -> Dict:
+    """The summary of a session whose aggregates are up to date"""
     # Per-question stats
     per_question_stats = []
     for attempt in attempts:
         per_question_stats.append({
-            'question_index': attempt.question_index,
-            'question_id': str(attempt.question.id),
-            'difficulty': attempt.difficulty_at_attempt,
-            'is_correct': attempt.is_correct,
-            'response_time_ms': attempt.response_time_ms,
-            'attention_ratio': attempt.attention_ratio,
-            'off_screen_ratio': attempt.off_screen_ratio,
+            'question_index': attempt['question_index'],
+            'question_id': str(attempt['question_id']),
+            'difficulty': attempt['difficulty_at_attempt'],
+            'is_correct': attempt['is_correct'],
+            'response_time_ms': attempt['response_time_ms'],
+            'attention_ratio': attempt['attention_ratio'],
+            'off_screen_ratio': attempt['off_screen_ratio'],
         })
     
-    # Aggregate stats
-    total_questions = len(attempts)
-    num_correct = sum(1 for a in attempts if a.is_correct)
-    overall_accuracy = num_correct / total_questions if total_questions > 0 else 0.0
-    
-    # Average attention ratio
-    attention_ratios = [a.attention_ratio for a in attempts if a.attention_ratio is not None]
-    overall_attention_ratio = sum(attention_ratios) / len(attention_ratios) if attention_ratios else 0.0
-    
-    # Average response time
-    response_times = [a.response_time_ms for a in attempts if a.response_time_ms]
-    overall_avg_response_time_ms = int(sum(response_times) / len(response_times)) if response_times else 0
-    
     # Difficulty breakdown
+    aggregates = session.aggregates or empty_aggregates()
     difficulty_stats = {}
-    for diff in ['easy', 'medium', 'hard']:
-        diff_attempts = [a for a in attempts if a.difficulty_at_attempt == diff]
-        if diff_attempts:
-            diff_correct = sum(1 for a in diff_attempts if a.is_correct)
-            diff_accuracy = diff_correct / len(diff_attempts)
-            
-            diff_attention = [a.attention_ratio for a in diff_attempts if a.attention_ratio is not None]
-            diff_avg_attention = sum(diff_attention) / len(diff_attention) if diff_attention else 0.0
-            
-            diff_times = [a.response_time_ms for a in diff_attempts if a.response_time_ms]
-            diff_avg_time = int(sum(diff_times) / len(diff_times)) if diff_times else 0
-            
-            difficulty_stats[diff] = {
-                'questions': len(diff_attempts),
-                'correct': diff_correct,
-                'accuracy': diff_accuracy,
-                'avg_attention_ratio': diff_avg_attention,
-                'avg_response_time_ms': diff_avg_time,
-            }
-        else:
-            difficulty_stats[diff] = {
-                'questions': 0,
-                'correct': 0,
-                'accuracy': 0.0,
-                'avg_attention_ratio': 0.0,
-                'avg_response_time_ms': 0,
-            }
-    
-    # Update session aggregates
-    session.total_questions = total_questions
-    session.num_correct = num_correct
-    session.overall_accuracy = overall_accuracy
-    session.overall_attention_ratio = overall_attention_ratio
-    session.overall_avg_response_time_ms = overall_avg_response_time_ms
-    if not session.ended_at:
-        session.ended_at = timezone.now()
-    session.save()
+    for diff in DIFFICULTIES:
+        stats = aggregates['by_difficulty'].get(diff) or _empty_difficulty_stats()
+        questions = stats['questions']
+        difficulty_stats[diff] = {
+            'questions': questions,
+            'correct': stats['correct'],
+            'accuracy': stats['correct'] / questions if questions else 0.0,
+            'avg_attention_ratio': _average(stats['attention_sum'], stats['attention_count']),
+            'avg_response_time_ms': int(_average(
+                stats['response_time_sum'], stats['response_time_count']
+            )),
+        }
     
     return {
-        'total_questions': total_questions,
-        'num_correct': num_correct,
-        'overall_accuracy': overall_accuracy,
-        'overall_attention_ratio': overall_attention_ratio,
-        'overall_avg_response_time_ms': overall_avg_response_time_ms,
+        'total_questions': session.total_questions,
+        'num_correct': session.num_correct,
+        'overall_accuracy': session.overall_accuracy or 0.0,
+        'overall_attention_ratio': session.overall_attention_ratio or 0.0,
+        'overall_avg_response_time_ms': session.overall_avg_response_time_ms or 0,
         'per_question_stats': per_question_stats,
         'difficulty_breakdown': difficulty_stats,
     }
 
+
+def _empty_difficulty_stats() -> Dict:
+    return {
+        'questions': 0,
+        'correct': 0,
+        'attention_sum': 0.0,
+        'attention_count': 0,
+        'response_time_sum': 0,
+        'response_time_count': 0,
+    }
+
+
+def _average(total: float, count: int) -> float:
+    return total / count if count else 0.0
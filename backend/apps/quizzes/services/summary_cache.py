@@ -0,0 +1,258 @@
+"""
+Summary Cache
+Content-addressed cache of LLM summaries keyed by a fingerprint of the prompt inputs
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+from django.conf import settings
+from django.core.cache import caches
+
+
+class LRUCache:
+    """Size-bounded, thread-safe LRU with a per-entry TTL"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._set(key, value)
+
+    def add(self, key: str, value: str) -> bool:
+        """Set ``key`` unless it holds an unexpired value; returns whether it did"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                return False
+            self._set(key, value)
+            return True
+
+    def _set(self, key: str, value: str) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class DjangoCacheBackend:
+    """Shared tier backed by a Django cache alias"""
+
+    def __init__(self, alias: str, ttl_seconds: float):
+        self.cache = caches[alias]
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        return self.cache.get(f'llm-summary:{key}')
+
+    def set(self, key: str, value: str) -> None:
+        self.cache.set(f'llm-summary:{key}', value, timeout=self.ttl_seconds)
+
+
+class FileCacheBackend:
+    """
+    Shared tier stored as one JSON file per key in a local directory.
+    Keeps at most ``max_entries`` files, pruning the oldest on write.
+    """
+
+    PRUNE_EVERY = 64
+
+    def __init__(self, directory, max_entries: int, ttl_seconds: float):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._writes = 0
+
+    def get(self, key: str) -> Optional[str]:
+        path = self.directory / f'{key}.json'
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('expires_at', 0) < time.time():
+            path.unlink(missing_ok=True)
+            return None
+        return entry.get('value')
+
+    def set(self, key: str, value: str) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f'{key}.json'
+        tmp_path = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'expires_at': time.time() + self.ttl_seconds, 'value': value}, f)
+        os.replace(tmp_path, path)
+
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self._prune()
+
+    def _prune(self) -> None:
+        files = sorted(self.directory.glob('*.json'), key=lambda p: p.stat().st_mtime)
+        for path in files[:max(len(files) - self.max_entries, 0)]:
+            path.unlink(missing_ok=True)
+
+
+class SummaryCache:
+    """
+    Two-tier summary cache: an in-process LRU in front of an optional shared
+    backend. Counts hits and misses across both tiers (exported by
+    ``MetricsRegistry.render``).
+    """
+
+    def __init__(self, lru: LRUCache, backend=None):
+        self.lru = lru
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        # Lookups come from request threads and the summary job pool
+        self._stats_lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.lru.get(key)
+        if value is None and self.backend is not None:
+            value = self.backend.get(key)
+            if value is not None:
+                self.lru.set(key, value)
+
+        self._count(value is not None)
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        self.lru.set(key, value)
+        if self.backend is not None:
+            self.backend.set(key, value)
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+    def _count(self, hit: bool) -> None:
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+
+class NullSummaryCache(SummaryCache):
+    """Used when the cache is disabled; every lookup is a miss"""
+
+    def __init__(self):
+        super().__init__(LRUCache(0, 0))
+
+    def get(self, key: str) -> Optional[str]:
+        self._count(False)
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        pass
+
+
+_summary_cache: Optional[SummaryCache] = None
+_summary_cache_lock = threading.Lock()
+
+
+def get_summary_cache() -> SummaryCache:
+    """Return the process-wide summary cache, built from settings on first use"""
+    global _summary_cache
+    if _summary_cache is None:
+        with _summary_cache_lock:
+            if _summary_cache is None:
+                _summary_cache = _build_summary_cache()
+    return _summary_cache
+
+
+def reset_summary_cache() -> None:
+    """Drop the process-wide cache so it is rebuilt from current settings"""
+    global _summary_cache
+    with _summary_cache_lock:
+        _summary_cache = None
+
+
+def summary_cache_key(model: str, chapter_name: str, summary_data: dict, prompt: str, template: str) -> str:
+    """
+    Fingerprint the prompt inputs.
+
+    In 'exact' mode the key is the model plus the full prompt text. In
+    'bucketed' mode it is built from the chapter and coarse buckets of the
+    session stats, so sessions that would get essentially the same feedback
+    (perfect scores, all skipped, ...) share one completion. ``template``
+    (see ``llm_client.summary_template_fingerprint``) is part of both, so
+    editing the prompt template retires the summaries made with the old one.
+    """
+    if settings.LLM_SUMMARY_CACHE_MATCH == 'exact':
+        fingerprint = {'model': model, 'template': template, 'prompt': prompt}
+    else:
+        breakdown = summary_data.get('difficulty_breakdown', {})
+        fingerprint = {
+            'model': model,
+            'template': template,
+            'chapter': chapter_name,
+            'total_questions': summary_data.get('total_questions', 0),
+            'accuracy': _bucket(summary_data.get('overall_accuracy'), 0.1),
+            'attention': _bucket(summary_data.get('overall_attention_ratio'), 0.1),
+            'avg_time_s': _bucket((summary_data.get('overall_avg_response_time_ms') or 0) / 1000, 10),
+            'difficulty': {
+                diff: [
+                    stats.get('questions', 0),
+                    stats.get('correct', 0),
+                    _bucket(stats.get('avg_attention_ratio'), 0.2),
+                ]
+                for diff, stats in sorted(breakdown.items())
+            },
+        }
+
+    payload = json.dumps(fingerprint, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _bucket(value: Optional[float], width: float) -> int:
+    return int((value or 0) // width)
+
+
+def _build_summary_cache() -> SummaryCache:
+    backend_name = settings.LLM_SUMMARY_CACHE_BACKEND
+    if backend_name == 'none':
+        return NullSummaryCache()
+
+    ttl = settings.LLM_SUMMARY_CACHE_TTL_SECONDS
+    max_entries = settings.LLM_SUMMARY_CACHE_MAX_ENTRIES
+    lru = LRUCache(max_entries, ttl)
+
+    if backend_name == 'memory':
+        return SummaryCache(lru)
+    if backend_name == 'django':
+        return SummaryCache(lru, DjangoCacheBackend(settings.LLM_SUMMARY_CACHE_ALIAS, ttl))
+    if backend_name == 'file':
+        return SummaryCache(lru, FileCacheBackend(settings.LLM_SUMMARY_CACHE_DIR, max_entries, ttl))
+
+    raise ValueError(f'Unknown LLM_SUMMARY_CACHE_BACKEND: {backend_name}')
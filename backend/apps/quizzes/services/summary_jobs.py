@@ -0,0 +1,146 @@
+"""
+Summary Job Runner
+Generates LLM summaries off the request thread, one in-flight job per session
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import List, Optional
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+from ..models import QuizSession
+from .llm_client import generate_quiz_summary
+from .metrics import collect
+from .summary_builder import build_session_summary
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def request_summary(session: QuizSession) -> str:
+    """
+    Make sure a summary job exists for the session and return the status to
+    report to the client: 'ready' once the text is saved, otherwise 'pending'.
+    
+    The claim is a conditional UPDATE on the session row, so concurrent
+    requests (in any worker process) enqueue at most one job per session.
+    """
+    if session.summary_text:
+        return 'ready'
+    
+    if claim_summary(session.pk) and settings.SUMMARY_JOB_RUNNER == 'thread':
+        _get_executor().submit(_run_in_thread, session.pk)
+    
+    return 'pending'
+
+
+async def arequest_summary(session: QuizSession) -> str:
+    """``request_summary`` for async views, claiming with the async ORM"""
+    if session.summary_text:
+        return 'ready'
+    
+    if await aclaim_summary(session.pk) and settings.SUMMARY_JOB_RUNNER == 'thread':
+        _get_executor().submit(_run_in_thread, session.pk)
+    
+    return 'pending'
+
+
+def claim_summary(session_id, status: str = 'pending') -> bool:
+    """
+    Mark the session's summary as pending (or 'running' for callers that
+    generate it themselves, like the streaming endpoint). Returns False if a
+    job is already queued or running and has not gone stale.
+    """
+    return _claimable(session_id).update(**_claim_fields(status)) == 1
+
+
+async def aclaim_summary(session_id, status: str = 'pending') -> bool:
+    return await _claimable(session_id).aupdate(**_claim_fields(status)) == 1
+
+
+def _claimable(session_id):
+    stale_before = timezone.now() - timedelta(seconds=settings.SUMMARY_JOB_STALE_SECONDS)
+    return QuizSession.objects.filter(
+        pk=session_id,
+        summary_text=''
+    ).filter(
+        Q(summary_status='') |
+        Q(summary_status__in=['pending', 'running'], summary_requested_at__lt=stale_before)
+    )
+
+
+def _claim_fields(status: str) -> dict:
+    return {'summary_status': status, 'summary_requested_at': timezone.now()}
+
+
+def release_summary_claim(session_id) -> None:
+    """Give up a running claim so the next request retries the summary"""
+    _running(session_id).update(summary_status='')
+
+
+async def arelease_summary_claim(session_id) -> None:
+    await _running(session_id).aupdate(summary_status='')
+
+
+def _running(session_id):
+    return QuizSession.objects.filter(pk=session_id, summary_status='running')
+
+
+def run_summary_job(session_id) -> bool:
+    """
+    Generate and save the summary for a pending session.
+    Returns False if another worker already took the job.
+    """
+    started = QuizSession.objects.filter(
+        pk=session_id,
+        summary_status='pending'
+    ).update(summary_status='running', summary_requested_at=timezone.now())
+    if not started:
+        return False
+    
+    try:
+        with collect('run_summary_job'):
+            session = QuizSession.objects.select_related('chapter').get(pk=session_id)
+            summary_data = build_session_summary(session)
+            generate_quiz_summary(session, summary_data)
+    except Exception:
+        logger.exception('Summary job failed for session %s', session_id)
+        # Release the claim so the next poll retries
+        release_summary_claim(session_id)
+        return False
+    
+    return True
+
+
+def pending_summary_ids(limit: int = 100) -> List:
+    """IDs of sessions waiting for a worker, oldest request first"""
+    return list(
+        QuizSession.objects.filter(summary_status='pending')
+        .order_by('summary_requested_at')
+        .values_list('id', flat=True)[:limit]
+    )
+
+
+def _run_in_thread(session_id) -> None:
+    try:
+        run_summary_job(session_id)
+    finally:
+        # Pool threads outlive the job; don't leak their DB connections
+        connections.close_all()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.SUMMARY_JOB_WORKERS,
+                    thread_name_prefix='summary-job'
+                )
+    return _executor
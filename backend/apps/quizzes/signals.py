@@ -0,0 +1,25 @@
+"""
+Signal handlers for Quiz app
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Chapter, Question
+from .services.chapter_catalog import invalidate_chapter_catalog
+from .services.question_pool import question_pool
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_question_pool(sender, instance, **kwargs):
+    """Drop the cached question pool for the chapter of a changed question"""
+    question_pool.invalidate(instance.chapter_id)
+
+
+@receiver(post_save, sender=Chapter)
+@receiver(post_delete, sender=Chapter)
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_catalog(sender, **kwargs):
+    """Chapter names and question counts are part of the cached catalog"""
+    invalidate_chapter_catalog()
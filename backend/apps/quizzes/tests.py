@@ -0,0 +1,384 @@
+"""
+Tests for Quiz app
+"""
+import base64
+import struct
+import uuid
+from datetime import datetime, timedelta
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from . import views
+from .models import AnswerBatch, Chapter, Question, QuestionAttempt, QuizSession
+from .services.chapter_catalog import catalog_version, invalidate_chapter_catalog
+from .services.gaze_store import GazeChunkOutOfOrder, GazeStore
+from .services.question_import import upsert_questions
+from .services.question_pool import question_pool
+from .services.session_state import LocalStateBackend, get_session_state_cache
+
+
+class QuizApiTestCase(TestCase):
+    """A student and a chapter with five questions per difficulty"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(email='student@example.com', password='x')
+        cls.chapter = Chapter.objects.create(slug='p-block', name='p-Block Elements')
+        for difficulty in ('easy', 'medium', 'hard'):
+            for number in range(5):
+                Question.objects.create(
+                    chapter=cls.chapter,
+                    external_id=f'{difficulty}-{number}',
+                    text=f'{difficulty} question {number}',
+                    options=['a', 'b', 'c', 'd'],
+                    correct_option_index=0,
+                    difficulty=difficulty,
+                )
+
+    def setUp(self):
+        question_pool.invalidate(self.chapter.id)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def start(self, max_questions=5):
+        response = self.client.post('/api/quizzes/sessions/start/', {
+            'chapter_slug': self.chapter.slug,
+            'max_questions': max_questions,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    @staticmethod
+    def answer_body(question_id, question_index):
+        now = timezone.now().isoformat()
+        return {
+            'question_id': str(question_id),
+            'question_index': question_index,
+            'started_at': now,
+            'submitted_at': now,
+            'response_time_ms': 1000,
+            'selected_option_index': 0,
+        }
+
+    def answer(self, session_id, question, question_index):
+        return self.client.post(
+            f'/api/quizzes/sessions/{session_id}/answer/',
+            self.answer_body(question['id'], question_index),
+            format='json'
+        )
+
+
+class SubmitAnswerQueryCountTest(QuizApiTestCase):
+    """
+    Answering takes a fixed number of queries, whatever the session's
+    length. Raise these counts only for a round trip you mean to add.
+    """
+    # Cached state: savepoint, INSERT attempt, conditional UPDATE of the
+    # session, release, then one SELECT of the follow-up candidates
+    CACHED_QUERIES = 5
+    # Locked-row fallback adds the locked session, the question and the
+    # attempted question IDs, and picks the next question itself
+    FALLBACK_QUERIES = 9
+    # The last answer prefetches nothing
+    ENDING_QUERIES = 4
+
+    def test_answer_from_cached_state(self):
+        started = self.start()
+
+        with self.assertNumQueries(self.CACHED_QUERIES):
+            response = self.answer(started['quiz_session_id'], started['question'], 1)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['has_more'])
+
+    def test_answer_from_locked_row(self):
+        started = self.start()
+        session_id = started['quiz_session_id']
+        first = self.answer(session_id, started['question'], 1).json()
+        get_session_state_cache().evict(session_id)
+
+        with self.assertNumQueries(self.FALLBACK_QUERIES):
+            response = self.answer(session_id, first['question'], 2)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['has_more'])
+
+    def test_session_ending_answer(self):
+        started = self.start(max_questions=2)
+        session_id = started['quiz_session_id']
+        first = self.answer(session_id, started['question'], 1).json()
+
+        with self.assertNumQueries(self.ENDING_QUERIES):
+            response = self.answer(session_id, first['question'], 2)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['has_more'])
+        self.assertIsNotNone(QuizSession.objects.get(pk=session_id).ended_at)
+
+    def test_candidates_expire_when_any_worker_changes_a_question(self):
+        started = self.start()
+        session_id = started['quiz_session_id']
+        self.answer(session_id, started['question'], 1)
+        cache = get_session_state_cache()
+        key, candidate = next(iter(cache.get(session_id).candidates.items()))
+
+        self.assertEqual(cache.get(session_id).take_candidate(key, catalog_version()), candidate)
+
+        # What another worker's Question signal does; this process's pool never hears of it
+        invalidate_chapter_catalog()
+        self.assertIsNone(cache.get(session_id).take_candidate(key, catalog_version()))
+
+
+class AnswerBatchTest(QuizApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.started = self.start()
+        self.session_id = self.started['quiz_session_id']
+        self.url = f'/api/quizzes/sessions/{self.session_id}/answers/'
+        # Any unattempted question of the chapter can follow the first
+        second = Question.objects.filter(chapter=self.chapter).exclude(id=self.started['question']['id']).first()
+        self.batch = {
+            'idempotency_key': str(uuid.uuid4()),
+            'answers': [
+                self.answer_body(self.started['question']['id'], 1),
+                self.answer_body(second.id, 2),
+            ],
+        }
+
+    def test_retry_with_the_same_key_replays_the_response(self):
+        first = self.client.post(self.url, self.batch, format='json')
+        self.assertEqual(first.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', first)
+
+        retry = self.client.post(self.url, self.batch, format='json')
+
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(QuestionAttempt.objects.filter(quiz_session_id=self.session_id).count(), 2)
+        self.assertEqual(AnswerBatch.objects.filter(quiz_session_id=self.session_id).count(), 1)
+
+    def test_batch_not_starting_at_the_current_question(self):
+        for index, answer in enumerate(self.batch['answers'], start=2):
+            answer['question_index'] = index
+
+        response = self.client.post(self.url, self.batch, format='json')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['expected_question_index'], 1)
+        self.assertFalse(QuestionAttempt.objects.filter(quiz_session_id=self.session_id).exists())
+
+    def test_concurrent_retry_hits_the_unique_constraint(self):
+        state_cache = get_session_state_cache()
+        before = state_cache.get(self.session_id)
+        first = self.client.post(self.url, self.batch, format='json').json()
+        # The retry read the session and looked for a stored batch before the
+        # first one committed, so it only finds out from the constraint
+        state_cache.put(before)
+        lookups = iter([lambda *args: None, views._replayed_batch])
+        with mock.patch.object(views, '_replayed_batch', side_effect=lambda *args: next(lookups)(*args)) as lookup:
+            with mock.patch.object(views, '_record_answers', wraps=views._record_answers) as record:
+                retry = self.client.post(self.url, self.batch, format='json')
+
+        self.assertEqual(lookup.call_count, 2)
+        self.assertEqual(record.call_count, 1)
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json(), first)
+        self.assertEqual(QuestionAttempt.objects.filter(quiz_session_id=self.session_id).count(), 2)
+
+
+class UpsertQuestionsTest(TestCase):
+    @staticmethod
+    def record(external_id, text):
+        return {
+            'external_id': external_id,
+            'text': text,
+            'options': ['a', 'b', 'c', 'd'],
+            'correct_option_index': 0,
+            'difficulty': 'easy',
+        }
+
+    def test_repeated_external_id_keeps_last_occurrence(self):
+        chapter = Chapter.objects.create(slug='p-block', name='p-Block Elements')
+        records = [
+            self.record('q1', 'first'),
+            self.record('q2', 'other'),
+            self.record('q1', 'second'),
+            self.record('q1', 'third'),
+        ]
+
+        changes = upsert_questions(chapter, records, batch_size=2)
+
+        self.assertEqual(changes['created'], ['q1', 'q2'])
+        self.assertEqual(changes['duplicates'], ['q1', 'q1'])
+        self.assertEqual(
+            dict(Question.objects.filter(chapter=chapter).values_list('external_id', 'text')),
+            {'q1': 'third', 'q2': 'other'}
+        )
+
+
+class SessionListPaginationTest(TestCase):
+    """
+    The session list is keyset-paginated: ``{next, results}``, newest first,
+    with ties on started_at broken by id.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(email='student@example.com', password='x')
+        cls.chapter = Chapter.objects.create(slug='p-block', name='p-Block Elements')
+        cls.day = timezone.make_aware(datetime(2024, 3, 1, 12))
+        # Two sessions per day over three days, both of a day at the same instant
+        for offset in range(3):
+            for _ in range(2):
+                session = QuizSession.objects.create(user=cls.user, chapter=cls.chapter)
+                QuizSession.objects.filter(pk=session.pk).update(started_at=cls.day + timedelta(days=offset))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def list(self, url='/api/quizzes/sessions/', **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_pages_walk_every_session_once_in_order(self):
+        expected = [
+            str(pk) for pk in
+            QuizSession.objects.order_by('-started_at', '-id').values_list('id', flat=True)
+        ]
+
+        seen = []
+        page = self.list(page_size=4)
+        self.assertEqual(list(page), ['next', 'results'])
+        seen += [row['id'] for row in page['results']]
+        page = self.list(page['next'])
+        seen += [row['id'] for row in page['results']]
+
+        self.assertIsNone(page['next'])
+        self.assertEqual(seen, expected)
+
+    def test_page_boundary_inside_a_tie(self):
+        # A page of three ends between the two sessions sharing the middle day
+        first = self.list(page_size=3)
+        second = self.list(first['next'])
+
+        ids = [row['id'] for row in first['results'] + second['results']]
+        self.assertEqual(len(ids), 6)
+        self.assertEqual(len(set(ids)), 6)
+
+    def test_invalid_cursor(self):
+        for cursor in ('not-base64!', 'Zm9vfGJhcg=='):
+            response = self.client.get('/api/quizzes/sessions/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 404)
+
+    def test_started_filters(self):
+        page = self.list(started_after='2024-03-02', started_before='2024-03-03')
+        self.assertEqual(len(page['results']), 2)
+        self.assertTrue(all(row['started_at'].startswith('2024-03-02') for row in page['results']))
+
+        response = self.client.get('/api/quizzes/sessions/', {'started_after': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ChapterCatalogTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(email='student@example.com', password='x')
+        cls.chapter = Chapter.objects.create(slug='p-block', name='p-Block Elements')
+        cls.question = Question.objects.create(
+            chapter=cls.chapter,
+            external_id='easy-0',
+            text='easy question',
+            options=['a', 'b', 'c', 'd'],
+            correct_option_index=0,
+            difficulty='easy',
+        )
+
+    def setUp(self):
+        invalidate_chapter_catalog()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_matching_etag_gets_not_modified(self):
+        response = self.client.get('/api/quizzes/chapters/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['question_counts']['easy'], 1)
+        etag = response['ETag']
+
+        # Served from the cached catalog
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/quizzes/chapters/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_saving_a_question_changes_the_etag(self):
+        etag = self.client.get('/api/quizzes/chapters/')['ETag']
+
+        self.question.is_active = False
+        self.question.save()
+
+        response = self.client.get('/api/quizzes/chapters/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()[0]['question_counts']['easy'], 0)
+
+
+class GazeStoreTest(SimpleTestCase):
+    SESSION_ID = '00000000-0000-0000-0000-000000000001'
+
+    def setUp(self):
+        self.store = GazeStore(LocalStateBackend(max_entries=100, ttl_seconds=60))
+
+    @staticmethod
+    def batch(first_t, count):
+        times = [first_t + 10 * i for i in range(count)]
+        data = struct.pack(f'<{count}I{count}f{count}f', *times, *[50.0] * count, *[50.0] * count)
+        return {
+            'format': 1,
+            'count': count,
+            'question_box': [0, 0, 100, 100],
+            'data': base64.b64encode(data).decode('ascii'),
+        }
+
+    def add(self, seq):
+        return self.store.add_chunk(self.SESSION_ID, 1, seq, self.batch(1000 * seq, 10))
+
+    def evict_counters(self):
+        self.store.backend.delete(self.store._key(self.SESSION_ID, 1))
+
+    def test_upload_continues_after_counters_are_evicted(self):
+        self.add(0)
+        self.add(1)
+        self.evict_counters()
+
+        counters = self.add(2)
+
+        self.assertEqual((counters.chunks, counters.count), (3, 30))
+        metrics = self.store.metrics(self.SESSION_ID, 1)
+        self.assertEqual(metrics['num_gaze_samples'], 30)
+
+    def test_resent_chunk_after_counters_are_evicted(self):
+        self.add(0)
+        self.add(1)
+        self.evict_counters()
+
+        counters = self.add(0)
+
+        # Ignored, and the reply points past the chunks already stored
+        self.assertEqual((counters.chunks, counters.count), (2, 20))
+        self.assertEqual(self.store.metrics(self.SESSION_ID, 1)['num_gaze_samples'], 20)
+
+    def test_chunk_past_the_next_one(self):
+        self.add(0)
+        self.evict_counters()
+
+        with self.assertRaises(GazeChunkOutOfOrder) as raised:
+            self.add(2)
+        self.assertEqual(raised.exception.expected_seq, 1)
@@ -1,9 +1,20 @@
 """
 URLs for Quiz app
 """
+from django.conf import settings
 from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import ChapterViewSet, start_session_view, submit_answer_view, get_summary_view, list_sessions_view, get_session_view
+from .views import (
+    ChapterViewSet, start_session_view, submit_answer_view, get_summary_view,
+    stream_summary_view, list_sessions_view, get_session_view, session_decisions_view,
+    gaze_chunk_view, submit_answer_batch_view
+)
+
+if settings.QUIZ_ASYNC_VIEWS:
+    from .async_views import (  # noqa: F811
+        start_session_view, submit_answer_view, get_summary_view, stream_summary_view,
+        list_sessions_view
+    )
 
 router = DefaultRouter()
 router.register(r'chapters', ChapterViewSet, basename='chapter')
@@ -11,8 +22,12 @@ router.register(r'chapters', ChapterViewSet, basename='chapter')
 urlpatterns = [
     path('sessions/start/', start_session_view, name='start_session'),
     path('sessions/<uuid:quiz_session_id>/answer/', submit_answer_view, name='submit_answer'),
+    path('sessions/<uuid:quiz_session_id>/answers/', submit_answer_batch_view, name='submit_answer_batch'),
+    path('sessions/<uuid:quiz_session_id>/gaze/', gaze_chunk_view, name='gaze_chunk'),
     path('sessions/<uuid:quiz_session_id>/summary/', get_summary_view, name='get_summary'),
+    path('sessions/<uuid:quiz_session_id>/summary/stream/', stream_summary_view, name='stream_summary'),
     path('sessions/', list_sessions_view, name='list_sessions'),
     path('sessions/<uuid:quiz_session_id>/', get_session_view, name='get_session'),
+    path('sessions/<uuid:quiz_session_id>/decisions/', session_decisions_view, name='session_decisions'),
 ] + router.urls
 
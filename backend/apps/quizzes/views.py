@@ -1,20 +1,42 @@
 """
 Views for Quiz app
 """
+from datetime import datetime, time
+from typing import List, Optional, Tuple
 from rest_framework import status, viewsets
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import Http404, HttpResponse, HttpResponseForbidden, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from .models import Chapter, QuizSession, Question, QuestionAttempt
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_date, parse_datetime
+from .models import AnswerBatch, Chapter, QuizSession, Question, QuestionAttempt
 from .serializers import (
     ChapterSerializer, QuizQuestionSerializer, QuizSessionSerializer,
-    StartSessionSerializer, AnswerSubmissionSerializer
+    StartSessionSerializer, AnswerSubmissionSerializer, AnswerBatchSerializer, GazeChunkSerializer
 )
-from .services.question_selector import get_first_question_for_session, select_next_question
-from .services.summary_builder import build_session_summary
-from .services.llm_client import generate_quiz_summary
+from .services.ability import get_ability_estimator
+from .services.question_plan import build_plan
+from .services.summary_builder import (
+    build_session_summary, empty_aggregates, add_attempt_to_aggregates,
+    apply_aggregates_to_session, recompute_session_aggregates
+)
+from .pagination import SessionKeysetPagination
+from .renderers import EventStreamRenderer, format_sse
+from .services.chapter_catalog import catalog_version, get_chapter_catalog
+from .services.decision_trace import get_decision_tracer
+from .services.gaze_store import GazeChunkOutOfOrder, get_gaze_store
+from .services.llm_client import stream_quiz_summary
+from .services.metrics import get_metrics_registry
+from .services.session_state import (
+    SessionState, StaleSessionState, get_session_state_cache, save_session_state
+)
+from .services.summary_jobs import request_summary, claim_summary, release_summary_claim
 
 
 class ChapterViewSet(viewsets.ReadOnlyModelViewSet):
@@ -26,6 +48,19 @@ class ChapterViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ChapterSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = None  # Disable pagination for chapters
+    
+    def list(self, request, *args, **kwargs):
+        """
+        Serve the cached catalog (with question counts per difficulty).
+        A matching If-None-Match gets a 304 without building anything.
+        """
+        etag, chapters = get_chapter_catalog()
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(chapters)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, max_age=settings.CHAPTER_CATALOG_MAX_AGE_SECONDS)
+        return response
 
 
 @api_view(['POST'])
@@ -34,6 +69,10 @@ def start_session_view(request):
     """
     POST /api/quizzes/sessions/start/
     Start a new quiz session
+    
+    With ``mode: "planned"`` the question order is drawn up front from
+    ``seed`` (random when omitted) and stored with the session, so the
+    quiz is reproducible and answers only step through the plan.
     """
     serializer = StartSessionSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
@@ -41,18 +80,8 @@ def start_session_view(request):
     chapter_slug = serializer.validated_data['chapter_slug']
     chapter = get_object_or_404(Chapter, slug=chapter_slug, is_active=True)
     
-    # Create quiz session
-    session = QuizSession.objects.create(
-        user=request.user,
-        chapter=chapter,
-        max_questions=serializer.validated_data.get('max_questions', 15),
-        webgazer_enabled=serializer.validated_data.get('webgazer_enabled', True),
-        calibration_quality=serializer.validated_data.get('calibration_quality'),
-        device_info=serializer.validated_data.get('device_info', ''),
-    )
-    
-    # Get first question
-    question = get_first_question_for_session(session)
+    session = _new_session(request, chapter, serializer.validated_data)
+    question = _first_question(session)
     
     if not question:
         return Response(
@@ -60,10 +89,52 @@ def start_session_view(request):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Increment question index
-    session.current_question_index = 1
     session.save()
+    _cache_started_session(session, question)
     
+    return _started_response(session, chapter, question)
+
+
+def _new_session(request, chapter: Chapter, data: dict) -> QuizSession:
+    """
+    Unsaved session on its first question, recording which ability
+    estimator it runs on and, in planned mode, its question plan
+    """
+    max_questions = data.get('max_questions', 15)
+    session_settings = {'ability_estimator': settings.ABILITY_ESTIMATOR}
+    if data.get('mode') == 'planned':
+        session_settings['plan'] = build_plan(chapter.id, max_questions, data.get('seed'))
+    
+    return QuizSession(
+        user_id=request.user.pk,
+        chapter=chapter,
+        max_questions=max_questions,
+        webgazer_enabled=data.get('webgazer_enabled', True),
+        calibration_quality=data.get('calibration_quality'),
+        device_info=data.get('device_info', ''),
+        settings=session_settings,
+        current_question_index=1,
+    )
+
+
+def _first_question(session: QuizSession) -> Optional[Question]:
+    estimator = get_ability_estimator(session)
+    estimator.start(session)
+    return estimator.first_question(session)
+
+
+def _cache_started_session(session: QuizSession, question: Question) -> None:
+    """
+    Cache the state, with the follow-up questions for the first answer
+    already chosen, so that answer needs no reads
+    """
+    state = SessionState(session)
+    state.current_question = question
+    _prefetch_candidates(state)
+    get_session_state_cache().put(state)
+
+
+def _started_response(session: QuizSession, chapter: Chapter, question: Question) -> Response:
     return Response({
         'quiz_session_id': str(session.id),
         'chapter': ChapterSerializer(chapter).data,
@@ -79,111 +150,480 @@ def submit_answer_view(request, quiz_session_id):
     """
     POST /api/quizzes/sessions/{quiz_session_id}/answer/
     Submit an answer and get the next question
-    """
-    # Get session and verify ownership
-    session = get_object_or_404(QuizSession, id=quiz_session_id)
-    if session.user != request.user:
-        return Response(
-            {'error': 'Permission denied'},
-            status=status.HTTP_403_FORBIDDEN
-        )
     
-    if session.ended_at:
-        return Response(
-            {'error': 'Session has already ended'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+    Runs as one transaction. The session's hot state (ability, counts,
+    attempted questions) comes from the session state cache when present;
+    otherwise the session row is read and locked. Either way the session
+    is written with an UPDATE conditioned on its answer count, and a cached
+    state that turns out to be stale is dropped and the answer retried
+    against the locked row. Duplicate answers are rejected by the
+    (quiz_session, question_index) unique constraint.
     
+    Without gaze_samples in the body, attention metrics come from the
+    chunks uploaded to gaze_chunk_view for this question, if any.
+    """
     serializer = AnswerSubmissionSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
     
-    data = serializer.validated_data
-    
-    # Get question
-    question = get_object_or_404(Question, id=data['question_id'])
-    if question.chapter != session.chapter:
-        return Response(
-            {'error': 'Question does not belong to this session chapter'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+    return _answer(request, quiz_session_id, serializer.validated_data)
+
+
+def _answer(request, quiz_session_id, data: dict) -> Response:
+    """Record a validated answer (see submit_answer_view)"""
+    state_cache = get_session_state_cache()
+    gaze_store = get_gaze_store()
     
-    # Check if this question was already attempted in this session
-    existing_attempt = QuestionAttempt.objects.filter(
-        quiz_session=session,
-        question_index=data['question_index']
-    ).first()
+    if request.data.get('gaze_samples') is None:
+        _add_uploaded_attention(gaze_store, quiz_session_id, data)
     
-    if existing_attempt:
+    try:
+        try:
+            response = _submit_answer(request, quiz_session_id, data, state_cache.get(quiz_session_id))
+        except StaleSessionState:
+            # Another worker advanced or ended this session since it was cached
+            state_cache.evict(quiz_session_id)
+            response = _submit_answer(request, quiz_session_id, data, None)
+    except IntegrityError:
+        # This question index was already attempted in this session
         return Response(
             {'error': 'This question has already been attempted'},
             status=status.HTTP_400_BAD_REQUEST
         )
+    except Exception:
+        state_cache.evict(quiz_session_id)
+        raise
     
-    # Compute correctness
-    selected_index = data.get('selected_option_index')
-    is_correct = False
-    if selected_index is not None and not data.get('was_skipped', False):
-        is_correct = (selected_index == question.correct_option_index)
-    
-    # Get attention metrics
-    attention_metrics = data.get('attention_metrics', {})
-    
-    # Flag low attention
-    attention_ratio = attention_metrics.get('attention_ratio', 0.0)
-    flagged_low_attention = attention_ratio < 0.4
-    
-    # Create attempt
-    ability_before = session.current_ability
-    
-    attempt = QuestionAttempt.objects.create(
-        quiz_session=session,
-        question=question,
-        question_index=data['question_index'],
-        difficulty_at_attempt=question.difficulty,
-        ability_before=ability_before,
-        ability_after=ability_before,  # Will be updated by select_next_question
-        started_at=data['started_at'],
-        submitted_at=data['submitted_at'],
-        response_time_ms=data['response_time_ms'],
-        selected_option_index=selected_index,
-        is_correct=is_correct,
-        was_skipped=data.get('was_skipped', False),
-        attention_ratio=attention_metrics.get('attention_ratio'),
-        off_screen_ratio=attention_metrics.get('off_screen_ratio'),
-        off_screen_duration_ms=attention_metrics.get('off_screen_duration_ms'),
-        num_gaze_samples=attention_metrics.get('num_gaze_samples', 0),
-        num_on_task_samples=attention_metrics.get('num_on_task_samples', 0),
-        num_off_task_samples=attention_metrics.get('num_off_task_samples', 0),
-        option_changes=attention_metrics.get('option_changes', 0),
-        flagged_low_attention=flagged_low_attention,
-        raw_attention_trace=attention_metrics.get('raw_attention_trace'),
-    )
+    if response.status_code == status.HTTP_200_OK:
+        gaze_store.discard(quiz_session_id, data['question_index'])
+    return response
+
+
+def _add_uploaded_attention(gaze_store, quiz_session_id, data: dict) -> None:
+    """Measure the answer's attention metrics from its uploaded gaze chunks, if any"""
+    measured = gaze_store.metrics(quiz_session_id, data['question_index'])
+    if measured:
+        # The client's metrics still supply option_changes
+        data['attention_metrics'] = {**(data.get('attention_metrics') or {}), **measured}
+
+
+def _submit_answer(request, quiz_session_id, data: dict, state: Optional[SessionState]) -> Response:
+    """Validate and record one answer in a transaction, from cached state if given"""
+    with transaction.atomic():
+        # Get session and verify ownership
+        if state is None:
+            session = get_object_or_404(
+                QuizSession.objects.select_for_update(), id=quiz_session_id
+            )
+        else:
+            session = state.session
+        if session.user_id != request.user.pk:
+            return Response(
+                {'error': 'Permission denied'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        if session.ended_at:
+            return Response(
+                {'error': 'Session has already ended'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Get question; the one being shown is usually held in the state
+        if state is not None and state.current_question is not None \
+                and state.current_question.id == data['question_id']:
+            question = state.current_question
+        else:
+            question = get_object_or_404(Question, id=data['question_id'])
+        if question.chapter_id != session.chapter_id:
+            return Response(
+                {'error': 'Question does not belong to this session chapter'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if state is None:
+            state = SessionState.load(session)
+        response_data = _record_answer(state, question, data)
     
-    # Update session stats
-    session.total_questions += 1
-    if is_correct:
-        session.num_correct += 1
-    session.current_question_index = data['question_index'] + 1
-    session.save()
+    # Committed: pick the follow-ups outside the transaction, then publish the state
+    _prefetch_candidates(state)
+    get_session_state_cache().put(state)
     
-    # Select next question using ITS logic
-    next_question = select_next_question(session, attempt)
+    return Response(response_data)
+
+
+def _prefetch_candidates(state: SessionState) -> None:
+    """Pre-select the questions that can follow the answer to the current question"""
+    session = state.session
+    question = state.current_question
+    if question is None or session.ended_at or session.total_questions + 1 >= session.max_questions:
+        return
     
-    # Check if quiz should end
-    if session.total_questions >= session.max_questions or next_question is None:
-        session.ended_at = timezone.now()
-        session.save()
-        
-        return Response({
+    version = catalog_version()
+    state.set_candidates(
+        get_ability_estimator(session).prefetch(
+            session, question, state.attempted_ids | {question.id}
+        ),
+        version
+    )
+
+
+def _record_answer(state: SessionState, question: Question, data: dict) -> dict:
+    """Record one answer (see _record_answers); returns the response data"""
+    [is_correct], next_question = _record_answers(state, [(question, data)])
+    
+    if next_question is None:
+        return {
             'has_more': False,
             'is_correct': is_correct,
-        })
+        }
     
-    return Response({
+    return {
         'has_more': True,
-        'next_question_index': session.current_question_index,
+        'next_question_index': state.session.current_question_index,
         'question': QuizQuestionSerializer(next_question).data,
         'is_correct': is_correct,
+    }
+
+
+def _record_answers(
+    state: SessionState,
+    answered: List[Tuple[Question, dict]],
+) -> Tuple[List[bool], Optional[Question]]:
+    """
+    Insert the attempts of consecutive answers with one bulk_create, apply
+    the ITS rule for each in memory and update the session with a single
+    conditional UPDATE. Returns whether each answer was correct and the
+    next question (None once the quiz is over). Must run inside a
+    transaction; raises StaleSessionState if the session row has moved
+    past ``state``.
+    """
+    session = state.session
+    estimator = get_ability_estimator(session)
+    
+    if not session.aggregates:
+        # Sessions started before aggregates were tracked are rebuilt once,
+        # from the attempts before these
+        if session.total_questions:
+            recompute_session_aggregates(session)
+        else:
+            session.aggregates = empty_aggregates()
+    
+    previous_total = session.total_questions
+    num_correct = session.num_correct
+    attempts = []
+    results = []
+    for question, data in answered:
+        # Compute correctness
+        selected_index = data.get('selected_option_index')
+        is_correct = False
+        if selected_index is not None and not data.get('was_skipped', False):
+            is_correct = (selected_index == question.correct_option_index)
+        
+        # Get attention metrics
+        attention_metrics = data.get('attention_metrics') or {}
+        
+        # Flag low attention
+        attention_ratio = attention_metrics.get('attention_ratio', 0.0)
+        flagged_low_attention = attention_ratio < 0.4
+        
+        # Apply the ITS rule up front so the attempt is written once
+        ability_before = session.current_ability
+        estimator.apply_answer(
+            session,
+            question,
+            is_correct,
+            attention_metrics.get('attention_ratio'),
+            data['response_time_ms'],
+            attention_metrics.get('off_screen_ratio'),
+            question_index=data['question_index'],
+        )
+        
+        attempts.append(QuestionAttempt(
+            quiz_session=session,
+            question=question,
+            question_index=data['question_index'],
+            difficulty_at_attempt=question.difficulty,
+            ability_before=ability_before,
+            ability_after=session.current_ability,
+            started_at=data['started_at'],
+            submitted_at=data['submitted_at'],
+            response_time_ms=data['response_time_ms'],
+            selected_option_index=selected_index,
+            is_correct=is_correct,
+            was_skipped=data.get('was_skipped', False),
+            attention_ratio=attention_metrics.get('attention_ratio'),
+            off_screen_ratio=attention_metrics.get('off_screen_ratio'),
+            off_screen_duration_ms=attention_metrics.get('off_screen_duration_ms'),
+            num_gaze_samples=attention_metrics.get('num_gaze_samples', 0),
+            num_on_task_samples=attention_metrics.get('num_on_task_samples', 0),
+            num_off_task_samples=attention_metrics.get('num_off_task_samples', 0),
+            option_changes=attention_metrics.get('option_changes', 0),
+            flagged_low_attention=flagged_low_attention,
+            attention_trace=attention_metrics.get('attention_trace'),
+        ))
+        state.attempted_ids.add(question.id)
+        
+        # Fold the attempt into the running aggregates
+        num_correct += 1 if is_correct else 0
+        add_attempt_to_aggregates(
+            session.aggregates,
+            question.difficulty,
+            is_correct,
+            attention_metrics.get('attention_ratio'),
+            data['response_time_ms'],
+        )
+        results.append(is_correct)
+    
+    QuestionAttempt.objects.bulk_create(attempts)
+    
+    # Select next question using ITS logic, unless the quiz is over anyway
+    total_questions = previous_total + len(answered)
+    next_question = None
+    if total_questions < session.max_questions:
+        # Normally chosen while the student was on the current question
+        next_question = state.take_candidate(estimator.selection_key(session), catalog_version())
+        if next_question is None:
+            next_question = estimator.pick_question(session, state.attempted_ids)
+    state.current_question = next_question
+    
+    apply_aggregates_to_session(session, total_questions, num_correct)
+    
+    # Update session stats in one UPDATE of the changed columns
+    session.total_questions = total_questions
+    session.num_correct = num_correct
+    session.current_question_index = answered[-1][1]['question_index'] + 1
+    update_fields = [
+        'total_questions', 'num_correct', 'current_question_index',
+        'aggregates', 'overall_accuracy', 'overall_attention_ratio',
+        'overall_avg_response_time_ms', *estimator.update_fields
+    ]
+    
+    # Check if quiz should end
+    if next_question is None:
+        session.ended_at = timezone.now()
+        update_fields.append('ended_at')
+    
+    save_session_state(state, previous_total, update_fields)
+    return results, next_question
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def submit_answer_batch_view(request, quiz_session_id):
+    """
+    POST /api/quizzes/sessions/{quiz_session_id}/answers/
+    Submit several answers at once, e.g. queued by a client with a flaky
+    connection, and get the next question
+    
+    Body: ``idempotency_key`` (a UUID the client picks per batch) and
+    ``answers``, answer bodies as for submit_answer_view for consecutive
+    question indexes from the session's current one. The batch is all or
+    nothing: its attempts are inserted with one bulk_create, the ITS rule
+    is replayed over them in memory and the session is updated once. A
+    batch sent again with the same key gets the stored response (marked
+    with an Idempotent-Replayed header) and changes nothing.
+    """
+    serializer = AnswerBatchSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+    
+    state_cache = get_session_state_cache()
+    gaze_store = get_gaze_store()
+    
+    for answer, submitted in zip(data['answers'], request.data['answers']):
+        if submitted.get('gaze_samples') is None:
+            _add_uploaded_attention(gaze_store, quiz_session_id, answer)
+    
+    try:
+        try:
+            response = _submit_answer_batch(request, quiz_session_id, data, state_cache.get(quiz_session_id))
+        except StaleSessionState:
+            # Another worker advanced or ended this session since it was cached
+            state_cache.evict(quiz_session_id)
+            response = _submit_answer_batch(request, quiz_session_id, data, None)
+    except IntegrityError:
+        # A concurrent retry of this batch got there first, or one of these
+        # question indexes was already attempted
+        response = _replayed_batch(request, quiz_session_id, data['idempotency_key'])
+        if response is not None:
+            return response
+        return Response(
+            {'error': 'These questions have already been attempted'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except Exception:
+        state_cache.evict(quiz_session_id)
+        raise
+    
+    if response.status_code == status.HTTP_200_OK and 'Idempotent-Replayed' not in response:
+        for answer in data['answers']:
+            gaze_store.discard(quiz_session_id, answer['question_index'])
+    return response
+
+
+def _submit_answer_batch(request, quiz_session_id, data: dict, state: Optional[SessionState]) -> Response:
+    """Validate and record a batch of answers in a transaction, from cached state if given"""
+    answers = data['answers']
+    with transaction.atomic():
+        # Get session and verify ownership
+        if state is None:
+            session = get_object_or_404(
+                QuizSession.objects.select_for_update(), id=quiz_session_id
+            )
+        else:
+            session = state.session
+        if session.user_id != request.user.pk:
+            return Response(
+                {'error': 'Permission denied'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        replayed = _replayed_batch(request, quiz_session_id, data['idempotency_key'])
+        if replayed is not None:
+            return replayed
+        
+        if session.ended_at:
+            return Response(
+                {'error': 'Session has already ended'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if answers[0]['question_index'] != session.current_question_index:
+            if state is not None:
+                # The cached state may be behind; check against the locked row
+                raise StaleSessionState(f'Session {session.pk} may have moved past its cached state')
+            return Response(
+                {
+                    'error': 'Answers must start at the current question',
+                    'expected_question_index': session.current_question_index,
+                },
+                status=status.HTTP_409_CONFLICT
+            )
+        if session.total_questions + len(answers) > session.max_questions:
+            return Response(
+                {'error': 'More answers than questions left in this session'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Get the questions in one query; the one being shown is usually held in the state
+        questions = {}
+        if state is not None and state.current_question is not None:
+            questions[state.current_question.id] = state.current_question
+        missing = {answer['question_id'] for answer in answers} - questions.keys()
+        if missing:
+            questions.update(Question.objects.in_bulk(missing))
+        
+        if state is None:
+            state = SessionState.load(session)
+        for answer in answers:
+            question = questions.get(answer['question_id'])
+            error = None
+            if question is None:
+                error, code = 'Question not found', status.HTTP_404_NOT_FOUND
+            elif question.chapter_id != session.chapter_id:
+                error, code = 'Question does not belong to this session chapter', status.HTTP_400_BAD_REQUEST
+            elif question.id in state.attempted_ids:
+                error, code = 'This question has already been attempted', status.HTTP_400_BAD_REQUEST
+            if error:
+                return Response({'error': error, 'question_index': answer['question_index']}, status=code)
+        
+        results, next_question = _record_answers(
+            state, [(questions[answer['question_id']], answer) for answer in answers]
+        )
+        
+        response_data = {
+            'answers': [
+                {'question_index': answer['question_index'], 'is_correct': is_correct}
+                for answer, is_correct in zip(answers, results)
+            ],
+            'total_questions': session.total_questions,
+            'num_correct': session.num_correct,
+            'has_more': next_question is not None,
+        }
+        if next_question is not None:
+            response_data['next_question_index'] = session.current_question_index
+            response_data['question'] = QuizQuestionSerializer(next_question).data
+        
+        AnswerBatch.objects.create(
+            quiz_session=session,
+            idempotency_key=data['idempotency_key'],
+            num_answers=len(answers),
+            response=response_data,
+        )
+    
+    # Committed: pick the follow-ups outside the transaction, then publish the state
+    _prefetch_candidates(state)
+    get_session_state_cache().put(state)
+    
+    return Response(response_data)
+
+
+def _replayed_batch(request, quiz_session_id, idempotency_key) -> Optional[Response]:
+    """The stored response of the user's batch with this key, if it was recorded"""
+    stored = AnswerBatch.objects.filter(
+        quiz_session_id=quiz_session_id,
+        quiz_session__user_id=request.user.pk,
+        idempotency_key=idempotency_key,
+    ).values_list('response', flat=True).first()
+    if stored is None:
+        return None
+    return Response(stored, headers={'Idempotent-Replayed': 'true'})
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def gaze_chunk_view(request, quiz_session_id):
+    """
+    POST /api/quizzes/sessions/{quiz_session_id}/gaze/
+    Upload the next chunk of gaze samples for the question being answered
+    
+    Body: {question_index, seq, gaze_samples}, with gaze_samples packed as
+    in services.attention and timed from when the question was shown.
+    Chunks are numbered from 0 per question and folded into running
+    counters in order: a retried chunk is ignored and a skipped one gets a
+    409 naming the chunk expected. The answer then reads the counters.
+    """
+    serializer = GazeChunkSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+    
+    session = QuizSession.objects.filter(id=quiz_session_id).values(
+        'user_id', 'ended_at', 'current_question_index'
+    ).first()
+    if session is None:
+        raise Http404
+    if session['user_id'] != request.user.pk:
+        return Response(
+            {'error': 'Permission denied'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    if session['ended_at']:
+        return Response(
+            {'error': 'Session has already ended'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if data['question_index'] != session['current_question_index']:
+        return Response(
+            {'error': 'This question is not being answered'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        counters = get_gaze_store().add_chunk(
+            quiz_session_id, data['question_index'], data['seq'], data['gaze_samples']
+        )
+    except GazeChunkOutOfOrder as e:
+        return Response(
+            {'error': str(e), 'expected_seq': e.expected_seq},
+            status=status.HTTP_409_CONFLICT
+        )
+    except ValueError as e:
+        return Response({'gaze_samples': [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'next_seq': counters.chunks,
+        'num_gaze_samples': counters.count,
     })
 
 
@@ -192,34 +632,94 @@ def submit_answer_view(request, quiz_session_id):
 def get_summary_view(request, quiz_session_id):
     """
     GET /api/quizzes/sessions/{quiz_session_id}/summary/
-    Get quiz session summary with LLM feedback
+    Get quiz session summary with LLM feedback (summary_status: pending/ready)
     """
     # Get session and verify ownership
     session = get_object_or_404(QuizSession, id=quiz_session_id)
-    if session.user != request.user:
+    if session.user_id != request.user.pk:
         return Response(
             {'error': 'Permission denied'},
             status=status.HTTP_403_FORBIDDEN
         )
     
-    # Build summary if not already generated
-    if not session.summary_text:
-        summary_data = build_session_summary(session)
-        llm_summary = generate_quiz_summary(session, summary_data)
-    else:
-        # Rebuild summary data but use existing LLM summary
-        summary_data = build_session_summary(session)
-        llm_summary = session.summary_text
+    # Stats are returned right away; the LLM feedback is generated by a
+    # background job and the client polls until summary_status is 'ready'
+    summary_data = build_session_summary(session)
+    summary_status = request_summary(session)
     
-    # Prepare response
-    response_data = {
+    return Response(_summary_response_data(session, summary_data, summary_status))
+
+
+def _summary_response_data(session: QuizSession, summary_data: dict, summary_status: str) -> dict:
+    return {
         'session': QuizSessionSerializer(session).data,
         'per_question_stats': summary_data['per_question_stats'],
         'difficulty_breakdown': summary_data['difficulty_breakdown'],
-        'llm_summary': llm_summary,
+        'llm_summary': session.summary_text,
+        'summary_status': summary_status,
     }
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([EventStreamRenderer, JSONRenderer])
+def stream_summary_view(request, quiz_session_id):
+    """
+    GET /api/quizzes/sessions/{quiz_session_id}/summary/stream/
+    Server-Sent Events variant of the summary endpoint: a 'stats' event with
+    the computed stats, 'token' events as the LLM feedback is generated and
+    a final 'done' event once it has been saved
+    """
+    session = get_object_or_404(
+        QuizSession.objects.select_related('chapter'), id=quiz_session_id
+    )
+    if session.user_id != request.user.pk:
+        return Response(
+            {'error': 'Permission denied'},
+            status=status.HTTP_403_FORBIDDEN
+        )
     
-    return Response(response_data)
+    summary_data = build_session_summary(session)
+    
+    response = StreamingHttpResponse(
+        _summary_events(session, summary_data),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Don't let nginx buffer the stream
+    return response
+
+
+def _summary_events(session: QuizSession, summary_data: dict):
+    """Yield the SSE events for stream_summary_view"""
+    yield format_sse('stats', {
+        'session': QuizSessionSerializer(session).data,
+        'per_question_stats': summary_data['per_question_stats'],
+        'difficulty_breakdown': summary_data['difficulty_breakdown'],
+    })
+    
+    # Already generated, or a background job owns it: nothing to stream
+    if session.summary_text or not claim_summary(session.pk, status='running'):
+        yield format_sse('done', {
+            'llm_summary': session.summary_text,
+            'summary_status': 'ready' if session.summary_text else 'pending',
+        })
+        return
+    
+    completed = False
+    try:
+        for text in stream_quiz_summary(session, summary_data):
+            yield format_sse('token', {'text': text})
+        completed = True
+    finally:
+        if not completed:
+            # Client went away mid-stream; let the next request retry
+            release_summary_claim(session.pk)
+    
+    yield format_sse('done', {
+        'llm_summary': session.summary_text,
+        'summary_status': 'ready',
+    })
 
 
 @api_view(['GET'])
@@ -227,11 +727,58 @@ def get_summary_view(request, quiz_session_id):
 def list_sessions_view(request):
     """
     GET /api/quizzes/sessions/
-    List all quiz sessions for the current user
+    List the current user's quiz sessions, newest first, one page at a time.
+    
+    Query params: ``cursor`` (from the previous page's ``next`` link),
+    ``page_size``, ``chapter`` (slug), ``started_after`` and
+    ``started_before`` (ISO date or datetime).
     """
-    sessions = QuizSession.objects.filter(user=request.user).order_by('-started_at')
-    serializer = QuizSessionSerializer(sessions, many=True)
-    return Response(serializer.data)
+    sessions, error = _filtered_sessions(request)
+    if error is not None:
+        return error
+    
+    paginator = SessionKeysetPagination()
+    page = paginator.paginate_queryset(sessions, request)
+    serializer = QuizSessionSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
+
+
+def _filtered_sessions(request):
+    """The user's sessions filtered by the query params, or (None, error response)"""
+    sessions = QuizSession.objects.filter(user_id=request.user.pk).select_related('chapter')
+    
+    chapter_slug = request.query_params.get('chapter')
+    if chapter_slug:
+        sessions = sessions.filter(chapter__slug=chapter_slug)
+    
+    for param, lookup in (('started_after', 'started_at__gte'), ('started_before', 'started_at__lt')):
+        value = request.query_params.get(param)
+        if not value:
+            continue
+        bound = _parse_date_bound(value)
+        if bound is None:
+            return None, Response(
+                {'error': f'{param} must be an ISO date or datetime'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        sessions = sessions.filter(**{lookup: bound})
+    return sessions, None
+
+
+def _parse_date_bound(value):
+    """Parse a datetime, or a date as midnight in the current time zone"""
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                return None
+            parsed = datetime.combine(day, time.min)
+    except ValueError:
+        return None
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
 
 
 @api_view(['GET'])
@@ -241,8 +788,8 @@ def get_session_view(request, quiz_session_id):
     GET /api/quizzes/sessions/{quiz_session_id}/
     Get metadata for a single session
     """
-    session = get_object_or_404(QuizSession, id=quiz_session_id)
-    if session.user != request.user:
+    session = get_object_or_404(QuizSession.objects.select_related('chapter'), id=quiz_session_id)
+    if session.user_id != request.user.pk:
         return Response(
             {'error': 'Permission denied'},
             status=status.HTTP_403_FORBIDDEN
@@ -251,3 +798,48 @@ def get_session_view(request, quiz_session_id):
     serializer = QuizSessionSerializer(session)
     return Response(serializer.data)
 
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def session_decisions_view(request, quiz_session_id):
+    """
+    GET /api/quizzes/sessions/{quiz_session_id}/decisions/?limit=50
+    Last ITS decisions traced for a session, oldest first (staff only).
+    Needs the 'memory' sink in ITS_TRACE_SINKS; only sampled sessions
+    still in the buffer have decisions.
+    """
+    sink = get_decision_tracer().memory_sink()
+    if sink is None:
+        return Response(
+            {'error': 'ITS decision tracing to memory is not enabled'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    try:
+        limit = int(request.query_params.get('limit', 50))
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    limit = min(max(limit, 1), settings.ITS_TRACE_BUFFER_SIZE)
+    
+    decisions = sink.recent(quiz_session_id, limit)
+    return Response({
+        'quiz_session_id': str(quiz_session_id),
+        'decisions': [event.to_dict() for event in decisions],
+    })
+
+
+def metrics_view(request):
+    """
+    GET /metrics
+    Request metrics of this worker process in the Prometheus text format.
+    Only served to METRICS_ALLOWED_IPS, and only with METRICS_ENABLED on.
+    """
+    registry = get_metrics_registry()
+    if registry is None:
+        raise Http404
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+metrics_view.metrics_exempt = True
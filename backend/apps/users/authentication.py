@@ -1,7 +1,13 @@
 """
-Custom authentication classes for public endpoints
+Custom authentication classes: LazyJWTAuthentication, the default for all
+API endpoints, and NoAuthentication for public ones
 """
+from django.contrib.auth import get_user_model
 from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
 
 
 class NoAuthentication(BaseAuthentication):
@@ -11,3 +17,73 @@ class NoAuthentication(BaseAuthentication):
     def authenticate(self, request):
         return None
 
+
+class LazyTokenUser:
+    """
+    Authenticated user built from a validated access token.
+    
+    ``pk``/``id`` come straight from the token claims. Any other attribute
+    loads the full User row on first access (one query, then cached), so
+    views that only compare ``user_id`` never touch the user table.
+    """
+    is_authenticated = True
+    is_anonymous = False
+    _user = None
+    
+    def __init__(self, user_id, token):
+        self.pk = self.id = user_id
+        self.token = token
+    
+    def get_user(self):
+        """Return the full User, loading it on first call"""
+        if self._user is None:
+            User = get_user_model()
+            try:
+                self._user = User.objects.get(**{api_settings.USER_ID_FIELD: self.pk})
+            except User.DoesNotExist:
+                raise AuthenticationFailed('User not found', code='user_not_found')
+            if api_settings.CHECK_USER_IS_ACTIVE and not self._user.is_active:
+                raise AuthenticationFailed('User is inactive', code='user_inactive')
+        return self._user
+    
+    def __getattr__(self, name):
+        # Only called for attributes not set above
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.get_user(), name)
+    
+    def __eq__(self, other):
+        return getattr(other, 'pk', None) == self.pk
+    
+    def __hash__(self):
+        return hash(self.pk)
+    
+    def __str__(self):
+        return str(self.get_user())
+
+
+class LazyJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that trusts the signed token instead of loading the
+    user on every request.
+    
+    The token is still fully validated (signature, expiry, token type), but
+    the User row is never loaded here, only if a view asks for more than the
+    user's id. So ``is_active`` and deletion are not checked at
+    authentication: a deactivated or deleted user keeps access to id-only
+    endpoints, which include all quiz endpoints, until their access token
+    expires (``SIMPLE_JWT['ACCESS_TOKEN_LIFETIME']``).
+    """
+    
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+        
+        User = get_user_model()
+        try:
+            user_id = User._meta.get_field(api_settings.USER_ID_FIELD).to_python(user_id)
+        except Exception:
+            raise InvalidToken('Token contained an invalid user id')
+        return LazyTokenUser(user_id, validated_token)
@@ -40,6 +40,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.quizzes.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -107,7 +108,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.users.authentication.LazyJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -137,3 +138,108 @@ OPENROUTER_MODEL = config_module.OPENROUTER_MODEL
 OPENROUTER_SITE_URL = config_module.SITE_URL
 OPENROUTER_SITE_NAME = config_module.SITE_NAME
 
+
+# Quiz engine
+# Seconds before a worker reloads its in-memory question pool for a chapter.
+# Edits in the same process invalidate immediately via signals.
+QUESTION_POOL_TTL_SECONDS = 300
+# Ability model for new sessions: 'rules' (the original ITS step rules over
+# easy/medium/hard), 'irt' (2PL item response model, needs NumPy) or a
+# dotted path to an AbilityEstimator subclass
+ABILITY_ESTIMATOR = 'rules'
+# Chapter catalog (chapters + question counts). Edits invalidate it via
+# signals; the TTL bounds staleness for other processes when the cache
+# alias is per-process (the default LocMemCache).
+CHAPTER_CATALOG_CACHE_ALIAS = 'default'
+CHAPTER_CATALOG_TTL_SECONDS = 300
+# Browser cache lifetime; after that it revalidates with If-None-Match
+CHAPTER_CATALOG_MAX_AGE_SECONDS = 60
+# Hot state of in-progress sessions, so answers skip reloading the session.
+# Backend: 'memory' (per-process LRU), 'django' (SESSION_STATE_CACHE_ALIAS,
+# use a shared cache with several workers) or 'none'. Stale entries are
+# detected on write and reloaded, so per-process caches stay correct.
+SESSION_STATE_CACHE_BACKEND = 'memory'
+SESSION_STATE_CACHE_MAX_ENTRIES = 10000
+SESSION_STATE_CACHE_TTL_SECONDS = 2 * 3600
+SESSION_STATE_CACHE_ALIAS = 'default'
+
+# Attention metrics
+# Most gaze samples accepted for one answer (packed, 12 bytes each)
+ATTENTION_MAX_GAZE_SAMPLES = 20000
+# Every Nth sample is kept in the stored attention trace
+ATTENTION_TRACE_STRIDE = 10
+
+# Gaze chunk uploads
+# Running attention counters of the question being answered, folded from the
+# chunks posted to /api/quizzes/sessions/<id>/gaze/ and read by the answer.
+# Backend: 'memory' (per-process LRU; needs one worker or sticky sessions)
+# or 'django' (GAZE_STORE_CACHE_ALIAS, shared by all workers). Entries are
+# one per question plus one per uploaded chunk.
+GAZE_STORE_BACKEND = 'memory'
+GAZE_STORE_MAX_ENTRIES = 100000
+GAZE_STORE_TTL_SECONDS = 3600
+GAZE_STORE_CACHE_ALIAS = 'default'
+
+# ITS decision tracing
+# Sinks for a structured event per ability update (rule fired, ability
+# before/after, target difficulty): 'memory' (ring buffer of
+# ITS_TRACE_BUFFER_SIZE events, served to staff at
+# /api/quizzes/sessions/<id>/decisions/), 'jsonl' (appended to
+# ITS_TRACE_FILE), 'logger' (the apps.quizzes.decisions logger at INFO) or
+# dotted paths to classes with emit(event). Empty turns tracing off.
+ITS_TRACE_SINKS = []
+# Fraction of sessions traced; a traced session has all of its decisions
+ITS_TRACE_SAMPLE_RATE = 1.0
+ITS_TRACE_BUFFER_SIZE = 10000
+ITS_TRACE_FILE = BASE_DIR / 'its_decisions.jsonl'
+
+# LLM summary jobs
+# 'thread' runs jobs on an in-process pool; 'command' leaves them for
+# `python manage.py run_summary_jobs`.
+SUMMARY_JOB_RUNNER = 'thread'
+SUMMARY_JOB_WORKERS = 4
+# A job still pending/running after this long is assumed dead and re-queued
+SUMMARY_JOB_STALE_SECONDS = 300
+
+# LLM summary cache
+# Backend: 'memory' (per-process LRU), 'django' (LRU + Django cache alias),
+# 'file' (LRU + JSON files in LLM_SUMMARY_CACHE_DIR) or 'none'.
+LLM_SUMMARY_CACHE_BACKEND = 'memory'
+# 'bucketed' reuses summaries for sessions with similar stats; 'exact'
+# only for identical prompts.
+LLM_SUMMARY_CACHE_MATCH = 'bucketed'
+LLM_SUMMARY_CACHE_MAX_ENTRIES = 1024
+LLM_SUMMARY_CACHE_TTL_SECONDS = 7 * 24 * 3600
+LLM_SUMMARY_CACHE_ALIAS = 'default'
+LLM_SUMMARY_CACHE_DIR = BASE_DIR / 'llm_summary_cache'
+
+# LLM client
+LLM_CONNECT_TIMEOUT_SECONDS = 5
+LLM_READ_TIMEOUT_SECONDS = 30
+# Retries after the first attempt, with jittered exponential backoff
+LLM_MAX_RETRIES = 2
+LLM_RETRY_BACKOFF_SECONDS = 0.5
+# Process-wide cap on in-flight LLM calls, and how long to wait for a slot
+LLM_MAX_CONCURRENCY = 4
+LLM_CONCURRENCY_WAIT_SECONDS = 10
+# Consecutive failures before failing fast to the fallback summary
+LLM_CIRCUIT_FAILURE_THRESHOLD = 5
+LLM_CIRCUIT_RESET_SECONDS = 30
+
+# Async views
+# Route the start, answer, summary and session list endpoints to the native
+# async views in apps.quizzes.async_views. Only worth it under an ASGI server
+# (config.asgi), where a summary streaming from a slow LLM holds no thread;
+# under WSGI every async view is run on its own event loop, with its own LLM
+# client (closed with the loop, so no connection reuse). LLM_MAX_CONCURRENCY
+# caps async calls across all loops.
+QUIZ_ASYNC_VIEWS = False
+
+# Request metrics
+# Per-view wall time, DB queries/time, LLM and serializer time, served in
+# the Prometheus text format at /metrics. Off, the middleware is removed at
+# startup. Each worker process keeps (and serves) its own numbers.
+METRICS_ENABLED = False
+# Window of the rolling p50/p95/p99
+METRICS_WINDOW_SECONDS = 300
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
@@ -3,10 +3,12 @@ URL configuration for RankCatalyst project.
 """
 from django.contrib import admin
 from django.urls import path, include
+from apps.quizzes.views import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('apps.users.urls')),
     path('api/quizzes/', include('apps.quizzes.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
@@ -9,8 +9,8 @@ import CalibrationOverlay from "@/components/quiz/CalibrationOverlay";
 import WebGazerVideoStyler from "@/components/quiz/WebGazerVideoStyler";
 import { apiClient } from "@/lib/apiClient";
 import { webgazerClient } from "@/lib/attention/webgazerClient";
-import { computeAttentionMetrics } from "@/lib/attention/attentionUtils";
-import type { Question, AttentionMetrics } from "@/lib/types";
+import { computeAttentionMetrics, packGazeSamples } from "@/lib/attention/attentionUtils";
+import type { Question, AttentionMetrics, GazeSample } from "@/lib/types";
 import { config } from "@/config";
 
 export default function QuizPage() {
@@ -33,6 +33,14 @@ export default function QuizPage() {
   const [alertShown, setAlertShown] = useState(false);
 
   const questionAreaRef = useRef<HTMLDivElement>(null);
+  // Gaze samples of the current question, uploaded in chunks while answering.
+  // If an upload fails, all of them go with the answer instead.
+  const gazeUpload = useRef({
+    seq: 0,
+    samples: [] as GazeSample[],
+    failed: false,
+    pending: Promise.resolve(),
+  });
 
   useEffect(() => {
     const token = localStorage.getItem("access");
@@ -68,9 +76,15 @@ export default function QuizPage() {
       updateAttentionMetrics();
     }, 100);
 
+    gazeUpload.current = { seq: 0, samples: [], failed: false, pending: Promise.resolve() };
+    const uploadInterval = setInterval(() => {
+      uploadGazeChunk();
+    }, config.gazeChunkInterval);
+
     return () => {
       console.log('Stopping attention updates for question', questionIndex);
       clearInterval(interval);
+      clearInterval(uploadInterval);
     };
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [startTime, question, questionIndex]); // Re-run when question changes
@@ -225,6 +239,30 @@ export default function QuizPage() {
     }
   };
 
+  // Queue the samples recorded since the last chunk; uploads run one at a time
+  const uploadGazeChunk = () => {
+    const upload = gazeUpload.current;
+    const samples = webgazerClient.takeNewSamples();
+    if (!samples.length) return upload.pending;
+    upload.samples.push(...samples);
+    if (upload.failed || !sessionId || !startTime) return upload.pending;
+
+    const questionBox = questionAreaRef.current?.getBoundingClientRect() || null;
+    const chunk = packGazeSamples(questionBox, samples, startTime.getTime());
+    const seq = upload.seq++;
+    upload.pending = upload.pending
+      .then(async () => {
+        if (!upload.failed) {
+          await apiClient.uploadGazeChunk(sessionId, questionIndex, seq, chunk);
+        }
+      })
+      .catch((error) => {
+        console.warn('Gaze chunk upload failed, sending samples with the answer:', error);
+        upload.failed = true;
+      });
+    return upload.pending;
+  };
+
   const handleSelectOption = (index: number) => {
     if (selectedOption !== null && selectedOption !== index) {
       setOptionChanges(optionChanges + 1);
@@ -246,6 +284,10 @@ export default function QuizPage() {
       const questionBox = questionAreaRef.current?.getBoundingClientRect() || null;
       const samples = webgazerClient.getGazeSamples();
       webgazerClient.updateSampleOnTask(questionBox);
+
+      // Flush the last chunk; the backend then already has every sample
+      const upload = gazeUpload.current;
+      await uploadGazeChunk();
       
       // Ensure we always have valid metrics
       const baseMetrics = computeAttentionMetrics(questionBox, samples);
@@ -261,7 +303,8 @@ export default function QuizPage() {
         num_on_task_samples: baseMetrics.num_on_task_samples || 0,
         num_off_task_samples: baseMetrics.num_off_task_samples || 0,
         option_changes: optionChanges,
-        raw_attention_trace: baseMetrics.raw_attention_trace || [],
+        // The backend builds the trace from the gaze samples
+        raw_attention_trace: [],
       };
 
       // Submit answer
@@ -274,7 +317,10 @@ export default function QuizPage() {
         responseTimeMs,
         selectedOption,
         false,
-        attentionMetrics
+        attentionMetrics,
+        upload.failed && upload.samples.length
+          ? packGazeSamples(questionBox, upload.samples, startTime.getTime())
+          : undefined
       );
 
       // Check response structure - handle both success and completion
@@ -9,6 +9,8 @@ import AttentionChart from "@/components/charts/AttentionChart";
 import AccuracyByDifficulty from "@/components/charts/AccuracyByDifficulty";
 import type { QuizSummaryResponse } from "@/lib/types";
 
+const SUMMARY_POLL_INTERVAL_MS = 2000;
+
 export default function ResultPage() {
   const router = useRouter();
   const params = useParams();
@@ -29,6 +31,23 @@ export default function ResultPage() {
     loadSummary();
   }, [sessionId, router]);
 
+  // Feedback is generated in the background; poll until it is ready
+  useEffect(() => {
+    if (summary?.summary_status !== "pending") {
+      return;
+    }
+
+    const timer = setTimeout(async () => {
+      try {
+        setSummary(await apiClient.getSummary(sessionId));
+      } catch (err) {
+        console.error("Failed to refresh summary:", err);
+      }
+    }, SUMMARY_POLL_INTERVAL_MS);
+
+    return () => clearTimeout(timer);
+  }, [summary, sessionId]);
+
   const loadSummary = async () => {
     try {
       const data = await apiClient.getSummary(sessionId);
@@ -118,7 +137,11 @@ export default function ResultPage() {
       <div className="bg-white rounded-2xl shadow-md p-6 mb-8">
         <h2 className="text-xl font-semibold text-gray-900 mb-4">Performance Feedback</h2>
         <div className="prose max-w-none">
-          <p className="text-gray-700 whitespace-pre-wrap">{llm_summary}</p>
+          {summary.summary_status === "pending" ? (
+            <p className="text-gray-500 italic">Generating personalized feedback...</p>
+          ) : (
+            <p className="text-gray-700 whitespace-pre-wrap">{llm_summary}</p>
+          )}
         </div>
       </div>
 
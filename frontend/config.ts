@@ -6,6 +6,7 @@ export const config = {
   apiBaseUrl: process.env.NEXT_PUBLIC_API_BASE_URL || 'http://localhost:8000/api',
   appName: 'RankCatalyst',
   webgazerSampleInterval: 150, // milliseconds
+  gazeChunkInterval: 2000, // milliseconds between gaze sample uploads
   defaultMaxQuestions: 15,
 };
 
@@ -8,10 +8,13 @@ import type {
   Chapter,
   QuizSessionStartResponse,
   QuizAnswerResponse,
+  QuizAnswerBatchResponse,
+  BatchedAnswer,
   QuizSummaryResponse,
   LoginResponse,
   User,
   AttentionMetrics,
+  PackedGazeSamples,
 } from './types';
 
 class ApiClient {
@@ -105,7 +108,9 @@ class ApiClient {
     maxQuestions: number,
     webgazerEnabled: boolean,
     calibrationQuality: number | null,
-    deviceInfo: string
+    deviceInfo: string,
+    mode: 'adaptive' | 'planned' = 'adaptive',
+    seed?: number
   ): Promise<QuizSessionStartResponse> {
     const response = await this.client.post('/quizzes/sessions/start/', {
       chapter_slug: chapterSlug,
@@ -113,6 +118,22 @@ class ApiClient {
       webgazer_enabled: webgazerEnabled,
       calibration_quality: calibrationQuality,
       device_info: deviceInfo,
+      mode,
+      seed,
+    });
+    return response.data;
+  }
+
+  async uploadGazeChunk(
+    sessionId: string,
+    questionIndex: number,
+    seq: number,
+    gazeSamples: PackedGazeSamples
+  ): Promise<{ next_seq: number; num_gaze_samples: number }> {
+    const response = await this.client.post(`/quizzes/sessions/${sessionId}/gaze/`, {
+      question_index: questionIndex,
+      seq,
+      gaze_samples: gazeSamples,
     });
     return response.data;
   }
@@ -126,7 +147,8 @@ class ApiClient {
     responseTimeMs: number,
     selectedOptionIndex: number | null,
     wasSkipped: boolean,
-    attentionMetrics: AttentionMetrics
+    attentionMetrics: AttentionMetrics,
+    gazeSamples?: PackedGazeSamples
   ): Promise<QuizAnswerResponse> {
     try {
       const response = await this.client.post(`/quizzes/sessions/${sessionId}/answer/`, {
@@ -138,6 +160,7 @@ class ApiClient {
         selected_option_index: selectedOptionIndex,
         was_skipped: wasSkipped,
         attention_metrics: attentionMetrics,
+        gaze_samples: gazeSamples,
       });
       
       // Ensure response has the expected structure
@@ -162,6 +185,22 @@ class ApiClient {
     }
   }
 
+  /**
+   * Submit answers queued while offline, in question order. Reuse the same
+   * idempotencyKey when retrying a batch so it is only recorded once.
+   */
+  async submitAnswers(
+    sessionId: string,
+    idempotencyKey: string,
+    answers: BatchedAnswer[]
+  ): Promise<QuizAnswerBatchResponse> {
+    const response = await this.client.post(`/quizzes/sessions/${sessionId}/answers/`, {
+      idempotency_key: idempotencyKey,
+      answers,
+    });
+    return response.data;
+  }
+
   async getSummary(sessionId: string): Promise<QuizSummaryResponse> {
     const response = await this.client.get(`/quizzes/sessions/${sessionId}/summary/`);
     return response.data;
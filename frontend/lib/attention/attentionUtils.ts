@@ -2,7 +2,7 @@
  * Attention tracking utilities
  * Computes attention metrics from gaze samples
  */
-import type { AttentionMetrics } from '@/lib/types';
+import type { AttentionMetrics, PackedGazeSamples } from '@/lib/types';
 import type { GazeSample } from './webgazerClient';
 
 export function computeAttentionMetrics(
@@ -97,3 +97,44 @@ export function computeAttentionMetrics(
   };
 }
 
+
+/**
+ * Pack gaze samples for the backend, which computes the attention metrics
+ * from them. 12 bytes per sample instead of a JSON object. Times are sent
+ * relative to `origin` (chunks use when the question was shown), by
+ * default the first sample.
+ */
+export function packGazeSamples(
+  questionBox: DOMRect | null,
+  samples: GazeSample[],
+  origin?: number
+): PackedGazeSamples {
+  const ordered = [...samples].sort((a, b) => a.timestamp - b.timestamp);
+  const count = ordered.length;
+  const buffer = new ArrayBuffer(count * 12);
+  const view = new DataView(buffer);
+  const t0 = origin ?? (ordered[0]?.timestamp || 0);
+
+  ordered.forEach((sample, index) => {
+    const isOffScreen = sample.x === null || sample.y === null;
+    view.setUint32(index * 4, Math.max(0, Math.round(sample.timestamp - t0)), true);
+    view.setFloat32(count * 4 + index * 4, isOffScreen ? NaN : (sample.x as number), true);
+    view.setFloat32(count * 8 + index * 4, isOffScreen ? NaN : (sample.y as number), true);
+  });
+
+  // btoa takes a binary string; build it in chunks to stay under argument limits
+  const bytes = new Uint8Array(buffer);
+  let binary = '';
+  for (let i = 0; i < bytes.length; i += 0x8000) {
+    binary += String.fromCharCode(...bytes.subarray(i, i + 0x8000));
+  }
+
+  return {
+    format: 1,
+    count,
+    question_box: questionBox
+      ? [questionBox.left, questionBox.top, questionBox.right, questionBox.bottom]
+      : null,
+    data: btoa(binary),
+  };
+}
@@ -19,6 +19,8 @@ class WebGazerClient {
   private isInitialized: boolean = false;
   private isTracking: boolean = false;
   private samples: GazeSample[] = [];
+  // Samples not yet taken for upload (see takeNewSamples)
+  private newSamples: GazeSample[] = [];
   private intervalId: NodeJS.Timeout | null = null;
   private webgazer: any = null;
 
@@ -78,12 +80,7 @@ class WebGazerClient {
                 y: data.y,
                 timestamp: Date.now(),
               };
-              this.samples.push(sample);
-              
-              // Keep only last 200 samples to avoid memory issues
-              if (this.samples.length > 200) {
-                this.samples = this.samples.slice(-200);
-              }
+              this.addSample(sample);
             } else {
               // Null data means user not detected - add off-screen sample
               const sample: GazeSample = {
@@ -91,12 +88,7 @@ class WebGazerClient {
                 y: null,
                 timestamp: Date.now(),
               };
-              this.samples.push(sample);
-              
-              // Keep only last 200 samples
-              if (this.samples.length > 200) {
-                this.samples = this.samples.slice(-200);
-              }
+              this.addSample(sample);
             }
           }
         }).begin();
@@ -184,12 +176,7 @@ class WebGazerClient {
             y: gaze.y,
             timestamp: Date.now(),
           };
-          this.samples.push(sample);
-          
-          // Keep only last 200 samples
-          if (this.samples.length > 200) {
-            this.samples = this.samples.slice(-200);
-          }
+          this.addSample(sample);
         }
       }, 150);
     } else {
@@ -241,10 +228,32 @@ class WebGazerClient {
     return [...this.samples];
   }
 
+  // Samples recorded since the last call, for chunked upload
+  takeNewSamples(): GazeSample[] {
+    const taken = this.newSamples;
+    this.newSamples = [];
+    return taken;
+  }
+
+  private addSample(sample: GazeSample): void {
+    this.samples.push(sample);
+    this.newSamples.push(sample);
+
+    // Keep only last 200 samples to avoid memory issues
+    if (this.samples.length > 200) {
+      this.samples = this.samples.slice(-200);
+    }
+    // Bound the upload buffer too, in case uploads stop being taken
+    if (this.newSamples.length > 20000) {
+      this.newSamples = this.newSamples.slice(-20000);
+    }
+  }
+
   clearSamples(): void {
     // Keep last 10 samples for continuity
     const beforeCount = this.samples.length;
     this.samples = this.samples.slice(-10);
+    this.newSamples = [];
     console.log(`Cleared samples: ${beforeCount} -> ${this.samples.length} (kept last 10)`);
   }
 
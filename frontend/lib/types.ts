@@ -8,6 +8,7 @@ export interface Chapter {
   name: string;
   description?: string;
   is_active: boolean;
+  question_counts?: { easy: number; medium: number; hard: number; total: number };
 }
 
 export interface Question {
@@ -28,6 +29,15 @@ export interface AttentionMetrics {
   raw_attention_trace?: { t_ms: number; on_task: boolean }[];
 }
 
+// Raw gaze samples packed as base64 little-endian columns: uint32 t_ms
+// (since the first sample, non-decreasing), float32 x, float32 y (NaN off screen)
+export interface PackedGazeSamples {
+  format: 1;
+  count: number;
+  question_box: [number, number, number, number] | null;
+  data: string;
+}
+
 export interface GazeSample {
   x: number | null;
   y: number | null;
@@ -50,6 +60,27 @@ export interface QuizAnswerResponse {
   is_correct?: boolean;
 }
 
+export interface BatchedAnswer {
+  question_id: string;
+  question_index: number;
+  started_at: string;
+  submitted_at: string;
+  response_time_ms: number;
+  selected_option_index: number | null;
+  was_skipped: boolean;
+  attention_metrics?: AttentionMetrics;
+  gaze_samples?: PackedGazeSamples;
+}
+
+export interface QuizAnswerBatchResponse {
+  answers: { question_index: number; is_correct: boolean }[];
+  total_questions: number;
+  num_correct: number;
+  has_more: boolean;
+  next_question_index?: number;
+  question?: Question;
+}
+
 export interface QuizSummaryResponse {
   session: {
     id: string;
@@ -84,6 +115,7 @@ export interface QuizSummaryResponse {
     }
   >;
   llm_summary: string;
+  summary_status: 'pending' | 'ready';
 }
 
 export interface User {